@@ -365,6 +365,30 @@ async function init() {
     }
 }
 
+// Resolve the optional place table (build_hsa_data.py --place-table):
+// letters reference places by index instead of carrying lat/lon
+function resolvePlaceTable(data) {
+    const table = data.places;
+    if (!table) return data;
+
+    const resolve = (place) => {
+        if (!place || place.place === undefined) return;
+        const lat = table.lat[place.place];
+        if (lat !== null) {
+            place.lat = lat;
+            place.lon = table.lon[place.place];
+        }
+        delete place.place;
+    };
+
+    data.letters.forEach(letter => {
+        resolve(letter.place_sent);
+        (letter.mentions?.places || []).forEach(resolve);
+    });
+    delete data.places;
+    return data;
+}
+
 // Load data based on URL parameter or sessionStorage
 async function loadData() {
     const urlParams = new URLSearchParams(window.location.search);
@@ -377,7 +401,7 @@ async function loadData() {
             if (!response.ok) {
                 throw new Error('HSA-Daten konnten nicht geladen werden');
             }
-            const data = await response.json();
+            const data = resolvePlaceTable(await response.json());
             return {
                 ...data,
                 sourceInfo: { type: 'preset', source: 'hsa' }
@@ -11,54 +11,12 @@ from lxml import etree
 from pathlib import Path
 from collections import defaultdict
 import json
-import re
+
+from cmif_uri import extract_id_from_uri
 
 # Namespaces
 NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
 
-def extract_id_from_uri(uri: str) -> tuple[str, str]:
-    """Extrahiert ID und Typ aus einer URI."""
-    if not uri:
-        return None, None
-
-    # VIAF
-    if 'viaf.org' in uri:
-        match = re.search(r'viaf/(\d+)', uri)
-        return (match.group(1), 'viaf') if match else (None, 'viaf')
-
-    # GeoNames
-    if 'geonames.org' in uri:
-        match = re.search(r'geonames\.org/(\d+)', uri)
-        return (match.group(1), 'geonames') if match else (None, 'geonames')
-
-    # HSA Subjects
-    if 'hsa.subjects' in uri:
-        match = re.search(r'#S\.(\d+)', uri)
-        return (match.group(1), 'hsa_subject') if match else (None, 'hsa_subject')
-
-    # HSA Languages
-    if 'hsa.languages' in uri:
-        match = re.search(r'#L\.(\d+)', uri)
-        return (match.group(1), 'hsa_language') if match else (None, 'hsa_language')
-
-    # Lexvo (ISO 639-3)
-    if 'lexvo.org' in uri:
-        match = re.search(r'iso639-3/(\w+)', uri)
-        return (match.group(1), 'lexvo') if match else (None, 'lexvo')
-
-    # HSA internal person
-    if 'schuchardt.uni-graz.at/id/person' in uri:
-        match = re.search(r'person/(\d+)', uri)
-        return (match.group(1), 'hsa_person') if match else (None, 'hsa_person')
-
-    # GND (for comparison)
-    if 'd-nb.info/gnd' in uri:
-        match = re.search(r'gnd/(\d+X?)', uri)
-        return (match.group(1), 'gnd') if match else (None, 'gnd')
-
-    return uri, 'unknown'
-
-
 def get_metadata_type(type_attr: str) -> str:
     """Extrahiert den Metadaten-Typ aus dem type-Attribut."""
     if not type_attr:
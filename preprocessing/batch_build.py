@@ -0,0 +1,271 @@
+"""
+Batch-Build fuer mehrere CMIF-Korpora
+
+Baut eine Liste von CMIF-Dateien (oder alle *.xml in Verzeichnissen) mit
+build_hsa_data.build_corpus() in einem begrenzten Prozess-Pool. Interpreter
+und lxml werden pro Worker einmal geladen statt pro Datei.
+
+Mit --workers parst jeder Build zusaetzlich parallel; die Worker je Build
+werden auf Kerne / gleichzeitige Builds begrenzt (--workers 0 wuerde sonst
+jobs * Kerne Prozesse starten).
+
+Ein Korpus wird uebersprungen, wenn CMIF-Datei, Koordinatendatei und
+Build-Optionen unveraendert sind und der Output existiert (SHA-1 ueber die
+Inhalte, gespeichert in batch-status.json). Nach Aenderungen an der
+Pipeline selbst --force verwenden.
+
+Output je Korpus: <name>-letters.json (+ gewaehlte Artefakte) und
+<name>.log mit der Konsolenausgabe des Builds; dazu batch-status.json mit
+Status, Laufzeit und Briefzahl je Korpus.
+
+Usage:
+    python preprocessing/batch_build.py data/cmif/ --output-dir docs/data/corpora
+    python preprocessing/batch_build.py a.xml b.xml --jobs 4 --postings --search
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from lxml import etree
+
+from build_hsa_data import NS, add_build_arguments, build_corpus, check_build_arguments
+from hsa_cache import file_hash
+
+
+STATUS_FILE = 'batch-status.json'
+STATUS_VERSION = 1
+# Optionen, die den Output nicht beeinflussen
+IGNORED_OPTIONS = {
+    'sources', 'output_dir', 'coordinates', 'jobs', 'force', 'workers',
+    'profile', 'profile_stage', 'profile_mode', 'cache'
+}
+
+
+def collect_sources(paths: list) -> list:
+    """Expandiert Verzeichnisse zu ihren *.xml-Dateien, sortiert und ohne Duplikate."""
+    sources = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources.extend(sorted(path.glob('*.xml')))
+        else:
+            sources.append(path)
+    return list(dict.fromkeys(p.resolve() for p in sources))
+
+
+def corpus_names(sources: list) -> dict:
+    """Output-Namen je Quelle; gleiche Dateinamen werden um den Ordner ergaenzt."""
+    stems = [source.stem.lower() for source in sources]
+    names = {}
+    for source, stem in zip(sources, stems):
+        if stems.count(stem) > 1:
+            stem = f"{source.parent.name.lower()}-{stem}"
+        names[source] = stem
+    return names
+
+
+def read_title(cmif_file: Path) -> str:
+    """Titel aus titleStmt, ohne die Datei vollstaendig zu parsen."""
+    context = etree.iterparse(str(cmif_file), events=('end',), tag=f"{{{NS['tei']}}}title")
+    for _, title in context:
+        text = ' '.join(''.join(title.itertext()).split())
+        return text or None
+    return None
+
+
+def build_options(args) -> dict:
+    """Build-Optionen, die in den Eingabe-Hash eingehen."""
+    return {
+        key: value for key, value in sorted(vars(args).items())
+        if key not in IGNORED_OPTIONS
+    }
+
+
+def inner_workers(workers: int, jobs: int, cpu_count: int) -> int:
+    """Parse-Prozesse je Build, sodass jobs Builds zusammen die Kerne nicht ueberbuchen.
+
+    workers wie --workers (0 = alle Kerne); gekappt auf cpu_count // jobs.
+    """
+    share = max(1, cpu_count // jobs)
+    return min(workers or cpu_count, share)
+
+
+def build_job(args, cmif_file: Path, coords_file: Path, output_file: Path) -> dict:
+    """Baut einen Korpus im Worker-Prozess; die Ausgabe geht in <name>.log."""
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    log_file = output_file.with_name(output_file.name.replace('-letters.json', '.log'))
+    try:
+        with open(log_file, 'w', encoding='utf-8') as log, redirect_stdout(log):
+            source = {
+                'source': read_title(cmif_file) or cmif_file.stem,
+                'source_file': cmif_file.name
+            }
+            meta = build_corpus(args, cmif_file, coords_file, output_file, source=source)
+        result = {
+            'status': 'built',
+            'letters': meta['total_letters'],
+            'output_bytes': output_file.stat().st_size
+        }
+    except Exception as e:
+        result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    result['cpu_seconds'] = round(time.process_time() - cpu_start, 3)
+    return result
+
+
+def load_status(status_file: Path) -> dict:
+    """Vorheriger Batch-Status, leer wenn nicht vorhanden oder veraltet."""
+    if not status_file.exists():
+        return {}
+    with open(status_file, 'r', encoding='utf-8') as f:
+        status = json.load(f)
+    if status.get('version') != STATUS_VERSION:
+        return {}
+    return status.get('corpora', {})
+
+
+def run_batch(args) -> dict:
+    """Baut alle Quellen, ueberspringt unveraenderte, schreibt batch-status.json.
+
+    Liefert den Status der Korpora dieses Laufs.
+    """
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    coords_file = Path(args.coordinates)
+    status_file = output_dir / STATUS_FILE
+
+    sources = collect_sources(args.sources)
+    names = corpus_names(sources)
+    previous = load_status(status_file)
+    coords_hash = file_hash(coords_file) if coords_file.exists() else None
+    options = build_options(args)
+
+    corpora = {}
+    pending = {}
+    for cmif_file in sources:
+        name = names[cmif_file]
+        output_file = output_dir / f"{name}-letters.json"
+        if not cmif_file.exists():
+            corpora[name] = {'source': str(cmif_file), 'status': 'missing'}
+            continue
+        input_hash = hashlib.sha1(json.dumps(
+            [file_hash(cmif_file), coords_hash, options], sort_keys=True
+        ).encode('utf-8')).hexdigest()
+        entry = {
+            'source': str(cmif_file),
+            'output': output_file.name,
+            'input_hash': input_hash
+        }
+        last = previous.get(name, {})
+        if (not args.force and output_file.exists()
+                and last.get('status') in ('built', 'skipped')
+                and last.get('input_hash') == input_hash):
+            entry.update({
+                'status': 'skipped',
+                'letters': last.get('letters'),
+                'output_bytes': last.get('output_bytes'),
+                'seconds': 0.0
+            })
+            corpora[name] = entry
+        else:
+            corpora[name] = entry
+            pending[name] = (cmif_file, output_file)
+
+    jobs = args.jobs or os.cpu_count()
+    batch_start = time.perf_counter()
+    if pending:
+        running = min(jobs, len(pending))
+        workers = inner_workers(args.workers, running, os.cpu_count())
+        if args.workers and workers < args.workers:
+            print(f"--workers {args.workers} auf {workers} begrenzt "
+                  f"({running} Builds gleichzeitig, {os.cpu_count()} Kerne)")
+        args = argparse.Namespace(**{**vars(args), 'workers': workers})
+        with ProcessPoolExecutor(max_workers=running) as executor:
+            futures = {
+                executor.submit(build_job, args, cmif_file, coords_file, output_file): name
+                for name, (cmif_file, output_file) in pending.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                corpora[name].update(future.result())
+                print(f"  {name}: {corpora[name]['status']} "
+                      f"({corpora[name]['seconds']:.2f} s)")
+
+    status = {
+        'version': STATUS_VERSION,
+        'generated': datetime.now().isoformat(),
+        'jobs': jobs,
+        'seconds': round(time.perf_counter() - batch_start, 3),
+        'corpora': dict(sorted(corpora.items()))
+    }
+    # Korpora aus frueheren Laeufen bleiben fuer deren Skip-Pruefung erhalten
+    with open(status_file, 'w', encoding='utf-8') as f:
+        json.dump(
+            {**status, 'corpora': dict(sorted({**previous, **corpora}.items()))},
+            f, ensure_ascii=False, indent=2
+        )
+    return status
+
+
+def print_summary(status: dict):
+    print("\n" + "="*50)
+    print("BATCH-BUILD ZUSAMMENFASSUNG")
+    print("="*50)
+    for name, entry in status['corpora'].items():
+        letters = entry.get('letters')
+        letters = f"{letters} Briefe" if letters is not None else ''
+        seconds = f"{entry['seconds']:.2f} s" if 'seconds' in entry else ''
+        print(f"{name:30} {entry['status']:8} {seconds:>10} {letters}")
+        if entry.get('error'):
+            print(f"    {entry['error']}")
+    counts = {}
+    for entry in status['corpora'].values():
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    print(f"\nGesamt: {status['seconds']:.2f} s mit {status['jobs']} Prozessen, "
+          + ', '.join(f"{status_name}: {count}" for status_name, count in sorted(counts.items())))
+
+
+def parse_args():
+    base_dir = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='Batch-Build fuer mehrere CMIF-Dateien')
+    parser.add_argument(
+        'sources', nargs='+',
+        help='CMIF-Dateien oder Verzeichnisse (alle *.xml)'
+    )
+    parser.add_argument(
+        '--output-dir', default=str(base_dir / 'docs' / 'data'),
+        help='Zielverzeichnis fuer <name>-letters.json und batch-status.json'
+    )
+    parser.add_argument(
+        '--coordinates', default=str(base_dir / 'data' / 'geonames_coordinates.json'),
+        help='Koordinatendatei fuer die Anreicherung'
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=0,
+        help='Maximale Anzahl gleichzeitiger Builds (0 = alle Kerne)'
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Auch unveraenderte Korpora neu bauen'
+    )
+    add_build_arguments(parser)
+    args = parser.parse_args()
+    check_build_arguments(parser, args)
+    return args
+
+
+def main():
+    args = parse_args()
+    status = run_batch(args)
+    print_summary(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Skalierungs-Benchmark fuer die Python-Pipeline
+
+Erzeugt synthetische CMIF-Dateien (synthetic_cmif.py) in mehreren Groessen
+und misst je Groesse:
+
+    parse      - parse_cmif (DOM)
+    parse/N    - parse_cmif mit N Worker-Prozessen (--workers), mit CPU-Zeit
+                 des Hauptprozesses und der Worker: der Anteil des
+                 Hauptprozesses begrenzt die erreichbare Beschleunigung
+    enrich     - enrich_with_coordinates
+    write      - JSON-Output wie build_hsa_data.main (kompakt)
+    analyze    - analyze_cmif aus analyze_hsa_cmif.py
+
+Gemessen werden Wall-Zeit, Peak-RSS und Output-Groesse. parse, enrich und
+write laufen nacheinander in einem Kindprozess (Peak-RSS ist kumulativ,
+wie im echten Build), analyze in einem eigenen, damit sich die Peaks nicht
+ueberlagern. Die generierten Dateien werden im Arbeitsverzeichnis
+wiederverwendet.
+
+Usage:
+    python preprocessing/benchmark_pipeline.py
+    python preprocessing/benchmark_pipeline.py --sizes 10000 100000 --results bench.json
+    python preprocessing/benchmark_pipeline.py --sizes 100000 --workers 2 4 8
+"""
+
+from contextlib import redirect_stdout
+from pathlib import Path
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from hsa_profile import peak_rss_mb
+from synthetic_cmif import generate_cmif
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+SCRIPT = Path(__file__).resolve()
+
+
+def children_cpu_seconds() -> float:
+    """CPU-Zeit aller beendeten Kindprozesse (Worker eines Prozess-Pools)."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def timed(results: dict, stage: str, func, *args):
+    """Fuehrt func aus und haengt Wall-Zeit und Peak-RSS an results an."""
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    children_start = children_cpu_seconds()
+    with redirect_stdout(io.StringIO()):
+        value = func(*args)
+    results[stage] = {
+        'seconds': round(time.perf_counter() - start, 3),
+        'cpu_seconds': round(time.process_time() - cpu_start, 3),
+        'worker_cpu_seconds': round(children_cpu_seconds() - children_start, 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    return value
+
+
+def run_build_stages(cmif_file: Path, coords_file: Path, output_file: Path,
+                     workers: str = '') -> dict:
+    """parse -> enrich -> write im aktuellen Prozess, dazu parse je Worker-Zahl."""
+    from build_hsa_data import enrich_with_coordinates, load_coordinates, parse_cmif
+    from hsa_output import write_json
+
+    results = {}
+    data = timed(results, 'parse', parse_cmif, cmif_file)
+    for count in (int(w) for w in workers.split(',') if w):
+        timed(results, f'parse/{count}', parse_cmif, cmif_file, False, count)
+    coordinates = load_coordinates(coords_file)
+    timed(results, 'enrich', enrich_with_coordinates, data, coordinates)
+
+    timed(results, 'write', write_json, data, output_file)
+    results['write']['output_bytes'] = output_file.stat().st_size
+    return results
+
+
+def run_analyze_stage(cmif_file: Path) -> dict:
+    """analyze_cmif im aktuellen Prozess."""
+    from analyze_hsa_cmif import analyze_cmif
+
+    results = {}
+    timed(results, 'analyze', analyze_cmif, cmif_file)
+    return results
+
+
+def run_child(mode: str, *paths: Path) -> dict:
+    """Startet eine Messung in einem frischen Interpreter und liest deren JSON."""
+    completed = subprocess.run(
+        [sys.executable, str(SCRIPT), '--child', mode, *map(str, paths)],
+        check=True, capture_output=True, text=True, cwd=SCRIPT.parent
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def benchmark_size(size: int, work_dir: Path, seed: int, workers: list = ()) -> dict:
+    """Generiert (falls noetig) und misst einen Korpus."""
+    cmif_file = work_dir / f"synthetic-{size}-{seed}.xml"
+    coords_file = cmif_file.with_suffix('.coordinates.json')
+    output_file = cmif_file.with_suffix('.json')
+
+    if not (cmif_file.exists() and coords_file.exists()):
+        print(f"Generiere {cmif_file.name}...")
+        generate_cmif(cmif_file, size, seed=seed)
+
+    print(f"Messe {size} Briefe...")
+    stages = run_child('build', cmif_file, coords_file, output_file,
+                       ','.join(map(str, workers)))
+    stages.update(run_child('analyze', cmif_file))
+    output_file.unlink()
+    return {
+        'letters': size,
+        'cmif_bytes': cmif_file.stat().st_size,
+        'stages': stages
+    }
+
+
+def print_report(results: list):
+    print("\n" + "="*72)
+    print("PIPELINE-BENCHMARK")
+    print("="*72)
+    print(f"{'Briefe':>10} {'Stufe':<8} {'Zeit (s)':>10} {'CPU (s)':>8} {'Worker (s)':>10} "
+          f"{'Briefe/s':>12} {'Peak RSS (MB)':>14} {'Output (MB)':>12}")
+    for result in results:
+        for stage, values in result['stages'].items():
+            rate = result['letters'] / values['seconds'] if values['seconds'] else 0
+            output = values.get('output_bytes')
+            output = f"{output / 1024 / 1024:.1f}" if output else ''
+            print(f"{result['letters']:>10} {stage:<8} {values['seconds']:>10.2f} "
+                  f"{values['cpu_seconds']:>8.2f} {values['worker_cpu_seconds']:>10.2f} "
+                  f"{rate:>12,.0f} {values['peak_rss_mb']:>14.1f} {output:>12}")
+        print(f"{'':>10} CMIF: {result['cmif_bytes'] / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Skalierungs-Benchmark der HSA-Pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Korpusgroessen in Briefen')
+    parser.add_argument('--work-dir', type=Path, default=None,
+                        help='Verzeichnis fuer generierte Dateien (Default: Temp-Verzeichnis)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--results', type=Path, default=None,
+                        help='Ergebnisse zusaetzlich als JSON schreiben')
+    parser.add_argument('--workers', type=int, nargs='+', default=[],
+                        help='parse zusaetzlich mit diesen Worker-Zahlen messen')
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, *paths = args.child
+        if mode == 'build':
+            results = run_build_stages(*map(Path, paths[:3]), *paths[3:])
+        else:
+            results = run_analyze_stage(Path(paths[0]))
+        print(json.dumps(results))
+        return
+
+    work_dir = args.work_dir or Path(tempfile.gettempdir()) / 'hsa-benchmark'
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    results = [benchmark_size(size, work_dir, args.seed, args.workers) for size in args.sizes]
+    print_report(results)
+
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'cpus': os.cpu_count(),
+                'seed': args.seed,
+                'results': results
+            }, f, indent=2)
+        print(f"\nErgebnisse: {args.results}")
+
+
+if __name__ == '__main__':
+    main()
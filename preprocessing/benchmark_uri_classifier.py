@@ -0,0 +1,122 @@
+"""
+Micro-Benchmark fuer die Authority-URI-Klassifikation
+
+Vergleicht die fruehere Substring-Kette (extract_id_from_uri vor cmif_uri.py)
+mit dem Klassifikator aus cmif_uri.py, jeweils ohne und mit Cache. Die
+Erkennung ist dieselbe Kette mit vorkompilierten ID-Regexen; der Gewinn
+stammt aus dem lru_cache.
+Die URI-Mischung bildet die Wiederholungsrate im HSA-CMIF nach:
+wenige tausend verschiedene URIs, jeweils vielfach referenziert.
+
+Ausgabe: URIs/s vorher und nachher
+"""
+
+import argparse
+import random
+import re
+import time
+
+import cmif_uri
+
+
+def legacy_extract_id_from_uri(uri: str) -> tuple:
+    """Fruehere Implementierung aus build_hsa_data.py (Referenz)."""
+    if not uri:
+        return None, None
+
+    if 'viaf.org' in uri:
+        match = re.search(r'viaf/(\d+)', uri)
+        return (match.group(1), 'viaf') if match else (None, 'viaf')
+
+    if 'geonames.org' in uri:
+        match = re.search(r'geonames\.org/(\d+)', uri)
+        return (match.group(1), 'geonames') if match else (None, 'geonames')
+
+    if 'hsa.subjects' in uri:
+        match = re.search(r'#S\.(\d+)', uri)
+        return (match.group(1), 'hsa_subject') if match else (None, 'hsa_subject')
+
+    if 'hsa.languages' in uri:
+        match = re.search(r'#L\.(\d+)', uri)
+        return (match.group(1), 'hsa_language') if match else (None, 'hsa_language')
+
+    if 'lexvo.org' in uri:
+        match = re.search(r'iso639-3/(\w+)', uri)
+        return (match.group(1), 'lexvo') if match else (None, 'lexvo')
+
+    if 'schuchardt.uni-graz.at/id/person' in uri:
+        match = re.search(r'person/(\d+)', uri)
+        return (match.group(1), 'hsa_person') if match else (None, 'hsa_person')
+
+    if 'd-nb.info/gnd' in uri:
+        match = re.search(r'gnd/(\d+X?)', uri)
+        return (match.group(1), 'gnd') if match else (None, 'gnd')
+
+    return uri, 'unknown'
+
+
+def build_uri_sample(total: int, distinct: int, seed: int = 42) -> list:
+    """Erzeugt eine URI-Folge mit realistischer Wiederholungsrate."""
+    rng = random.Random(seed)
+    templates = [
+        'http://viaf.org/viaf/{}',
+        'https://sws.geonames.org/{}',
+        'http://www.geonames.org/{}',
+        'https://gams.uni-graz.at/o:hsa.subjects#S.{}',
+        'https://gams.uni-graz.at/o:hsa.languages#L.{}',
+        'http://lexvo.org/id/iso639-3/deu',
+        'https://schuchardt.uni-graz.at/id/person/{}',
+        'https://d-nb.info/gnd/{}X',
+        'https://example.org/unknown/{}',
+        '',
+    ]
+    weights = [40, 20, 10, 12, 4, 2, 6, 3, 2, 1]
+    pool = [
+        rng.choices(templates, weights)[0].format(rng.randint(1, 10**8))
+        for _ in range(distinct)
+    ]
+    # Zipf-aehnliche Verteilung: wenige URIs sehr haeufig
+    return [pool[min(int(rng.paretovariate(1.2)) - 1, distinct - 1)] for _ in range(total)]
+
+
+def measure(func, uris: list) -> float:
+    """Liefert URIs/s fuer einen Durchlauf ueber die Stichprobe."""
+    start = time.perf_counter()
+    for uri in uris:
+        func(uri)
+    return len(uris) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark der URI-Klassifikation')
+    parser.add_argument('--total', type=int, default=500000, help='Anzahl Aufrufe')
+    parser.add_argument('--distinct', type=int, default=5000, help='Anzahl verschiedener URIs')
+    args = parser.parse_args()
+
+    uris = build_uri_sample(args.total, args.distinct)
+
+    # Beide Implementierungen muessen dieselben Ergebnisse liefern
+    mismatches = [u for u in set(uris)
+                  if legacy_extract_id_from_uri(u) != cmif_uri.extract_id_from_uri(u)]
+    if mismatches:
+        print(f"Abweichende Ergebnisse fuer {len(mismatches)} URIs, z.B. {mismatches[:3]}")
+
+    legacy_rate = measure(legacy_extract_id_from_uri, uris)
+
+    cmif_uri.extract_id_from_uri.cache_clear()
+    uncached_rate = measure(cmif_uri.extract_id_from_uri.__wrapped__, uris)
+
+    cmif_uri.extract_id_from_uri.cache_clear()
+    cached_rate = measure(cmif_uri.extract_id_from_uri, uris)
+    info = cmif_uri.extract_id_from_uri.cache_info()
+
+    print(f"URIs: {args.total} ({args.distinct} verschiedene)")
+    print(f"Vorher (Substring-Kette):     {legacy_rate:12,.0f} URIs/s")
+    print(f"cmif_uri, ohne Cache:         {uncached_rate:12,.0f} URIs/s")
+    print(f"cmif_uri, mit Cache:          {cached_rate:12,.0f} URIs/s")
+    print(f"Speedup: {cached_rate / legacy_rate:.1f}x "
+          f"(Cache-Treffer: {info.hits / (info.hits + info.misses) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,68 +9,83 @@ Output: docs/data/hsa-letters.json
 
 from lxml import etree
 from pathlib import Path
-from collections import defaultdict
 from datetime import datetime
+import argparse
+import gc
+import hashlib
 import json
-import re
+import os
+import sys
+
+from cmif_uri import extract_id_from_uri
+from hsa_output import (
+    BROTLI_AVAILABLE, BROTLI_QUALITY, verify_binary_roundtrip, write_binary, write_compact,
+    write_json, write_json_stream, write_precompressed, write_sharded
+)
+from hsa_cache import cache_key, load_cached, store_cached
+from hsa_clusters import build_clusters, write_clusters
+from hsa_intervals import date_bounds
+from hsa_network import NetworkBuilder, build_network, write_network
+from hsa_persons import PersonResolver, resolve_persons, write_persons
+from hsa_places import PlaceTable
+from hsa_postings import PostingsBuilder, build_postings, write_postings
+from hsa_profile import PROFILE_MODES, StageProfiler
+from hsa_records import Interner, Letter
+from hsa_scan import (
+    SHARD_BYTES, SkeletonParser, map_ranges, open_cmif, parse_raw_letter, scan_range, syntax_error
+)
+from hsa_search import SearchBuilder, build_search, write_search
+from hsa_sqlite import SqliteWriter, write_sqlite
+from hsa_stats import accumulate, merge_accumulators, new_accumulators
 
 
 NS = {'tei': 'http://www.tei-c.org/ns/1.0'}
 
+# Bei Aenderungen an extract_letter erhoehen, damit inkrementelle Builds
+# alle Briefe neu extrahieren
+FINGERPRINT_VERSION = 2
+# Erhoehen bei Aenderungen an extract_letter, den Indices oder den
+# Akkumulatoren, damit --cache nicht veraltete Briefe liefert
+EXTRACTOR_VERSION = 3
 
-def extract_id_from_uri(uri: str) -> tuple:
-    """Extrahiert ID und Typ aus einer URI."""
-    if not uri:
-        return None, None
-
-    # VIAF
-    if 'viaf.org' in uri:
-        match = re.search(r'viaf/(\d+)', uri)
-        return (match.group(1), 'viaf') if match else (None, 'viaf')
-
-    # GeoNames
-    if 'geonames.org' in uri:
-        match = re.search(r'geonames\.org/(\d+)', uri)
-        return (match.group(1), 'geonames') if match else (None, 'geonames')
-
-    # HSA Subjects
-    if 'hsa.subjects' in uri:
-        match = re.search(r'#S\.(\d+)', uri)
-        return (match.group(1), 'hsa_subject') if match else (None, 'hsa_subject')
-
-    # HSA Languages
-    if 'hsa.languages' in uri:
-        match = re.search(r'#L\.(\d+)', uri)
-        return (match.group(1), 'hsa_language') if match else (None, 'hsa_language')
-
-    # Lexvo
-    if 'lexvo.org' in uri:
-        match = re.search(r'iso639-3/(\w+)', uri)
-        return (match.group(1), 'lexvo') if match else (None, 'lexvo')
 
-    # HSA internal person
-    if 'schuchardt.uni-graz.at/id/person' in uri:
-        match = re.search(r'person/(\d+)', uri)
-        return (match.group(1), 'hsa_person') if match else (None, 'hsa_person')
+# Tags in Clark-Notation fuer den Vergleich mit element.tag beim Durchlauf
+TEI = f"{{{NS['tei']}}}"
+CORRESP_DESC = f"{TEI}correspDesc"
+CORRESP_ACTION = f"{TEI}correspAction"
+PERS_NAME = f"{TEI}persName"
+PLACE_NAME = f"{TEI}placeName"
+DATE = f"{TEI}date"
+NOTE = f"{TEI}note"
+REF = f"{TEI}ref"
 
-    return uri, 'unknown'
+# Reihenfolge entscheidet, wenn ein type-Attribut mehrere Begriffe enthaelt
+METADATA_TYPES = ['mentionsSubject', 'mentionsPlace', 'mentionsPerson', 'hasLanguage']
+METADATA_TYPE_CACHE_SIZE = 1024
+_metadata_type_cache = {}
 
 
 def get_metadata_type(type_attr: str) -> str:
-    """Extrahiert den Metadaten-Typ aus dem type-Attribut."""
-    if not type_attr:
-        return None
+    """Extrahiert den Metadaten-Typ aus dem type-Attribut.
 
-    if 'mentionsSubject' in type_attr:
-        return 'mentionsSubject'
-    if 'mentionsPlace' in type_attr:
-        return 'mentionsPlace'
-    if 'mentionsPerson' in type_attr:
-        return 'mentionsPerson'
-    if 'hasLanguage' in type_attr:
-        return 'hasLanguage'
+    Ein Korpus verwendet nur eine Handvoll type-URIs; das Ergebnis der
+    Substring-Pruefung wird je Attributwert in einer Tabelle gehalten.
+    """
+    try:
+        return _metadata_type_cache[type_attr]
+    except KeyError:
+        pass
+
+    meta_type = None
+    if type_attr:
+        for candidate in METADATA_TYPES:
+            if candidate in type_attr:
+                meta_type = candidate
+                break
 
-    return None
+    if len(_metadata_type_cache) < METADATA_TYPE_CACHE_SIZE:
+        _metadata_type_cache[type_attr] = meta_type
+    return meta_type
 
 
 def extract_date_info(date_elem) -> dict:
@@ -81,6 +96,8 @@ def extract_date_info(date_elem) -> dict:
     - from/to: Zeitraum
     - notBefore/notAfter: Terminus post/ante quem
     - cert: Sicherheitsgrad (high/medium/low)
+
+    dateBounds sind die Tagesnummern [earliest, latest] (siehe hsa_intervals.py).
     """
     if date_elem is None:
         return {
@@ -88,7 +105,8 @@ def extract_date_info(date_elem) -> dict:
             'dateTo': None,
             'year': None,
             'datePrecision': 'unknown',
-            'dateCertainty': 'high'
+            'dateCertainty': 'high',
+            'dateBounds': None
         }
 
     when = date_elem.get('when', '')
@@ -129,253 +147,550 @@ def extract_date_info(date_elem) -> dict:
         'dateTo': date_to,
         'year': year,
         'datePrecision': precision,
-        'dateCertainty': cert
+        'dateCertainty': cert,
+        'dateBounds': date_bounds(when, from_date, to_date, not_before, not_after)
     }
 
 
-def parse_cmif(file_path: Path) -> dict:
-    """Parst die CMIF-Datei und erzeugt Frontend-taugliche Datenstruktur."""
+def new_indices() -> dict:
+    """Erzeugt leere Indices fuer Personen, Orte, Subjects und Sprachen."""
+    return {
+        'persons': {},    # {viaf_id: {name, letters_sent, letters_received}}
+        'places': {},     # {geonames_id: {name, lat, lon}}
+        'subjects': {},   # {uri: {label, category}}
+        'languages': {}   # {code: label}
+    }
 
-    print(f"Parsing {file_path}...")
-    tree = etree.parse(str(file_path))
-    root = tree.getroot()
 
-    # Datenstrukturen
-    letters = []
-    persons_index = {}  # {viaf_id: {name, letters_sent, letters_received}}
-    places_index = {}   # {geonames_id: {name, lat, lon}}
-    subjects_index = {} # {uri: {label, category}}
-    languages_index = {} # {code: label}
+def extract_person(pers_elem) -> dict:
+    """Person aus einem persName-Element (Sender oder Empfaenger)."""
+    auth_id, auth_type = extract_id_from_uri(pers_elem.get('ref', ''))
+    return {
+        'name': pers_elem.text or '',
+        'id': auth_id,
+        'authority': auth_type
+    }
 
-    # Alle correspDesc durchgehen
-    for corresp in root.findall('.//tei:correspDesc', NS):
-        letter_url = corresp.get('ref', '')
-        letter_id = letter_url.split('/')[-1] if letter_url else ''
-
-        letter = {
-            'id': letter_id,
-            'url': letter_url,
-            'sender': None,
-            'recipient': None,
-            'date': None,
-            'dateTo': None,
-            'year': None,
-            'datePrecision': 'unknown',
-            'dateCertainty': 'high',
-            'place_sent': None,
-            'language': None,
-            'mentions': {
-                'subjects': [],
-                'persons': [],
-                'places': []
-            }
-        }
 
-        # Sender
-        sent_action = corresp.find('.//tei:correspAction[@type="sent"]', NS)
-        if sent_action is not None:
-            sender_elem = sent_action.find('tei:persName', NS)
-            if sender_elem is not None:
-                name = sender_elem.text or ''
-                ref = sender_elem.get('ref', '')
-                auth_id, auth_type = extract_id_from_uri(ref)
-
-                letter['sender'] = {
-                    'name': name,
-                    'id': auth_id,
-                    'authority': auth_type
-                }
+def _unshared(value):
+    return value
+
+
+def extract_letter(corresp, interner: Interner = None) -> Letter:
+    """Extrahiert einen Brief-Datensatz aus einem correspDesc-Element.
+
+    Der correspDesc wird einmal durchlaufen und nach Tag und type
+    verzweigt, statt je Feld einen eigenen Pfad auszuwerten. Wie bisher
+    zaehlt die erste correspAction je type (auch verschachtelt), darin das
+    jeweils erste persName, placeName und date sowie die erste note
+    direkt unter correspDesc.
 
-                # Person zum Index hinzufügen
-                if auth_id and auth_type == 'viaf':
-                    if auth_id not in persons_index:
-                        persons_index[auth_id] = {
-                            'name': name,
-                            'viaf': auth_id,
-                            'letters_sent': 0,
-                            'letters_received': 0
-                        }
-                    persons_index[auth_id]['letters_sent'] += 1
-
-            # Absende-Ort
-            place_elem = sent_action.find('tei:placeName', NS)
-            if place_elem is not None:
-                place_name = place_elem.text or ''
-                ref = place_elem.get('ref', '')
-                geo_id, _ = extract_id_from_uri(ref)
-
-                letter['place_sent'] = {
-                    'name': place_name,
+    Mit interner teilen sich die Briefe eines Laufs gleiche Personen, Orte,
+    Subjects, Sprachen und Datums-Strings (hsa_records.py).
+    """
+    share = interner if interner is not None else _unshared
+    intern = Interner.string if interner is not None else _unshared
+
+    letter_url = corresp.get('ref', '')
+    letter_id = letter_url.split('/')[-1] if letter_url else ''
+    letter = Letter(letter_id, letter_url)
+
+    sent_action = recv_action = note = None
+    for elem in corresp.iter(CORRESP_ACTION, NOTE):
+        if elem.tag == CORRESP_ACTION:
+            action_type = elem.get('type')
+            if action_type == 'sent' and sent_action is None:
+                sent_action = elem
+            elif action_type == 'received' and recv_action is None:
+                recv_action = elem
+        elif note is None and elem.getparent() is corresp:
+            note = elem
+
+    # Sender, Absende-Ort und Datum
+    if sent_action is not None:
+        sender_elem = place_elem = date_elem = None
+        for child in sent_action:
+            tag = child.tag
+            if tag == PERS_NAME:
+                if sender_elem is None:
+                    sender_elem = child
+            elif tag == PLACE_NAME:
+                if place_elem is None:
+                    place_elem = child
+            elif tag == DATE:
+                if date_elem is None:
+                    date_elem = child
+
+        if sender_elem is not None:
+            letter.sender = share(extract_person(sender_elem))
+
+        if place_elem is not None:
+            geo_id, _ = extract_id_from_uri(place_elem.get('ref', ''))
+            letter.place_sent = share({
+                'name': place_elem.text or '',
+                'geonames_id': geo_id
+            })
+
+        # Datum mit Praezision
+        date_info = extract_date_info(date_elem)
+        letter.date = intern(date_info['date'])
+        letter.dateTo = intern(date_info['dateTo'])
+        letter.year = date_info['year']
+        letter.datePrecision = date_info['datePrecision']
+        letter.dateCertainty = intern(date_info['dateCertainty'])
+        letter.dateBounds = date_info['dateBounds']
+
+    # Empfänger
+    if recv_action is not None:
+        for child in recv_action.iterchildren(PERS_NAME):
+            letter.recipient = share(extract_person(child))
+            break
+
+    # Metadaten aus note
+    if note is not None:
+        mentions = letter.mentions
+        for ref_elem in note.iterchildren(REF):
+            target = ref_elem.get('target', '')
+            label = ref_elem.text or ''
+
+            meta_type = get_metadata_type(ref_elem.get('type', ''))
+
+            if meta_type == 'hasLanguage':
+                letter.language = share({
+                    'code': target,
+                    'label': label
+                })
+
+            elif meta_type == 'mentionsSubject':
+                _, subj_type = extract_id_from_uri(target)
+                mentions.subjects.append(share({
+                    'uri': target,
+                    'label': label,
+                    'category': subj_type
+                }))
+
+            elif meta_type == 'mentionsPlace':
+                geo_id, _ = extract_id_from_uri(target)
+                mentions.places.append(share({
+                    'name': label,
                     'geonames_id': geo_id
+                }))
+
+            elif meta_type == 'mentionsPerson':
+                pers_id, pers_type = extract_id_from_uri(target)
+                mentions.persons.append(share({
+                    'name': label,
+                    'id': pers_id,
+                    'authority': pers_type
+                }))
+
+    return letter
+
+
+def add_letter_to_indices(indices: dict, letter: dict):
+    """Traegt Personen, Orte, Subjects und Sprache eines Briefs in die Indices ein."""
+    persons_index = indices['persons']
+
+    # Personen zum Index hinzufügen (nur VIAF)
+    for role, counter in (('sender', 'letters_sent'), ('recipient', 'letters_received')):
+        person = letter[role]
+        if person and person['id'] and person['authority'] == 'viaf':
+            auth_id = person['id']
+            if auth_id not in persons_index:
+                persons_index[auth_id] = {
+                    'name': person['name'],
+                    'viaf': auth_id,
+                    'letters_sent': 0,
+                    'letters_received': 0
                 }
+            persons_index[auth_id][counter] += 1
+
+    # Ort zum Index hinzufügen
+    place = letter['place_sent']
+    if place and place['geonames_id']:
+        geo_id = place['geonames_id']
+        if geo_id not in indices['places']:
+            indices['places'][geo_id] = {
+                'name': place['name'],
+                'geonames_id': geo_id,
+                'letter_count': 0
+            }
+        indices['places'][geo_id]['letter_count'] += 1
+
+    if letter['language']:
+        code = letter['language']['code']
+        if code not in indices['languages']:
+            indices['languages'][code] = letter['language']['label']
+
+    for subject in letter['mentions']['subjects']:
+        uri = subject['uri']
+        if uri not in indices['subjects']:
+            indices['subjects'][uri] = {
+                'label': subject['label'],
+                'category': subject['category'],
+                'count': 0
+            }
+        indices['subjects'][uri]['count'] += 1
 
-                # Ort zum Index hinzufügen
-                if geo_id:
-                    if geo_id not in places_index:
-                        places_index[geo_id] = {
-                            'name': place_name,
-                            'geonames_id': geo_id,
-                            'letter_count': 0
-                        }
-                    places_index[geo_id]['letter_count'] += 1
-
-            # Datum mit Praezision
-            date_elem = sent_action.find('tei:date', NS)
-            date_info = extract_date_info(date_elem)
-            letter['date'] = date_info['date']
-            letter['dateTo'] = date_info['dateTo']
-            letter['year'] = date_info['year']
-            letter['datePrecision'] = date_info['datePrecision']
-            letter['dateCertainty'] = date_info['dateCertainty']
-
-        # Empfänger
-        recv_action = corresp.find('.//tei:correspAction[@type="received"]', NS)
-        if recv_action is not None:
-            recipient_elem = recv_action.find('tei:persName', NS)
-            if recipient_elem is not None:
-                name = recipient_elem.text or ''
-                ref = recipient_elem.get('ref', '')
-                auth_id, auth_type = extract_id_from_uri(ref)
-
-                letter['recipient'] = {
-                    'name': name,
-                    'id': auth_id,
-                    'authority': auth_type
-                }
 
-                # Person zum Index hinzufügen
-                if auth_id and auth_type == 'viaf':
-                    if auth_id not in persons_index:
-                        persons_index[auth_id] = {
-                            'name': name,
-                            'viaf': auth_id,
-                            'letters_sent': 0,
-                            'letters_received': 0
-                        }
-                    persons_index[auth_id]['letters_received'] += 1
-
-        # Metadaten aus note
-        note = corresp.find('tei:note', NS)
-        if note is not None:
-            for ref_elem in note.findall('tei:ref', NS):
-                type_attr = ref_elem.get('type', '')
-                target = ref_elem.get('target', '')
-                label = ref_elem.text or ''
-
-                meta_type = get_metadata_type(type_attr)
-
-                if meta_type == 'hasLanguage':
-                    letter['language'] = {
-                        'code': target,
-                        'label': label
-                    }
-                    if target not in languages_index:
-                        languages_index[target] = label
-
-                elif meta_type == 'mentionsSubject':
-                    subj_id, subj_type = extract_id_from_uri(target)
-                    letter['mentions']['subjects'].append({
-                        'uri': target,
-                        'label': label,
-                        'category': subj_type
-                    })
-                    if target not in subjects_index:
-                        subjects_index[target] = {
-                            'label': label,
-                            'category': subj_type,
-                            'count': 0
-                        }
-                    subjects_index[target]['count'] += 1
-
-                elif meta_type == 'mentionsPlace':
-                    geo_id, _ = extract_id_from_uri(target)
-                    letter['mentions']['places'].append({
-                        'name': label,
-                        'geonames_id': geo_id
-                    })
-
-                elif meta_type == 'mentionsPerson':
-                    pers_id, pers_type = extract_id_from_uri(target)
-                    letter['mentions']['persons'].append({
-                        'name': label,
-                        'id': pers_id,
-                        'authority': pers_type
-                    })
+def iter_correspdesc(file_path: Path):
+    """Liefert correspDesc-Elemente einzeln per iterparse.
+
+    Jedes Element wird nach der Verarbeitung geleert und zusammen mit
+    seinen Vorgaengern aus dem Baum entfernt, damit der Speicherbedarf
+    nur von der Groesse eines Briefs abhaengt.
+    """
+    context = etree.iterparse(str(file_path), events=('end',), tag=CORRESP_DESC)
+    for _, corresp in context:
+        yield corresp
+
+        corresp.clear(keep_tail=True)
+        parent = corresp.getparent()
+        if parent is not None:
+            while corresp.getprevious() is not None:
+                del parent[0]
+    del context
+
+
+def iter_letters(file_path: Path):
+    """Liefert die Brief-Datensaetze einer CMIF-Datei im Streaming-Modus."""
+    interner = Interner()
+    for corresp in iter_correspdesc(file_path):
+        yield extract_letter(corresp, interner)
+
+
+def merge_indices(target: dict, partial: dict):
+    """Fuehrt die Indices eines Shards in die Gesamt-Indices zusammen.
+
+    Shards muessen in Dokumentreihenfolge gemerged werden: Namen und Labels
+    stammen dann wie im seriellen Lauf aus dem ersten Vorkommen.
+    """
+    for auth_id, person in partial['persons'].items():
+        if auth_id in target['persons']:
+            target['persons'][auth_id]['letters_sent'] += person['letters_sent']
+            target['persons'][auth_id]['letters_received'] += person['letters_received']
+        else:
+            target['persons'][auth_id] = person
+
+    for geo_id, place in partial['places'].items():
+        if geo_id in target['places']:
+            target['places'][geo_id]['letter_count'] += place['letter_count']
+        else:
+            target['places'][geo_id] = place
+
+    for uri, subject in partial['subjects'].items():
+        if uri in target['subjects']:
+            target['subjects'][uri]['count'] += subject['count']
+        else:
+            target['subjects'][uri] = subject
+
+    for code, label in partial['languages'].items():
+        target['languages'].setdefault(code, label)
 
+
+def parse_range(file_path: Path, start: int, stop: int, wrapper: tuple) -> tuple:
+    """Parst einen Bytebereich der CMIF-Datei im Worker-Prozess.
+
+    Liefert Briefe, Teil-Indices, Teil-Akkumulatoren, das Skelett des
+    Bereichs und den ersten XML-Fehler (Argumente fuer syntax_error,
+    Zeile relativ zum Bereichsanfang) oder None.
+    """
+    letters = []
+    indices = new_indices()
+    accumulators = new_accumulators()
+    interner = Interner()
+    error = None
+    with open_cmif(file_path) as data:
+        raws, skeleton = scan_range(data, start, stop)
+    for line, raw in raws:
+        try:
+            corresp = parse_raw_letter(raw, line, wrapper)
+        except etree.XMLSyntaxError as e:
+            error = (e.msg, e.code, e.lineno, e.offset)
+            break
+        if corresp is None:
+            continue
+        letter = extract_letter(corresp, interner)
+        add_letter_to_indices(indices, letter)
+        accumulate(accumulators, letter)
         letters.append(letter)
+    return letters, indices, accumulators, skeleton, error
+
 
-    # Timeline berechnen
-    year_counts = defaultdict(int)
-    for letter in letters:
-        if letter['year']:
-            year_counts[letter['year']] += 1
+def parse_cmif_parallel(file_path: Path, workers: int, shard_bytes: int = SHARD_BYTES) -> tuple:
+    """Parst die CMIF-Datei in einem Prozess-Pool.
+
+    Die Worker suchen, parsen und extrahieren die Briefe ihres Bytebereichs
+    selbst (hsa_scan.py); der Hauptprozess legt nur die Bereichsgrenzen
+    fest, prueft die Skelette und fuehrt die Ergebnisse in
+    Dokumentreihenfolge zusammen.
+    """
+    letters = []
+    indices = new_indices()
+    accumulators = new_accumulators()
+    skeleton = SkeletonParser()
+
+    # Wie in hsa_cache.load_cached: beim Entpickeln der Worker-Ergebnisse
+    # kostet der Zyklus-GC ein Vielfaches der eigentlichen Ladezeit
+    gc.disable()
+    try:
+        for result in map_ranges(file_path, parse_range, workers, shard_bytes):
+            range_letters, range_indices, range_accumulators, range_skeleton, error = result
+            first_line = skeleton.line
+            skeleton.feed(range_skeleton)
+            if error is not None:
+                raise syntax_error(*error, first_line - 1)
+            letters.extend(range_letters)
+            merge_indices(indices, range_indices)
+            merge_accumulators(accumulators, range_accumulators)
+        skeleton.finish()
+    finally:
+        gc.enable()
+
+    return letters, indices, accumulators
+
+
+def build_meta(accumulators: list, indices: dict) -> dict:
+    """Erzeugt den meta-Block aus den Akkumulatoren und den Indices.
+
+    Die Grundstruktur legt die Schluesselreihenfolge fest; registrierte
+    Akkumulatoren fuellen ihre Werte ein oder haengen neue an.
+    """
+    meta = {
+        'generated': datetime.now().isoformat(),
+        'source': 'Hugo Schuchardt Archiv CMIF',
+        'source_file': 'data/hsa/CMIF.xml',
+        'total_letters': 0,
+        'unique_senders': 0,
+        'unique_recipients': 0,
+        'unique_places': len(indices['places']),
+        'unique_subjects': len(indices['subjects']),
+        'languages': len(indices['languages']),
+        'date_range': None,
+        'timeline': None,
+        'uncertainty': None
+    }
+    for accumulator in accumulators:
+        accumulator.contribute(meta)
+    return meta
 
-    timeline = [{'year': y, 'count': c} for y, c in sorted(year_counts.items())]
 
-    # Sprachverteilung
-    lang_counts = defaultdict(int)
-    for letter in letters:
-        if letter['language']:
-            lang_counts[letter['language']['code']] += 1
+def build_output(letters: list, indices: dict, accumulators: list = None) -> dict:
+    """Erzeugt die Output-Struktur.
 
-    # Unsicherheits-Statistiken
-    precision_counts = defaultdict(int)
-    certainty_counts = defaultdict(int)
-    for letter in letters:
-        precision_counts[letter['datePrecision']] += 1
-        certainty_counts[letter['dateCertainty']] += 1
-
-    imprecise_dates = (
-        precision_counts['year'] +
-        precision_counts['month'] +
-        precision_counts['range'] +
-        precision_counts['unknown']
-    )
+    Ohne accumulators (z.B. fuer bereits geladene Briefe) werden die
+    Statistiken in einem Durchlauf ueber letters berechnet.
+    """
+    if accumulators is None:
+        accumulators = new_accumulators()
+        for letter in letters:
+            accumulate(accumulators, letter)
 
-    # Output-Struktur
-    output = {
-        'meta': {
-            'generated': datetime.now().isoformat(),
-            'source': 'Hugo Schuchardt Archiv CMIF',
-            'source_file': 'data/hsa/CMIF.xml',
-            'total_letters': len(letters),
-            'unique_senders': len([p for p in persons_index.values() if p['letters_sent'] > 0]),
-            'unique_recipients': len([p for p in persons_index.values() if p['letters_received'] > 0]),
-            'unique_places': len(places_index),
-            'unique_subjects': len(subjects_index),
-            'languages': len(languages_index),
-            'date_range': {
-                'min': min((l['year'] for l in letters if l['year']), default=None),
-                'max': max((l['year'] for l in letters if l['year']), default=None)
-            },
-            'timeline': timeline,
-            'uncertainty': {
-                'date_precision': {
-                    'day': precision_counts['day'],
-                    'month': precision_counts['month'],
-                    'year': precision_counts['year'],
-                    'range': precision_counts['range'],
-                    'unknown': precision_counts['unknown']
-                },
-                'date_certainty': {
-                    'high': certainty_counts['high'],
-                    'medium': certainty_counts['medium'],
-                    'low': certainty_counts['low']
-                },
-                'imprecise_dates_total': imprecise_dates,
-                'imprecise_dates_pct': round(imprecise_dates / len(letters) * 100, 1) if letters else 0
-            }
-        },
+    return {
+        'meta': build_meta(accumulators, indices),
         'letters': letters,
-        'indices': {
-            'persons': persons_index,
-            'places': places_index,
-            'subjects': subjects_index,
-            'languages': languages_index
-        }
+        'indices': indices
+    }
+
+
+def parse_cmif(file_path: Path, streaming: bool = False, workers: int = 1) -> dict:
+    """Parst die CMIF-Datei und erzeugt Frontend-taugliche Datenstruktur.
+
+    Mit streaming=True wird die Datei per iterparse gelesen, ohne den
+    vollstaendigen DOM im Speicher zu halten. Mit workers > 1 werden die
+    Briefe in Shards auf mehrere Prozesse verteilt; der Output ist
+    identisch mit dem seriellen Lauf.
+    """
+
+    print(f"Parsing {file_path}...")
+    if workers > 1:
+        letters, indices, accumulators = parse_cmif_parallel(file_path, workers)
+        return build_output(letters, indices, accumulators)
+
+    if streaming:
+        corresps = iter_correspdesc(file_path)
+    else:
+        tree = etree.parse(str(file_path))
+        corresps = tree.getroot().iter(CORRESP_DESC)
+
+    letters = []
+    indices = new_indices()
+    accumulators = new_accumulators()
+    interner = Interner()
+
+    # Alle correspDesc durchgehen
+    for corresp in corresps:
+        letter = extract_letter(corresp, interner)
+        add_letter_to_indices(indices, letter)
+        accumulate(accumulators, letter)
+        letters.append(letter)
+
+    return build_output(letters, indices, accumulators)
+
+
+def letter_fingerprint(corresp) -> str:
+    """Berechnet einen Inhalts-Hash ueber die kanonische Form eines correspDesc."""
+    return hashlib.sha1(etree.tostring(corresp, method='c14n')).hexdigest()
+
+
+def remove_letter_from_indices(indices: dict, letter: dict):
+    """Nimmt die Beitraege eines Briefs aus den Indices zurueck.
+
+    Eintraege, deren Zaehler auf 0 faellt, werden entfernt. Sprachen haben
+    keinen Zaehler und werden in update_languages_index bereinigt.
+    """
+    persons_index = indices['persons']
+    for role, counter in (('sender', 'letters_sent'), ('recipient', 'letters_received')):
+        person = letter[role]
+        if person and person['id'] and person['authority'] == 'viaf':
+            entry = persons_index.get(person['id'])
+            if entry:
+                entry[counter] -= 1
+                if entry['letters_sent'] <= 0 and entry['letters_received'] <= 0:
+                    del persons_index[person['id']]
+
+    place = letter['place_sent']
+    if place and place['geonames_id']:
+        entry = indices['places'].get(place['geonames_id'])
+        if entry:
+            entry['letter_count'] -= 1
+            if entry['letter_count'] <= 0:
+                del indices['places'][place['geonames_id']]
+
+    for subject in letter['mentions']['subjects']:
+        entry = indices['subjects'].get(subject['uri'])
+        if entry:
+            entry['count'] -= 1
+            if entry['count'] <= 0:
+                del indices['subjects'][subject['uri']]
+
+
+def strip_enrichment(letter: dict):
+    """Entfernt lat/lon und Orts-Tabellen-Verweise aus einem Brief eines frueheren Builds.
+
+    Danach entspricht der Brief wieder dem Ergebnis von extract_letter; die
+    Anreicherung laeuft mit den aktuellen Koordinaten und Optionen neu.
+    """
+    places = [letter['place_sent']] if letter['place_sent'] else []
+    places.extend(letter['mentions']['places'])
+    for place in places:
+        place.pop('lat', None)
+        place.pop('lon', None)
+        place.pop('place', None)
+
+
+def update_languages_index(indices: dict, letters: list, removed: list):
+    """Entfernt Sprachen, die nach dem Loeschen von Briefen nicht mehr vorkommen."""
+    removed_codes = {l['language']['code'] for l in removed if l['language']}
+    if not removed_codes:
+        return
+    used_codes = {l['language']['code'] for l in letters if l['language']}
+    for code in removed_codes - used_codes:
+        indices['languages'].pop(code, None)
+
+
+def parse_cmif_incremental(file_path: Path, previous: dict = None,
+                           fingerprints: dict = None) -> tuple:
+    """Parst nur neue oder geaenderte Briefe gegenueber einem frueheren Build.
+
+    previous ist der zuvor geschriebene Output, fingerprints das Manifest
+    {ref: hash} dazu. Unveraenderte Briefe werden ohne die Anreicherung des
+    alten Builds (strip_enrichment) uebernommen und die Indices nur um die
+    Differenz aktualisiert; die Akkumulatoren laufen im selben Durchlauf
+    ueber alle Briefe mit. Ohne verwendbaren Vorgaenger-Build (fehlend oder
+    nicht eindeutige refs) wird vollstaendig geparst. Liefert (output, neue fingerprints, Statistik).
+    """
+    print(f"Parsing {file_path} (incremental)...")
+    fingerprints = fingerprints or {}
+    previous_letters = {}
+    if previous is not None:
+        previous_letters = {letter['url']: letter for letter in previous['letters']}
+        if '' in previous_letters or len(previous_letters) != len(previous['letters']):
+            print("Vorheriger Build hat leere oder doppelte refs, vollstaendiger Neuaufbau.")
+            previous = None
+            previous_letters = {}
+
+    indices = previous['indices'] if previous is not None else new_indices()
+    # Koordinaten des vorherigen Builds (auch solche, die aus der
+    # Koordinaten-Datei verschwunden sind) nicht uebernehmen
+    for place in indices['places'].values():
+        place.pop('lat', None)
+        place.pop('lon', None)
+    accumulators = new_accumulators()
+    letters = []
+    new_fingerprints = {}
+    interner = Interner()
+    added = []
+    removed = []
+    unchanged = 0
+
+    for corresp in iter_correspdesc(file_path):
+        ref = corresp.get('ref', '')
+        fingerprint = letter_fingerprint(corresp)
+        old = previous_letters.pop(ref, None)
+
+        if old is not None and fingerprints.get(ref) == fingerprint:
+            letter = old
+            strip_enrichment(letter)
+            unchanged += 1
+        else:
+            if old is not None:
+                remove_letter_from_indices(indices, old)
+                removed.append(old)
+            letter = extract_letter(corresp, interner)
+            add_letter_to_indices(indices, letter)
+            added.append(letter)
+
+        if ref:
+            new_fingerprints[ref] = fingerprint
+        accumulate(accumulators, letter)
+        letters.append(letter)
+
+    # Geloeschte Briefe
+    for old in previous_letters.values():
+        remove_letter_from_indices(indices, old)
+        removed.append(old)
+
+    update_languages_index(indices, letters, removed)
+    output = build_output(letters, indices, accumulators)
+
+    stats = {
+        'unchanged': unchanged,
+        'extracted': len(added),
+        'deleted': len(previous_letters)
     }
+    return output, new_fingerprints, stats
+
+
+def fingerprints_path(output_file: Path) -> Path:
+    """Pfad des Fingerprint-Manifests neben der Output-Datei."""
+    return output_file.with_suffix('.fingerprints.json')
+
+
+def load_previous_build(output_file: Path) -> tuple:
+    """Laedt den vorherigen Output und sein Fingerprint-Manifest, falls vorhanden."""
+    manifest_file = fingerprints_path(output_file)
+    if not output_file.exists() or not manifest_file.exists():
+        return None, None
+
+    with open(output_file, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != FINGERPRINT_VERSION:
+        return None, None
+    return previous, manifest['fingerprints']
 
-    return output
+
+def write_fingerprints(output_file: Path, fingerprints: dict):
+    """Schreibt das Fingerprint-Manifest {ref: hash} neben die Output-Datei."""
+    manifest = {
+        'version': FINGERPRINT_VERSION,
+        'fingerprints': fingerprints
+    }
+    with open(fingerprints_path(output_file), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
 
 
 def load_coordinates(coords_file: Path) -> dict:
@@ -391,13 +706,28 @@ def load_coordinates(coords_file: Path) -> dict:
     return data.get('coordinates', {})
 
 
-def enrich_with_coordinates(data: dict, coordinates: dict) -> dict:
-    """Reichert die Daten mit Koordinaten an."""
+def enrich_letter(letter: dict, coordinates: dict):
+    """Ergaenzt place_sent und mentions.places eines Briefs um Koordinaten."""
+    if letter.get('place_sent') and letter['place_sent'].get('geonames_id'):
+        geo_id = letter['place_sent']['geonames_id']
+        if geo_id in coordinates:
+            letter['place_sent']['lat'] = coordinates[geo_id]['lat']
+            letter['place_sent']['lon'] = coordinates[geo_id]['lon']
+
+    # mentions.places anreichern
+    for place in letter.get('mentions', {}).get('places', []):
+        geo_id = place.get('geonames_id')
+        if geo_id and geo_id in coordinates:
+            place['lat'] = coordinates[geo_id]['lat']
+            place['lon'] = coordinates[geo_id]['lon']
+
+
+def enrich_places_index(meta: dict, indices: dict, coordinates: dict):
+    """Ergaenzt den Places-Index um Koordinaten und schreibt die Abdeckung in meta."""
     places_with_coords = 0
     places_without_coords = 0
 
-    # Places-Index anreichern
-    for geo_id, place_data in data['indices']['places'].items():
+    for geo_id, place_data in indices['places'].items():
         if geo_id in coordinates:
             place_data['lat'] = coordinates[geo_id]['lat']
             place_data['lon'] = coordinates[geo_id]['lon']
@@ -405,56 +735,436 @@ def enrich_with_coordinates(data: dict, coordinates: dict) -> dict:
         else:
             places_without_coords += 1
 
-    # Briefe anreichern (place_sent)
-    for letter in data['letters']:
-        if letter.get('place_sent') and letter['place_sent'].get('geonames_id'):
-            geo_id = letter['place_sent']['geonames_id']
-            if geo_id in coordinates:
-                letter['place_sent']['lat'] = coordinates[geo_id]['lat']
-                letter['place_sent']['lon'] = coordinates[geo_id]['lon']
-
-        # mentions.places anreichern
-        for place in letter.get('mentions', {}).get('places', []):
-            geo_id = place.get('geonames_id')
-            if geo_id and geo_id in coordinates:
-                place['lat'] = coordinates[geo_id]['lat']
-                place['lon'] = coordinates[geo_id]['lon']
-
     # Meta-Statistik aktualisieren
-    data['meta']['places_with_coordinates'] = places_with_coords
-    data['meta']['places_without_coordinates'] = places_without_coords
-    data['meta']['coordinate_coverage_pct'] = round(
+    meta['places_with_coordinates'] = places_with_coords
+    meta['places_without_coordinates'] = places_without_coords
+    meta['coordinate_coverage_pct'] = round(
         places_with_coords / (places_with_coords + places_without_coords) * 100, 1
     ) if (places_with_coords + places_without_coords) > 0 else 0
 
+
+def enrich_with_coordinates(data: dict, coordinates: dict) -> dict:
+    """Reichert die Daten mit Koordinaten an."""
+    enrich_places_index(data['meta'], data['indices'], coordinates)
+    for letter in data['letters']:
+        enrich_letter(letter, coordinates)
     return data
 
 
-def main():
-    base_dir = Path(__file__).parent.parent
-    cmif_file = base_dir / 'data' / 'hsa' / 'CMIF.xml'
-    coords_file = base_dir / 'data' / 'geonames_coordinates.json'
-    output_file = base_dir / 'docs' / 'data' / 'hsa-letters.json'
+def enrich_with_place_table(data: dict, coordinates: dict) -> dict:
+    """Wie enrich_with_coordinates, aber mit Orts-Tabelle statt Kopien je Brief."""
+    table = PlaceTable(coordinates)
+    for letter in data['letters']:
+        table.enrich_letter(letter)
+    table.enrich_places_index(data['meta'], data['indices'])
+    data['places'] = table.result()
+    return data
 
-    if not cmif_file.exists():
-        print(f"Datei nicht gefunden: {cmif_file}")
-        return
+
+def build_streaming(cmif_file: Path, output_file: Path, coordinates: dict,
+                    indent: int = None, builders: list = (), source: dict = None,
+                    place_table: bool = False) -> tuple:
+    """Parst, reichert an und schreibt Brief fuer Brief, ohne die Briefliste zu halten.
+
+    Im Speicher bleiben nur Indices und Zaehler sowie die Zustaende der
+    builders (Objekte mit add(letter), z.B. PostingsBuilder); meta und
+    indices werden nach dem letzten Brief geschrieben; source wie in
+    build_corpus(). Mit place_table folgt die Orts-Tabelle (hsa_places.py)
+    nach den indices. Liefert (meta, indices).
+    """
+    print(f"Parsing {cmif_file} (streaming output)...")
+    indices = new_indices()
+    accumulators = new_accumulators()
+    table = PlaceTable(coordinates) if place_table and coordinates else None
+    result = {}
+
+    def letters():
+        for letter in iter_letters(cmif_file):
+            add_letter_to_indices(indices, letter)
+            accumulate(accumulators, letter)
+            for builder in builders:
+                builder.add(letter)
+            if table:
+                table.enrich_letter(letter)
+            else:
+                enrich_letter(letter, coordinates)
+            yield letter
+
+    def trailer():
+        meta = build_meta(accumulators, indices)
+        if source:
+            meta.update(source)
+        if table:
+            table.enrich_places_index(meta, indices)
+        elif coordinates:
+            enrich_places_index(meta, indices, coordinates)
+        result['meta'] = meta
+        sections = {'meta': meta, 'indices': indices}
+        if table:
+            sections['places'] = table.result()
+        return sections
+
+    write_json_stream(letters(), trailer, output_file, indent=indent)
+    return result['meta'], indices
+
+
+def build_in_memory(args, cmif_file: Path, coords_file: Path, output_file: Path,
+                    profiler: StageProfiler = None) -> tuple:
+    """Parst (voll, parallel oder inkrementell) und reichert mit Koordinaten an.
+
+    Liefert (data, fingerprints); fingerprints ist nur bei --incremental gesetzt.
+    """
+    profiler = profiler or StageProfiler()
 
     # Parsen und konvertieren
-    data = parse_cmif(cmif_file)
+    fingerprints = None
+    with profiler.stage('parse') as stage:
+        if args.incremental:
+            previous, fingerprints = load_previous_build(output_file)
+            data, fingerprints, stats = parse_cmif_incremental(cmif_file, previous, fingerprints)
+            print(f"Unveraendert: {stats['unchanged']}, neu/geaendert: {stats['extracted']}, "
+                  f"geloescht: {stats['deleted']}")
+        else:
+            data = None
+            if args.cache:
+                key = cache_key(cmif_file, EXTRACTOR_VERSION)
+                data = load_cached(Path(args.cache), cmif_file, key)
+            if data is not None:
+                print(f"Geparste Briefe aus Cache geladen ({args.cache})")
+                data['meta']['generated'] = datetime.now().isoformat()
+            else:
+                workers = args.workers or os.cpu_count()
+                data = parse_cmif(cmif_file, streaming=args.stream, workers=workers)
+                if args.cache:
+                    store_cached(Path(args.cache), cmif_file, key, data)
+        stage['items'] = len(data['letters'])
 
     # Koordinaten laden und anreichern
     print("Loading coordinates...")
-    coordinates = load_coordinates(coords_file)
+    with profiler.stage('coordinates') as stage:
+        coordinates = load_coordinates(coords_file)
+        stage['items'] = len(coordinates)
     if coordinates:
         print(f"Found {len(coordinates)} coordinate entries")
-        data = enrich_with_coordinates(data, coordinates)
+        with profiler.stage('enrich', items=len(data['letters'])):
+            if args.place_table:
+                data = enrich_with_place_table(data, coordinates)
+            else:
+                data = enrich_with_coordinates(data, coordinates)
         print(f"Coordinate coverage: {data['meta']['coordinate_coverage_pct']}%")
 
-    # JSON schreiben
-    print(f"Writing {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    return data, fingerprints
+
+
+def add_build_arguments(parser: argparse.ArgumentParser):
+    """Optionen fuer Parsen und Artefakte (auch fuer batch_build.py)."""
+    parser.add_argument(
+        '--stream', action='store_true',
+        help='CMIF per iterparse lesen (konstanter Speicher pro Brief)'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Anzahl Prozesse fuer paralleles Parsen (0 = alle Kerne)'
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='Nur neue oder geaenderte Briefe neu extrahieren (Fingerprint-Manifest)'
+    )
+    parser.add_argument(
+        '--shards', choices=['years', 'size'],
+        help='Zusaetzlich Manifest + nachladbare Brief-Shards schreiben'
+    )
+    parser.add_argument(
+        '--shard-size', type=int, default=2000,
+        help='Briefe pro Shard bei --shards size'
+    )
+    parser.add_argument(
+        '--years-per-shard', type=int, default=5,
+        help='Jahre pro Shard bei --shards years'
+    )
+    parser.add_argument(
+        '--compact', action='store_true',
+        help='Zusaetzlich das kompakte, dictionary-kodierte Format schreiben'
+    )
+    parser.add_argument(
+        '--binary', action='store_true',
+        help='Zusaetzlich die Brief-Tabelle als Binaerdatei (.bin) schreiben'
+    )
+    parser.add_argument(
+        '--verify-binary', action='store_true',
+        help='Binaerdatei nach dem Schreiben zuruecklesen und mit dem JSON-Output vergleichen (Debugging)'
+    )
+    parser.add_argument(
+        '--precompress', action='store_true',
+        help='Zu jedem geschriebenen Artefakt .gz- und .br-Varianten erzeugen '
+             '(20k Briefe: ca. 2 s mit Brotli-Qualitaet 9, ca. 100 s mit 11)'
+    )
+    parser.add_argument(
+        '--brotli-quality', type=int, choices=range(12), default=BROTLI_QUALITY,
+        metavar='0-11',
+        help=f'Brotli-Qualitaet fuer --precompress (Default: {BROTLI_QUALITY}; '
+             '10 und 11 sind um ein Vielfaches langsamer)'
+    )
+    parser.add_argument(
+        '--postings', action='store_true',
+        help='Zusaetzlich invertierte Indices (Entitaet -> Brief-Ordinalzahlen) schreiben'
+    )
+    parser.add_argument(
+        '--network', action='store_true',
+        help='Zusaetzlich Korrespondenz-Kanten je Jahr und Ko-Erwaehnungs-Matrizen schreiben'
+    )
+    parser.add_argument(
+        '--search', action='store_true',
+        help='Zusaetzlich einen Suchindex (normalisierte Namen, Trigramme) schreiben'
+    )
+    parser.add_argument(
+        '--clusters', action='store_true',
+        help='Zusaetzlich Orts-Cluster je Zoomstufe fuer die Karte schreiben'
+    )
+    parser.add_argument(
+        '--resolve-persons', action='store_true',
+        help='Zusaetzlich Korrespondenzpartner ueber Authorities und Namen zu Personen zusammenfuehren'
+    )
+    parser.add_argument(
+        '--sqlite', action='store_true',
+        help='Zusaetzlich eine normalisierte SQLite-Datenbank (mit FTS5) schreiben'
+    )
+    parser.add_argument(
+        '--validate', action='store_true',
+        help='CMIF vor dem Build validieren (Bericht .validation.json, Abbruch bei Fehlern)'
+    )
+    parser.add_argument(
+        '--stream-output', action='store_true',
+        help='Briefe waehrend des Parsens schreiben, ohne den Output im Speicher aufzubauen'
+    )
+    parser.add_argument(
+        '--indent', type=int, default=None,
+        help='JSON eingerueckt schreiben (Default: kompakt fuer Produktions-Builds)'
+    )
+    parser.add_argument(
+        '--cache', metavar='DIR',
+        help='Geparste Briefe je CMIF-Inhalt zwischenspeichern und wiederverwenden'
+    )
+    parser.add_argument(
+        '--place-table', action='store_true',
+        help='Koordinaten einmal je Ort in einer Orts-Tabelle statt in jedem Brief speichern'
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='Zeit, CPU, Speicher und Durchsatz je Stufe messen (Bericht + .profile.json)'
+    )
+    parser.add_argument(
+        '--profile-stage',
+        help='Fuer diese Stufe zusaetzlich ein Detailprofil schreiben (z.B. parse, write)'
+    )
+    parser.add_argument(
+        '--profile-mode', choices=PROFILE_MODES, default='cprofile',
+        help='Art des Detailprofils fuer --profile-stage'
+    )
+
+
+def check_build_arguments(parser: argparse.ArgumentParser, args):
+    """Prueft Kombinationen, die add_build_arguments() nicht ausdruecken kann."""
+    if args.profile_stage and not args.profile:
+        parser.error('--profile-stage setzt --profile voraus')
+    if args.verify_binary and not args.binary:
+        parser.error('--verify-binary setzt --binary voraus')
+    if args.brotli_quality != BROTLI_QUALITY and not args.precompress:
+        parser.error('--brotli-quality setzt --precompress voraus')
+    if args.place_table and (args.shards or args.compact or args.binary):
+        parser.error('--place-table ist nicht mit --shards, --compact und --binary '
+                     'kombinierbar (diese Formate erwarten lat/lon im Brief)')
+    if args.cache and args.incremental:
+        parser.error('--cache und --incremental schliessen sich aus')
+    if args.stream_output and (args.incremental or args.shards or args.compact
+                               or args.binary or args.cache or args.workers != 1):
+        parser.error('--stream-output ist nur mit --indent, --postings, --network, '
+                     '--search, --clusters, --resolve-persons, --sqlite, --place-table, '
+                     '--validate und --precompress kombinierbar')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='HSA-CMIF zu JSON Pipeline')
+    add_build_arguments(parser)
+    args = parser.parse_args()
+    check_build_arguments(parser, args)
+    return args
+
+
+def build_corpus(args, cmif_file: Path, coords_file: Path, output_file: Path,
+                 source: dict = None) -> dict:
+    """Parst, reichert an und schreibt einen Korpus samt aller gewaehlten Artefakte.
+
+    source ueberschreibt 'source' und 'source_file' im meta-Block (Default:
+    HSA). Liefert den meta-Block.
+    """
+    profiler = StageProfiler(
+        enabled=args.profile, profile_stage=args.profile_stage,
+        mode=args.profile_mode, dump_prefix=output_file.with_suffix('')
+    )
+    stage = profiler.stage
+
+    if args.validate:
+        # Erst hier importiert: validate_cmif.py importiert seinerseits dieses Modul
+        from validate_cmif import CmifValidationError, print_summary, validate_cmif, write_report
+        print(f"Validating {cmif_file}...")
+        with stage('validate') as record:
+            report = validate_cmif(cmif_file, workers=args.workers or os.cpu_count())
+            record['items'] = report['letters']
+        report_file = write_report(report, output_file.with_suffix('.validation.json'))
+        print_summary(report)
+        if not report['valid']:
+            raise CmifValidationError(
+                f"{cmif_file}: {report['errors']} Fehler, Build abgebrochen (siehe {report_file})"
+            )
+
+    if args.stream_output:
+        print("Loading coordinates...")
+        with stage('coordinates') as record:
+            coordinates = load_coordinates(coords_file)
+            record['items'] = len(coordinates)
+        postings_builder = PostingsBuilder() if args.postings else None
+        network_builder = NetworkBuilder() if args.network else None
+        search_builder = SearchBuilder() if args.search else None
+        person_resolver = PersonResolver() if args.resolve_persons else None
+        sqlite_writer = (SqliteWriter(output_file.with_suffix('.sqlite'), coordinates)
+                         if args.sqlite else None)
+        builders = [b for b in (postings_builder, network_builder, search_builder,
+                                person_resolver, sqlite_writer) if b is not None]
+        # Parsen, Anreichern, Schreiben und Builder laufen verschraenkt
+        with stage('stream') as record:
+            meta, indices = build_streaming(cmif_file, output_file, coordinates,
+                                            indent=args.indent, builders=builders,
+                                            source=source, place_table=args.place_table)
+            record['items'] = meta['total_letters']
+        data = {'meta': meta, 'indices': indices}
+        total = meta['total_letters']
+        postings = network = search = persons = None
+        if postings_builder:
+            with stage('postings', items=total):
+                postings = postings_builder.result()
+        if network_builder:
+            with stage('network', items=total):
+                network = network_builder.result()
+        if search_builder:
+            with stage('search', items=total):
+                search = search_builder.result(data['indices'])
+        if person_resolver:
+            with stage('persons', items=total):
+                persons = person_resolver.result()
+        if sqlite_writer:
+            with stage('sqlite', items=total):
+                sqlite_file = sqlite_writer.close(meta)
+        if coordinates:
+            print(f"Coordinate coverage: {meta['coordinate_coverage_pct']}%")
+        artifacts = [output_file]
+    else:
+        data, fingerprints = build_in_memory(args, cmif_file, coords_file, output_file,
+                                             profiler)
+        if source:
+            data['meta'].update(source)
+        total = len(data['letters'])
+
+        # JSON schreiben
+        print(f"Writing {output_file}...")
+        with stage('write', items=total):
+            write_json(data, output_file, indent=args.indent)
+        artifacts = [output_file]
+        if fingerprints is not None:
+            write_fingerprints(output_file, fingerprints)
+        postings = network = search = persons = None
+        if args.postings:
+            with stage('postings', items=total):
+                postings = build_postings(data['letters'])
+        if args.network:
+            with stage('network', items=total):
+                network = build_network(data['letters'])
+        if args.search:
+            with stage('search', items=total):
+                search = build_search(data['letters'], data['indices'])
+        if args.resolve_persons:
+            with stage('persons', items=total):
+                persons = resolve_persons(data['letters'])
+        if args.sqlite:
+            with stage('sqlite', items=total):
+                sqlite_file = write_sqlite(data, output_file.with_suffix('.sqlite'))
+
+    if postings is not None:
+        with stage('write_postings'):
+            postings_file = write_postings(postings, output_file.with_suffix('.postings.json'))
+        print(f"Postings: {postings_file} ({postings_file.stat().st_size / 1024:.0f} KB)")
+        artifacts.append(postings_file)
+
+    if network is not None:
+        with stage('write_network'):
+            network_file = write_network(network, output_file.with_suffix('.network.json'))
+        print(f"Netzwerk: {network_file} ({len(network['correspondence']['edges'])} Kanten)")
+        artifacts.append(network_file)
+
+    if search is not None:
+        with stage('write_search'):
+            search_file = write_search(search, output_file.with_suffix('.search.json'))
+        print(f"Suchindex: {search_file} ({len(search['names'])} Namen, "
+              f"{len(search['grams'])} Tokens)")
+        artifacts.append(search_file)
+
+    if persons is not None:
+        with stage('write_persons'):
+            persons_file = write_persons(persons, output_file.with_suffix('.persons.json'))
+        stats = persons['stats']
+        print(f"Personen: {persons_file} ({stats['persons']} Personen aus {stats['nodes']} "
+              f"Schluesseln, {stats['merged']} zusammengefuehrt, {stats['rejected']} abgelehnt, "
+              f"{stats['ambiguous']} mehrdeutig)")
+        artifacts.append(persons_file)
+
+    if args.sqlite:
+        # Kein Web-Artefakt, daher nicht in artifacts (--precompress)
+        print(f"SQLite: {sqlite_file} ({sqlite_file.stat().st_size / 1024 / 1024:.1f} MB)")
+
+    if args.clusters:
+        with stage('clusters', items=len(data['indices']['places'])):
+            clusters = build_clusters(data['indices']['places'])
+            clusters_file = write_clusters(clusters, output_file.with_suffix('.clusters.json'))
+        print(f"Cluster: {clusters_file} ({clusters['places']} Orte, "
+              f"{len(clusters['zooms'][0]['clusters'])} Cluster auf Zoom 0)")
+        artifacts.append(clusters_file)
+
+    if args.shards:
+        shard_dir = output_file.with_suffix('')
+        with stage('shards', items=total):
+            manifest_file = write_sharded(
+                data, shard_dir, shard_by=args.shards,
+                shard_size=args.shard_size, years_per_shard=args.years_per_shard
+            )
+        print(f"Shards: {shard_dir} ({manifest_file.stat().st_size / 1024:.0f} KB Manifest)")
+        artifacts.extend(sorted(shard_dir.glob('*.json')))
+
+    if args.compact:
+        with stage('compact', items=total):
+            compact_file = write_compact(data, output_file.with_suffix('.compact.json'))
+        print(f"Kompakt: {compact_file} ({compact_file.stat().st_size / 1024 / 1024:.2f} MB)")
+        artifacts.append(compact_file)
+
+    if args.binary:
+        with stage('binary', items=total):
+            binary_file = write_binary(data, output_file.with_suffix('.bin'))
+            if args.verify_binary and not verify_binary_roundtrip(data, binary_file):
+                raise RuntimeError(f"Binaerdatei stimmt nicht mit dem JSON-Output ueberein: {binary_file}")
+        print(f"Binaer: {binary_file} ({binary_file.stat().st_size / 1024 / 1024:.2f} MB)")
+        artifacts.append(binary_file)
+
+    if args.precompress:
+        if not BROTLI_AVAILABLE:
+            print("Paket brotli nicht installiert, nur .gz-Varianten.")
+        with stage('precompress', items=len(artifacts)):
+            for artifact in artifacts:
+                write_precompressed(artifact, args.brotli_quality)
+        print(f"Vorkomprimiert: {len(artifacts)} Artefakte")
+
+    if args.profile:
+        profiler.print_report()
+        profile_file = profiler.write_json(output_file.with_suffix('.profile.json'))
+        print(f"Profil: {profile_file}")
 
     # Zusammenfassung
     print("\n" + "="*50)
@@ -480,6 +1190,26 @@ def main():
 
     print(f"\nOutput: {output_file}")
     print(f"Dateigroesse: {output_file.stat().st_size / 1024 / 1024:.2f} MB")
+    return data['meta']
+
+
+def main():
+    args = parse_args()
+    base_dir = Path(__file__).parent.parent
+    cmif_file = base_dir / 'data' / 'hsa' / 'CMIF.xml'
+    coords_file = base_dir / 'data' / 'geonames_coordinates.json'
+    output_file = base_dir / 'docs' / 'data' / 'hsa-letters.json'
+
+    if not cmif_file.exists():
+        print(f"Datei nicht gefunden: {cmif_file}")
+        return
+
+    # Wie in build_corpus erst hier importiert (gegenseitiger Import)
+    from validate_cmif import CmifValidationError
+    try:
+        build_corpus(args, cmif_file, coords_file, output_file)
+    except CmifValidationError as e:
+        sys.exit(str(e))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,46 @@
+"""
+Authority-URI-Klassifikation fuer CMIF
+
+Gemeinsamer Klassifikator fuer build_hsa_data.py und analyze_hsa_cmif.py.
+Die Erkennung ist die fruehere Substring-Kette (Marker in fester
+Reihenfolge, danach ein vorkompilierter ID-Regex). Der Geschwindigkeits-
+gewinn kommt fast vollstaendig aus dem lru_cache, da dieselben VIAF- und
+GeoNames-URIs tausendfach wiederkehren; ohne Cache bringen die
+vorkompilierten Regexe nur Faktor 1,5 bis 2 (benchmark_uri_classifier.py).
+Ein einzelner kombinierter Regex ueber alle Authorities war ohne Cache
+langsamer als die Kette und wurde deshalb nicht beibehalten.
+
+GND-URIs liefern (ID, 'gnd'); build_hsa_data.py gab sie frueher als
+(URI, 'unknown') weiter.
+"""
+
+from functools import lru_cache
+import re
+
+
+# (Marker in der URI, Authority-Typ, Regex fuer die ID); erster Treffer gilt
+AUTHORITIES = [
+    ('viaf.org', 'viaf', re.compile(r'viaf/(\d+)')),
+    ('geonames.org', 'geonames', re.compile(r'geonames\.org/(\d+)')),
+    ('hsa.subjects', 'hsa_subject', re.compile(r'#S\.(\d+)')),
+    ('hsa.languages', 'hsa_language', re.compile(r'#L\.(\d+)')),
+    ('lexvo.org', 'lexvo', re.compile(r'iso639-3/(\w+)')),
+    ('schuchardt.uni-graz.at/id/person', 'hsa_person', re.compile(r'person/(\d+)')),
+    ('d-nb.info/gnd', 'gnd', re.compile(r'gnd/(\d+X?)')),
+]
+
+CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def extract_id_from_uri(uri: str) -> tuple:
+    """Extrahiert ID und Typ aus einer URI."""
+    if not uri:
+        return None, None
+
+    for marker, authority, id_pattern in AUTHORITIES:
+        if marker in uri:
+            match = id_pattern.search(uri)
+            return (match.group(1) if match else None), authority
+
+    return uri, 'unknown'
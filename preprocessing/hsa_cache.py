@@ -0,0 +1,99 @@
+"""
+Zwischenspeicher fuer geparste Briefe (--cache DIR)
+
+Speichert das Ergebnis von parse_cmif (Briefe, Indices, meta) vor der
+Anreicherung als Pickle. Schluessel ist der SHA-1 des CMIF-Inhalts plus
+EXTRACTOR_VERSION aus build_hsa_data.py; aendert sich nur die
+Koordinatendatei oder die Wahl der Artefakte, wird statt des XML der Cache
+geladen.
+
+Der Cache ist ein lokales Build-Artefakt und wird nur aus dem eigenen
+Cache-Verzeichnis gelesen (Pickle ist kein Austauschformat). Je CMIF-Datei
+bleibt nur der neueste Eintrag erhalten.
+
+Dateiname: <stem>-<SHA-1 des aufgeloesten Pfads, 12 Zeichen>-<key>.pickle.
+Der Pfad-Hash trennt gleichnamige Dateien verschiedener Korpora (etwa
+viele CMIF.xml in batch_build.py), die sich sonst gegenseitig verdraengen
+wuerden. Geschrieben wird in eine eindeutige temporaere Datei und per
+os.replace umbenannt, sodass parallele Builds sich nicht stoeren.
+"""
+
+from pathlib import Path
+import gc
+import glob
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+
+
+CACHE_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    """SHA-1 ueber den Dateiinhalt (blockweise gelesen)."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(cmif_file: Path, extractor_version: int) -> str:
+    """Schluessel aus CMIF-Inhalt und Extraktor-Version."""
+    return f"{file_hash(cmif_file)}-v{extractor_version}"
+
+
+def cache_prefix(cmif_file: Path) -> str:
+    """Dateinamen-Praefix je CMIF-Datei: Name plus Hash des aufgeloesten Pfads."""
+    path_hash = hashlib.sha1(str(cmif_file.resolve()).encode('utf-8')).hexdigest()[:12]
+    return f"{cmif_file.stem}-{path_hash}"
+
+
+def cache_path(cache_dir: Path, cmif_file: Path, key: str) -> Path:
+    return cache_dir / f"{cache_prefix(cmif_file)}-{key}.pickle"
+
+
+def load_cached(cache_dir: Path, cmif_file: Path, key: str):
+    """Liefert die gecachten Daten oder None."""
+    path = cache_path(cache_dir, cmif_file, key)
+    if not path.exists():
+        return None
+
+    # Der Zyklus-GC bringt beim Aufbau hunderttausender dicts nichts,
+    # kostet aber ein Vielfaches der eigentlichen Ladezeit
+    gc.disable()
+    try:
+        with open(path, 'rb') as f:
+            version, stored_key, data = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+    finally:
+        gc.enable()
+
+    if version != CACHE_VERSION or stored_key != key:
+        return None
+    return data
+
+
+def store_cached(cache_dir: Path, cmif_file: Path, key: str, data: dict) -> Path:
+    """Schreibt die Daten atomar und entfernt aeltere Eintraege derselben CMIF-Datei."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(cache_dir, cmif_file, key)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.stem}-", suffix='.tmp', dir=cache_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((CACHE_VERSION, key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    prefix = cache_prefix(cmif_file)
+    entry = re.compile(rf"{re.escape(prefix)}-[0-9a-f]{{40}}-v\d+\.pickle")
+    for old in cache_dir.glob(f"{glob.escape(prefix)}-*.pickle"):
+        if old != path and entry.fullmatch(old.name):
+            # Ein paralleler Build kann den Eintrag schon entfernt haben
+            old.unlink(missing_ok=True)
+    return path
@@ -0,0 +1,129 @@
+"""
+Vorberechnete Orts-Cluster je Zoomstufe fuer die HSA-Pipeline
+
+Statt alle Marker bei jedem Zoom- und Filterwechsel im Browser zu clustern
+(MapLibre cluster: true), werden die angereicherten Orte zur Build-Zeit
+einer Gitter-Pyramide zugeordnet:
+
+    Zoomstufe z teilt die Web-Mercator-Welt (256 * 2^z Pixel) in Zellen von
+    CLUSTER_RADIUS Pixeln. Da sich die Zellgroesse je Stufe halbiert, liegt
+    jede Zelle von z + 1 vollstaendig in Zelle (x // 2, y // 2) von z.
+
+Jeder Cluster traegt den nach Briefen gewichteten Schwerpunkt, die Summe
+der Briefe (letter_count aus dem Places-Index), die GeoNames-IDs der
+Mitglieder und expansion_zoom, die erste Stufe, auf der er zerfaellt (wie
+getClusterExpansionZoom). Mit Zeitfilter summiert die Karte die gefilterten
+Briefzahlen der Mitglieder, ohne neu zu clustern. Oberhalb von
+CLUSTER_MAX_ZOOM werden die Orte einzeln gezeichnet.
+
+Output: hsa-letters.clusters.json
+"""
+
+from collections import defaultdict
+from pathlib import Path
+import json
+import math
+
+
+CLUSTERS_VERSION = 1
+TILE_SIZE = 256
+CLUSTER_RADIUS = 40      # wie MAP_DEFAULTS.clusterRadius
+CLUSTER_MAX_ZOOM = 12    # wie MAP_DEFAULTS.clusterMaxZoom
+MAX_LATITUDE = 85.0511287798
+
+
+def mercator(lat: float, lon: float) -> tuple:
+    """Web-Mercator-Koordinaten im Einheitsquadrat [0, 1)."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def build_clusters(places_index: dict, max_zoom: int = CLUSTER_MAX_ZOOM,
+                   radius: int = CLUSTER_RADIUS) -> dict:
+    """Clustert alle Orte mit lat/lon fuer die Zoomstufen 0 bis max_zoom."""
+    places = [
+        (geo_id, place)
+        for geo_id, place in places_index.items()
+        if place.get('lat') is not None and place.get('lon') is not None
+    ]
+
+    # Zelle jedes Orts auf der feinsten Stufe; groebere Stufen per Shift
+    cells_per_axis = TILE_SIZE * 2 ** max_zoom // radius
+    finest = {}
+    for geo_id, place in places:
+        x, y = mercator(place['lat'], place['lon'])
+        finest[geo_id] = (int(x * cells_per_axis), int(y * cells_per_axis))
+
+    levels = []
+    for zoom in range(max_zoom + 1):
+        shift = max_zoom - zoom
+        cells = defaultdict(list)
+        for geo_id, place in places:
+            fx, fy = finest[geo_id]
+            cells[(fx >> shift, fy >> shift)].append((geo_id, place))
+        levels.append(cells)
+
+    zooms = []
+    for zoom, cells in enumerate(levels):
+        shift = max_zoom - zoom
+        clusters = []
+        for (cx, cy), members in cells.items():
+            weights = [max(place.get('letter_count', 0), 1) for _, place in members]
+            total_weight = sum(weights)
+            lat = sum(p['lat'] * w for (_, p), w in zip(members, weights)) / total_weight
+            lon = sum(p['lon'] * w for (_, p), w in zip(members, weights)) / total_weight
+
+            # Erste feinere Stufe, auf der die Mitglieder in mehreren Zellen liegen
+            expansion_zoom = None
+            if len(members) > 1:
+                for finer in range(zoom + 1, max_zoom + 1):
+                    finer_shift = max_zoom - finer
+                    first = finest[members[0][0]]
+                    first = (first[0] >> finer_shift, first[1] >> finer_shift)
+                    if any(
+                        (finest[geo_id][0] >> finer_shift, finest[geo_id][1] >> finer_shift) != first
+                        for geo_id, _ in members[1:]
+                    ):
+                        expansion_zoom = finer
+                        break
+                else:
+                    expansion_zoom = max_zoom + 1
+
+            clusters.append({
+                'lat': round(lat, 6),
+                'lon': round(lon, 6),
+                'letter_count': sum(place.get('letter_count', 0) for _, place in members),
+                'place_count': len(members),
+                'expansion_zoom': expansion_zoom,
+                'places': sorted(geo_id for geo_id, _ in members)
+            })
+        clusters.sort(key=lambda c: (-c['letter_count'], c['places'][0]))
+        zooms.append({'zoom': zoom, 'clusters': clusters})
+
+    return {
+        'version': CLUSTERS_VERSION,
+        'tile_size': TILE_SIZE,
+        'radius': radius,
+        'max_zoom': max_zoom,
+        'places': len(places),
+        'places_without_coordinates': len(places_index) - len(places),
+        'zooms': zooms
+    }
+
+
+def clusters_for_zoom(clusters: dict, zoom: float) -> list:
+    """Cluster fuer eine (auch gebrochene) Kartenzoomstufe; None oberhalb von max_zoom."""
+    level = int(zoom)
+    if level > clusters['max_zoom']:
+        return None
+    return clusters['zooms'][max(level, 0)]['clusters']
+
+
+def write_clusters(clusters: dict, output_file: Path) -> Path:
+    """Schreibt die Cluster-Pyramide ohne Einrueckung."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(clusters, f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
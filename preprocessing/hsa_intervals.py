@@ -0,0 +1,177 @@
+"""
+Numerische Datumsintervalle und Intervall-Index fuer unsichere Datierungen
+
+Jeder Brief erhaelt in dateBounds die Grenzen [earliest, latest] als
+Tagesnummern (datetime.date.toordinal(): 0001-01-01 = 1, 1900-01-01 =
+693596). Die Praezision eines CMIF-Datums bestimmt die Spanne:
+
+    when="1890-05-12"                   -> [1890-05-12, 1890-05-12]
+    when="1890-05"                      -> [1890-05-01, 1890-05-31]
+    when="1890"                         -> [1890-01-01, 1890-12-31]
+    from="1890-05" to="1891"            -> [1890-05-01, 1891-12-31]
+    notBefore="1890-05-12"              -> [1890-05-12, null]
+    notAfter="1891"                     -> [null, 1891-12-31]
+
+Jedes vorhandene Attribut schraenkt das Intervall ein (when, from und
+notBefore die Untergrenze, when, to und notAfter die Obergrenze); null ist
+eine offene Grenze. Ohne auswertbares Datum oder bei widerspruechlichen
+Angaben (earliest > latest) ist dateBounds null.
+
+IntervalIndex beantwortet fuer einen Tagesbereich [a, b]:
+    possibly(a, b)  - Briefe, deren Intervall [a, b] schneidet
+    certainly(a, b) - Briefe, deren Intervall ganz in [a, b] liegt
+Die Intervalle sind nach Untergrenze sortiert; ein Segmentbaum ueber die
+Obergrenzen (Maximum bzw. Minimum je Knoten) liefert die Treffer, ohne die
+uebrigen Briefe anzusehen. count_possibly() braucht nur zwei Binaersuchen.
+"""
+
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date
+import re
+
+
+# Offene Grenzen im Index (ausserhalb des gueltigen Tagesbereichs)
+OPEN_START = date.min.toordinal() - 1
+OPEN_END = date.max.toordinal() + 1
+
+CMIF_DATE = re.compile(r'(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?')
+
+
+def date_span(value: str):
+    """(erster Tag, letzter Tag) eines CMIF-Datums (YYYY, YYYY-MM, YYYY-MM-DD) oder None."""
+    if not value:
+        return None
+    match = CMIF_DATE.fullmatch(value)
+    if not match:
+        return None
+    year, month, day = (int(part) if part else None for part in match.groups())
+    try:
+        if day is not None:
+            first = last = date(year, month, day).toordinal()
+        elif month is not None:
+            first = date(year, month, 1).toordinal()
+            last = first + monthrange(year, month)[1] - 1
+        else:
+            first = date(year, 1, 1).toordinal()
+            last = date(year, 12, 31).toordinal()
+    except ValueError:  # Jahr 0, Monat 13, 30. Februar, ...
+        return None
+    return first, last
+
+
+def date_bounds(when: str = '', from_date: str = '', to_date: str = '',
+                not_before: str = '', not_after: str = ''):
+    """[earliest, latest] als Tagesnummern (null = offen) oder None."""
+    earliest = latest = None
+    for value, lower, upper in ((when, True, True), (from_date, True, False),
+                                (not_before, True, False), (to_date, False, True),
+                                (not_after, False, True)):
+        span = date_span(value)
+        if span is None:
+            continue
+        if lower and (earliest is None or span[0] > earliest):
+            earliest = span[0]
+        if upper and (latest is None or span[1] < latest):
+            latest = span[1]
+
+    if earliest is None and latest is None:
+        return None
+    if earliest is not None and latest is not None and earliest > latest:
+        return None
+    return [earliest, latest]
+
+
+def day_range(start, end) -> tuple:
+    """Abfragebereich aus Tagesnummern oder CMIF-Daten (Spanne von start bis Ende von end)."""
+    if isinstance(start, str):
+        span = date_span(start)
+        if span is None:
+            raise ValueError(f"Ungueltiges Datum: {start}")
+        start = span[0]
+    if isinstance(end, str):
+        span = date_span(end)
+        if span is None:
+            raise ValueError(f"Ungueltiges Datum: {end}")
+        end = span[1]
+    return start, end
+
+
+class IntervalIndex:
+    """Statischer Index ueber dateBounds (Liste je Brief-Ordinalzahl, None = undatiert)."""
+
+    def __init__(self, bounds: list):
+        entries = sorted(
+            (OPEN_START if earliest is None else earliest,
+             OPEN_END if latest is None else latest,
+             ordinal)
+            for ordinal, (earliest, latest) in (
+                (ordinal, b) for ordinal, b in enumerate(bounds) if b
+            )
+        )
+        self.starts = [start for start, _, _ in entries]
+        self.ordinals = [ordinal for _, _, ordinal in entries]
+        self.sorted_ends = sorted(end for _, end, _ in entries)
+
+        size = 1
+        while size < len(entries):
+            size *= 2
+        self.size = size
+        # Blaetter in Reihenfolge der Untergrenzen; leere Blaetter passen nie
+        max_end = [OPEN_START - 1] * (2 * size)
+        min_end = [OPEN_END + 1] * (2 * size)
+        for i, (_, end, _) in enumerate(entries):
+            max_end[size + i] = min_end[size + i] = end
+        for node in range(size - 1, 0, -1):
+            max_end[node] = max(max_end[2 * node], max_end[2 * node + 1])
+            min_end[node] = min(min_end[2 * node], min_end[2 * node + 1])
+        self.max_end = max_end
+        self.min_end = min_end
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def possibly(self, a: int, b: int) -> list:
+        """Sortierte Ordinalzahlen der Briefe, die in [a, b] liegen koennen."""
+        if a > b:
+            return []
+        # Untergrenze <= b: Praefix der Sortierung; darin Obergrenze >= a
+        stop = bisect_right(self.starts, b)
+        max_end = self.max_end
+        return self._collect(0, stop, lambda node: max_end[node] >= a)
+
+    def certainly(self, a: int, b: int) -> list:
+        """Sortierte Ordinalzahlen der Briefe, die sicher in [a, b] liegen."""
+        # Untergrenze in [a, b]: zusammenhaengender Bereich; darin Obergrenze <= b
+        start = bisect_left(self.starts, a)
+        stop = bisect_right(self.starts, b)
+        min_end = self.min_end
+        return self._collect(start, stop, lambda node: min_end[node] <= b)
+
+    def count_possibly(self, a: int, b: int) -> int:
+        """Anzahl fuer possibly(a, b) in logarithmischer Zeit."""
+        if a > b:
+            return 0
+        # Ein Intervall mit Obergrenze < a hat auch Untergrenze < a <= b
+        return bisect_right(self.starts, b) - bisect_left(self.sorted_ends, a)
+
+    def _collect(self, start: int, stop: int, accept) -> list:
+        """Blaetter in [start, stop), deren Teilbaum accept erfuellt."""
+        if start >= stop:
+            return []
+        size = self.size
+        ordinals = self.ordinals
+        result = []
+        stack = [(1, 0, size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if hi <= start or lo >= stop or not accept(node):
+                continue
+            if node >= size:
+                result.append(ordinals[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        result.sort()
+        return result
@@ -0,0 +1,189 @@
+"""
+Korrespondenz-Netzwerk und Ko-Erwaehnungen fuer die HSA-Pipeline
+
+Berechnet zur Build-Zeit, was die Netzwerk-Ansicht in explore.js sonst bei
+jedem Laden und Filterwechsel aus den Briefen aggregiert:
+
+    correspondence - gewichtete Kanten Sender -> Empfaenger, je Jahr
+                     aufgeschluesselt; Personen-Schluessel wie in explore.js
+                     (id, sonst name)
+    persons        - Ko-Erwaehnungen aus mentions.persons (id, sonst name)
+    places         - Ko-Erwaehnungen aus mentions.places (geonames_id, sonst name)
+    subjects       - Ko-Erwaehnungen aus mentions.subjects (uri, sonst label)
+
+Die Ko-Erwaehnungen sind duenn besetzte, symmetrische Matrizen: nodes ist
+die Liste der Schluessel, pairs enthaelt [i, j, count] mit i < j. Alle
+Gewichte liegen zusaetzlich je Jahr vor (by_year), sodass ein Zeitfilter
+durch Aufsummieren der passenden Jahre angewendet werden kann.
+
+Output: hsa-letters.network.json
+"""
+
+from collections import defaultdict
+from itertools import combinations
+from pathlib import Path
+import json
+
+
+NETWORK_VERSION = 1
+UNDATED = 'undated'
+
+
+def person_key(person: dict):
+    return (person.get('id') or person.get('name')) if person else None
+
+
+def place_key(place: dict):
+    return place.get('geonames_id') or place.get('name')
+
+
+def subject_key(subject: dict):
+    return subject.get('uri') or subject.get('label')
+
+
+MENTION_KEYS = {
+    'persons': person_key,
+    'places': place_key,
+    'subjects': subject_key
+}
+
+
+class CooccurrenceMatrix:
+    """Symmetrische, duenn besetzte Ko-Erwaehnungsmatrix mit Jahres-Slices."""
+
+    def __init__(self):
+        self.node_ids = {}
+        self.nodes = []
+        self.labels = []
+        self.letter_counts = []
+        self.by_year = defaultdict(lambda: defaultdict(int))
+
+    def _node(self, key, label) -> int:
+        index = self.node_ids.get(key)
+        if index is None:
+            index = self.node_ids[key] = len(self.nodes)
+            self.nodes.append(key)
+            self.labels.append(label)
+            self.letter_counts.append(0)
+        return index
+
+    def add(self, items: list, year):
+        """items: [(key, label)] der Erwaehnungen eines Briefs."""
+        indices = sorted({self._node(key, label) for key, label in items if key})
+        for index in indices:
+            self.letter_counts[index] += 1
+        if len(indices) < 2:
+            return
+        bucket = self.by_year[year or UNDATED]
+        for pair in combinations(indices, 2):
+            bucket[pair] += 1
+
+    def result(self) -> dict:
+        totals = defaultdict(int)
+        for bucket in self.by_year.values():
+            for pair, count in bucket.items():
+                totals[pair] += count
+        return {
+            'nodes': self.nodes,
+            'labels': self.labels,
+            'letters': self.letter_counts,
+            'pairs': [[i, j, c] for (i, j), c in sorted(totals.items())],
+            'by_year': {
+                str(year): [[i, j, c] for (i, j), c in sorted(bucket.items())]
+                for year, bucket in sorted(self.by_year.items(), key=lambda x: str(x[0]))
+            }
+        }
+
+
+class NetworkBuilder:
+    """Sammelt Korrespondenz-Kanten und Ko-Erwaehnungen Brief fuer Brief."""
+
+    def __init__(self):
+        self.persons = {}
+        self.edges = defaultdict(lambda: defaultdict(int))
+        self.mentions = {field: CooccurrenceMatrix() for field in MENTION_KEYS}
+
+    def _person(self, person: dict, counter: str):
+        key = person_key(person)
+        if key not in self.persons:
+            self.persons[key] = {'name': person.get('name'), 'sent': 0, 'received': 0}
+        self.persons[key][counter] += 1
+        return key
+
+    def add(self, letter: dict):
+        year = letter['year'] or UNDATED
+        sender = letter['sender']
+        recipient = letter['recipient']
+
+        if person_key(sender) and person_key(recipient):
+            source = self._person(sender, 'sent')
+            target = self._person(recipient, 'received')
+            self.edges[(source, target)][year] += 1
+
+        for field, key_func in MENTION_KEYS.items():
+            items = letter['mentions'][field]
+            label_field = 'label' if field == 'subjects' else 'name'
+            self.mentions[field].add(
+                [(key_func(item), item.get(label_field)) for item in items],
+                letter['year']
+            )
+
+    def result(self) -> dict:
+        edges = []
+        for (source, target), years in self.edges.items():
+            edges.append({
+                'source': source,
+                'target': target,
+                'weight': sum(years.values()),
+                'years': [
+                    [year, count]
+                    for year, count in sorted(years.items(), key=lambda x: str(x[0]))
+                ]
+            })
+        edges.sort(key=lambda e: -e['weight'])
+
+        return {
+            'version': NETWORK_VERSION,
+            'correspondence': {
+                'nodes': self.persons,
+                'edges': edges
+            },
+            'mentions': {field: matrix.result() for field, matrix in self.mentions.items()}
+        }
+
+
+def build_network(letters: list) -> dict:
+    """Berechnet Netzwerk und Ko-Erwaehnungen fuer eine Briefliste."""
+    builder = NetworkBuilder()
+    for letter in letters:
+        builder.add(letter)
+    return builder.result()
+
+
+def sum_edges(network: dict, year_min: int = None, year_max: int = None) -> list:
+    """Kantengewichte fuer einen Zeitraum durch Aufsummieren der Jahres-Slices.
+
+    Ohne Grenzen werden alle Briefe inklusive undatierter gezaehlt; mit
+    Zeitfilter nur datierte Briefe im Bereich (wie in state-manager.js).
+    """
+    unfiltered = year_min is None and year_max is None
+    result = []
+    for edge in network['correspondence']['edges']:
+        weight = 0
+        for year, count in edge['years']:
+            if year == UNDATED:
+                if unfiltered:
+                    weight += count
+            elif ((year_min is None or year >= year_min)
+                  and (year_max is None or year <= year_max)):
+                weight += count
+        if weight:
+            result.append({'source': edge['source'], 'target': edge['target'], 'weight': weight})
+    return result
+
+
+def write_network(network: dict, output_file: Path) -> Path:
+    """Schreibt Netzwerk und Ko-Erwaehnungen ohne Einrueckung."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(network, f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
@@ -0,0 +1,612 @@
+"""
+Output-Formate fuer die HSA-Pipeline
+
+Schreibt die von build_hsa_data.py erzeugte Datenstruktur in alternative
+Formate neben dem monolithischen hsa-letters.json.
+
+Sharded Output (write_sharded):
+    <stem>/manifest.json      - meta (inkl. Timeline), indices, Shard-Liste
+    <stem>/letters-0000.json  - {"letters": [...]} je Shard
+    Bei shard_by='years' traegt jeder Shard-Eintrag die Ordinalzahlen seiner
+    Briefe in hsa-letters.json (ordinals, delta-kodiert wie in
+    hsa_postings.py); load_sharded stellt damit die Korpus-Reihenfolge
+    wieder her. Shards nach Groesse sind bereits in Korpus-Reihenfolge.
+
+Kompaktes Format (to_compact / from_compact):
+    Personen, Orte, Subjects, Sprachen und kategoriale Werte stehen einmal
+    in internierten Tabellen; Briefe sind parallele Spalten mit
+    Integer-Referenzen darauf (-1 = nicht vorhanden).
+
+Binaeres Format (write_binary / read_binary), little endian:
+    4 Bytes  Magic b'CEXB'
+    uint32   Version
+    uint32   Laenge des JSON-Headers in Bytes
+    Header   UTF-8-JSON mit meta, indices, tables, count und columns
+    Spalten  je Spalte ab header.columns[i].offset (relativ zum Ende des
+             Headers, auf 8 Bytes ausgerichtet), direkt als JS-TypedArray
+             lesbar:
+             int32       Int32Array(count), INT32_MIN = null (year, dateEarliest,
+                         dateLatest)
+             uint8       Uint8Array(count), Index in tables.enums
+             utf8        Uint32Array(count + 1) Offsets, danach UTF-8-Bytes;
+                         bei nullable steht '' fuer null
+             list<int32> Uint32Array(count + 1) Offsets, danach Int32Array
+
+JSON (write_json):
+    Byte-identisch zu json.dump; die Briefliste wird Brief fuer Brief mit dem
+    C-Encoder geschrieben (auch fuer Letter-Datensaetze aus hsa_records.py).
+
+Streaming-JSON (write_json_stream):
+    {"letters": [...], "meta": {...}, "indices": {...}} - die Briefe werden
+    einzeln geschrieben, meta und indices erst nach dem letzten Brief.
+
+Vorkomprimierte Varianten (write_precompressed):
+    <datei>.gz immer, <datei>.br nur wenn das Paket brotli installiert ist.
+    Brotli laeuft mit BROTLI_QUALITY (9): fuer alle Artefakte des
+    20k-Brief-Korpus (29 MB) etwa 2 s statt 100 s mit quality 11, bei
+    rund 18 % groesseren .br-Dateien.
+"""
+
+from array import array
+from collections import defaultdict
+from pathlib import Path
+import gzip
+import json
+import struct
+import sys
+
+from hsa_postings import delta_decode, delta_encode
+from hsa_records import record_to_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI_AVAILABLE = brotli is not None
+BROTLI_QUALITY = 9
+
+
+MANIFEST_VERSION = 2
+COMPACT_VERSION = 2
+BINARY_MAGIC = b'CEXB'
+BINARY_VERSION = 2
+INT32_NULL = -2**31
+
+# Spalten der Brief-Tabelle im kompakten Format
+COMPACT_LETTER_COLUMNS = [
+    'url', 'sender', 'recipient', 'date', 'dateTo', 'year', 'datePrecision',
+    'dateCertainty', 'dateEarliest', 'dateLatest', 'place_sent', 'language',
+    'mentions_subjects', 'mentions_persons', 'mentions_places'
+]
+
+
+def shard_letters_by_size(letters: list, shard_size: int) -> list:
+    """Teilt die Briefe in Shards fester Groesse (Dokumentreihenfolge).
+
+    Liefert [(None, [Ordinalzahlen])].
+    """
+    return [
+        (None, list(range(i, min(i + shard_size, len(letters)))))
+        for i in range(0, len(letters), shard_size)
+    ]
+
+
+def shard_letters_by_years(letters: list, years_per_shard: int) -> list:
+    """Teilt die Briefe in Zeitraum-Shards; Briefe ohne Jahr kommen zuletzt.
+
+    Liefert [((year_min, year_max) | None, [Ordinalzahlen])], innerhalb
+    eines Shards in Dokumentreihenfolge.
+    """
+    buckets = defaultdict(list)
+    undated = []
+    for ordinal, letter in enumerate(letters):
+        if letter['year']:
+            buckets[letter['year'] // years_per_shard * years_per_shard].append(ordinal)
+        else:
+            undated.append(ordinal)
+
+    shards = [
+        ((start, start + years_per_shard - 1), buckets[start])
+        for start in sorted(buckets)
+    ]
+    if undated:
+        shards.append((None, undated))
+    return shards
+
+
+def write_sharded(data: dict, output_dir: Path, shard_by: str = 'years',
+                  shard_size: int = 2000, years_per_shard: int = 5) -> Path:
+    """Schreibt Manifest und Brief-Shards fuer das Nachladen im Frontend.
+
+    Das Manifest enthaelt alles, was fuer die Uebersicht gebraucht wird
+    (meta, Timeline, Indices), und je Shard Dateiname, Briefanzahl und
+    Jahresbereich, damit nur die fuer einen Zeitfilter noetigen Shards
+    geladen werden muessen.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.glob('letters-*.json*'):
+        stale.unlink()
+    letters = data['letters']
+
+    if shard_by == 'years':
+        shards = shard_letters_by_years(letters, years_per_shard)
+    else:
+        shards = shard_letters_by_size(letters, shard_size)
+
+    shard_entries = []
+    for i, (year_range, ordinals) in enumerate(shards):
+        file_name = f'letters-{i:04d}.json'
+        shard = [letters[ordinal] for ordinal in ordinals]
+        write_json({'letters': shard}, output_dir / file_name)
+
+        years = [letter['year'] for letter in shard if letter['year']]
+        entry = {
+            'file': file_name,
+            'letters': len(shard),
+            'year_min': min(years, default=None),
+            'year_max': max(years, default=None),
+            'undated': year_range is None and shard_by == 'years'
+        }
+        if shard_by == 'years':
+            entry['ordinals'] = delta_encode(ordinals)
+        shard_entries.append(entry)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'shard_by': shard_by,
+        'meta': data['meta'],
+        'indices': data['indices'],
+        'shards': shard_entries
+    }
+    manifest_file = output_dir / 'manifest.json'
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    return manifest_file
+
+
+def load_sharded(output_dir: Path) -> dict:
+    """Setzt Manifest und Shards wieder zur Struktur von hsa-letters.json zusammen.
+
+    Die Briefe stehen danach in Korpus-Reihenfolge wie in hsa-letters.json.
+    """
+    with open(output_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    letters = [None] * sum(entry['letters'] for entry in manifest['shards'])
+    position = 0
+    for entry in manifest['shards']:
+        with open(output_dir / entry['file'], 'r', encoding='utf-8') as f:
+            shard = json.load(f)['letters']
+        if 'ordinals' in entry:
+            for ordinal, letter in zip(delta_decode(entry['ordinals']), shard):
+                letters[ordinal] = letter
+        else:
+            letters[position:position + len(shard)] = shard
+        position += len(shard)
+
+    return {
+        'meta': manifest['meta'],
+        'letters': letters,
+        'indices': manifest['indices']
+    }
+
+
+def _interner():
+    """Liefert eine intern-Funktion und die Liste der internierten Werte."""
+    lookup = {}
+    values = []
+
+    def intern(value):
+        index = lookup.get(value)
+        if index is None:
+            index = lookup[value] = len(values)
+            values.append(value)
+        return index
+
+    return intern, values
+
+
+def _columns(rows: list, fields: list) -> dict:
+    """Wandelt eine Liste von Tupeln in Spalten (struct of arrays) um."""
+    return {field: [row[i] for row in rows] for i, field in enumerate(fields)}
+
+
+def _rows(columns: dict, fields: list) -> list:
+    """Umkehrung von _columns."""
+    return list(zip(*(columns[field] for field in fields)))
+
+
+def _id_from_url(url: str) -> str:
+    return url.split('/')[-1] if url else ''
+
+
+def to_compact(data: dict) -> dict:
+    """Erzeugt das kompakte, dictionary-kodierte Format.
+
+    Die Brief-id wird nicht gespeichert, wenn sie wie in extract_letter
+    aus der url ableitbar ist; andernfalls gibt es eine eigene id-Spalte.
+    """
+    intern_person, persons = _interner()
+    intern_place, places = _interner()
+    intern_subject, subjects = _interner()
+    intern_language, languages = _interner()
+    intern_enum, enums = _interner()
+
+    def person_ref(person):
+        if person is None:
+            return -1
+        return intern_person((person['name'], person['id'], intern_enum(person['authority'])))
+
+    def place_ref(place):
+        if place is None:
+            return -1
+        return intern_place((place['name'], place['geonames_id'],
+                             place.get('lat'), place.get('lon')))
+
+    columns = {name: [] for name in COMPACT_LETTER_COLUMNS}
+    ids = []
+    for letter in data['letters']:
+        columns['url'].append(letter['url'])
+        columns['sender'].append(person_ref(letter['sender']))
+        columns['recipient'].append(person_ref(letter['recipient']))
+        columns['date'].append(letter['date'])
+        columns['dateTo'].append(letter['dateTo'])
+        columns['year'].append(letter['year'])
+        columns['datePrecision'].append(intern_enum(letter['datePrecision']))
+        columns['dateCertainty'].append(intern_enum(letter['dateCertainty']))
+        bounds = letter['dateBounds'] or (None, None)
+        columns['dateEarliest'].append(bounds[0])
+        columns['dateLatest'].append(bounds[1])
+        columns['place_sent'].append(place_ref(letter['place_sent']))
+        language = letter['language']
+        columns['language'].append(
+            intern_language((language['code'], language['label'])) if language else -1
+        )
+        mentions = letter['mentions']
+        columns['mentions_subjects'].append([
+            intern_subject((s['uri'], s['label'], intern_enum(s['category'])))
+            for s in mentions['subjects']
+        ])
+        columns['mentions_persons'].append([person_ref(p) for p in mentions['persons']])
+        columns['mentions_places'].append([place_ref(p) for p in mentions['places']])
+        ids.append(letter['id'])
+
+    if any(letter_id != _id_from_url(url) for letter_id, url in zip(ids, columns['url'])):
+        columns['id'] = ids
+
+    return {
+        'format': 'compact',
+        'version': COMPACT_VERSION,
+        'meta': data['meta'],
+        'tables': {
+            'enums': enums,
+            'persons': _columns(persons, ['name', 'id', 'authority']),
+            'places': _columns(places, ['name', 'geonames_id', 'lat', 'lon']),
+            'subjects': _columns(subjects, ['uri', 'label', 'category']),
+            'languages': _columns(languages, ['code', 'label'])
+        },
+        'letters': columns,
+        'indices': data['indices']
+    }
+
+
+def from_compact(compact: dict) -> dict:
+    """Baut aus dem kompakten Format die Struktur von hsa-letters.json auf."""
+    tables = compact['tables']
+    enums = tables['enums']
+
+    persons = [
+        {'name': name, 'id': pid, 'authority': enums[authority]}
+        for name, pid, authority in _rows(tables['persons'], ['name', 'id', 'authority'])
+    ]
+    places = []
+    for name, geo_id, lat, lon in _rows(tables['places'], ['name', 'geonames_id', 'lat', 'lon']):
+        place = {'name': name, 'geonames_id': geo_id}
+        if lat is not None:
+            place['lat'] = lat
+            place['lon'] = lon
+        places.append(place)
+    subjects = [
+        {'uri': uri, 'label': label, 'category': enums[category]}
+        for uri, label, category in _rows(tables['subjects'], ['uri', 'label', 'category'])
+    ]
+    languages = [
+        {'code': code, 'label': label}
+        for code, label in _rows(tables['languages'], ['code', 'label'])
+    ]
+
+    # Verschachtelte Objekte werden je Brief kopiert, damit spaetere
+    # Anreicherungen nicht alle Briefe mit derselben Referenz treffen
+    def ref(table, index):
+        return dict(table[index]) if index >= 0 else None
+
+    columns = compact['letters']
+    ids = columns.get('id') or [_id_from_url(url) for url in columns['url']]
+    letters = []
+    for i, letter_id in enumerate(ids):
+        earliest = columns['dateEarliest'][i]
+        latest = columns['dateLatest'][i]
+        letters.append({
+            'id': letter_id,
+            'url': columns['url'][i],
+            'sender': ref(persons, columns['sender'][i]),
+            'recipient': ref(persons, columns['recipient'][i]),
+            'date': columns['date'][i],
+            'dateTo': columns['dateTo'][i],
+            'year': columns['year'][i],
+            'datePrecision': enums[columns['datePrecision'][i]],
+            'dateCertainty': enums[columns['dateCertainty'][i]],
+            'dateBounds': [earliest, latest]
+            if earliest is not None or latest is not None else None,
+            'place_sent': ref(places, columns['place_sent'][i]),
+            'language': ref(languages, columns['language'][i]),
+            'mentions': {
+                'subjects': [ref(subjects, s) for s in columns['mentions_subjects'][i]],
+                'persons': [ref(persons, p) for p in columns['mentions_persons'][i]],
+                'places': [ref(places, p) for p in columns['mentions_places'][i]]
+            }
+        })
+
+    return {
+        'meta': compact['meta'],
+        'letters': letters,
+        'indices': compact['indices']
+    }
+
+
+class _JsonLayout:
+    """Formatierung wie json.dump mit indent bzw. kompakten separators."""
+
+    def __init__(self, indent: int = None):
+        self.indent = indent
+        # indent=0 schreibt wie json.dump Zeilenumbrueche ohne Einrueckung
+        if indent is not None:
+            self.pad = ' ' * indent
+            self.newline = '\n'
+            self.key_sep = ': '
+            self.separators = (',', ': ')
+        else:
+            self.pad = self.newline = ''
+            self.key_sep = ':'
+            self.separators = (',', ':')
+
+    def dumps(self, value, level: int) -> str:
+        text = json.dumps(value, ensure_ascii=False, indent=self.indent,
+                          separators=self.separators, default=record_to_json)
+        return text.replace('\n', '\n' + self.pad * level) if self.pad else text
+
+    def key(self, key: str) -> str:
+        return self.pad + json.dumps(key) + self.key_sep
+
+    def write_letters(self, f, letters) -> int:
+        """Schreibt die Briefliste elementweise; liefert die Anzahl."""
+        count = 0
+        f.write('[')
+        for letter in letters:
+            f.write((',' if count else '') + self.newline + self.pad * 2 + self.dumps(letter, 2))
+            count += 1
+        f.write((self.newline + self.pad if count else '') + ']')
+        return count
+
+
+def write_json(data: dict, output_file: Path, indent: int = None) -> Path:
+    """Schreibt data byte-identisch zu json.dump, die Briefe aber einzeln.
+
+    json.dump in eine Datei nutzt immer den Python-Encoder; json.dumps je
+    Brief laeuft im C-Encoder und baut trotzdem nie den ganzen Output als
+    String auf.
+    """
+    layout = _JsonLayout(indent)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i, (key, value) in enumerate(data.items()):
+            f.write((',' if i else '') + layout.newline + layout.key(key))
+            if key == 'letters':
+                layout.write_letters(f, value)
+            else:
+                f.write(layout.dumps(value, 1))
+        f.write(layout.newline + '}' if data else '}')
+    return output_file
+
+
+def write_json_stream(letters, trailer, output_file: Path, indent: int = None) -> int:
+    """Schreibt die Briefe elementweise, ohne die Gesamtstruktur aufzubauen.
+
+    letters ist ein Iterable von Briefen, trailer eine Funktion, die nach
+    dem letzten Brief die restlichen Top-Level-Eintraege als dict liefert
+    (meta, indices und ggf. places, in Ausgabereihenfolge). Ohne indent
+    wird kompakt geschrieben. Liefert die Anzahl der Briefe.
+    """
+    layout = _JsonLayout(indent)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('{' + layout.newline + layout.key('letters'))
+        count = layout.write_letters(f, letters)
+        for key, value in trailer().items():
+            f.write(',' + layout.newline + layout.key(key) + layout.dumps(value, 1))
+        f.write(layout.newline + '}')
+
+    return count
+
+
+def write_compact(data: dict, output_file: Path) -> Path:
+    """Schreibt das kompakte Format ohne Einrueckung."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(to_compact(data), f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
+
+
+# Spaltentypen im binaeren Format; ids nur, falls to_compact sie ausgibt
+BINARY_COLUMN_TYPES = {
+    'id': 'utf8',
+    'url': 'utf8',
+    'sender': 'int32',
+    'recipient': 'int32',
+    'date': 'utf8?',
+    'dateTo': 'utf8?',
+    'year': 'int32',
+    'datePrecision': 'uint8',
+    'dateCertainty': 'uint8',
+    'dateEarliest': 'int32',
+    'dateLatest': 'int32',
+    'place_sent': 'int32',
+    'language': 'int32',
+    'mentions_subjects': 'list<int32>',
+    'mentions_persons': 'list<int32>',
+    'mentions_places': 'list<int32>'
+}
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, buffer: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(buffer)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _encode_column(values: list, column_type: str) -> bytes:
+    """Kodiert eine Spalte des kompakten Formats als Byte-Puffer."""
+    if column_type == 'int32':
+        return _little_endian(array('i', (INT32_NULL if v is None else v for v in values)))
+    if column_type == 'uint8':
+        return bytes(values)
+    if column_type.startswith('utf8'):
+        encoded = [(v or '').encode('utf-8') for v in values]
+        offsets = array('I', [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        return _little_endian(offsets) + b''.join(encoded)
+    if column_type == 'list<int32>':
+        offsets = array('I', [0])
+        flat = array('i')
+        for items in values:
+            flat.extend(items)
+            offsets.append(len(flat))
+        return _little_endian(offsets) + _little_endian(flat)
+    raise ValueError(f"Unbekannter Spaltentyp: {column_type}")
+
+
+def _decode_column(buffer: bytes, column_type: str, count: int) -> list:
+    """Umkehrung von _encode_column."""
+    if column_type == 'int32':
+        return [None if v == INT32_NULL else v for v in _from_little_endian('i', buffer)]
+    if column_type == 'uint8':
+        return list(buffer)
+    offsets_size = (count + 1) * 4
+    offsets = _from_little_endian('I', buffer[:offsets_size])
+    payload = buffer[offsets_size:]
+    if column_type.startswith('utf8'):
+        values = [payload[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+        if column_type == 'utf8?':
+            values = [v or None for v in values]
+        return values
+    if column_type == 'list<int32>':
+        flat = _from_little_endian('i', payload).tolist()
+        return [flat[offsets[i]:offsets[i + 1]] for i in range(count)]
+    raise ValueError(f"Unbekannter Spaltentyp: {column_type}")
+
+
+def write_binary(data: dict, output_file: Path) -> Path:
+    """Schreibt die Brief-Tabelle im dokumentierten TypedArray-Layout."""
+    compact = to_compact(data)
+    letter_columns = compact['letters']
+    count = len(letter_columns['url'])
+
+    buffers = []
+    column_entries = []
+    offset = 0
+    for name, values in letter_columns.items():
+        column_type = BINARY_COLUMN_TYPES[name]
+        buffer = _encode_column(values, column_type)
+        padding = -len(buffer) % 8
+        column_entries.append({
+            'name': name,
+            'type': column_type,
+            'offset': offset,
+            'length': len(buffer)
+        })
+        buffers.append(buffer + b'\0' * padding)
+        offset += len(buffer) + padding
+
+    header = json.dumps({
+        'meta': compact['meta'],
+        'indices': compact['indices'],
+        'tables': compact['tables'],
+        'count': count,
+        'columns': column_entries
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Header auffuellen, damit die Spalten auf 8 Bytes ausgerichtet beginnen
+    header += b' ' * (-(12 + len(header)) % 8)
+
+    with open(output_file, 'wb') as f:
+        f.write(BINARY_MAGIC)
+        f.write(struct.pack('<II', BINARY_VERSION, len(header)))
+        f.write(header)
+        for buffer in buffers:
+            f.write(buffer)
+
+    return output_file
+
+
+def read_binary(input_file: Path) -> dict:
+    """Liest das binaere Format und liefert die Struktur von hsa-letters.json."""
+    raw = input_file.read_bytes()
+    if raw[:4] != BINARY_MAGIC:
+        raise ValueError(f"Keine CEXB-Datei: {input_file}")
+    version, header_length = struct.unpack_from('<II', raw, 4)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Nicht unterstuetzte Version {version}: {input_file}")
+
+    header = json.loads(raw[12:12 + header_length].decode('utf-8'))
+    data_start = 12 + header_length
+    count = header['count']
+
+    columns = {}
+    for entry in header['columns']:
+        start = data_start + entry['offset']
+        buffer = raw[start:start + entry['length']]
+        columns[entry['name']] = _decode_column(buffer, entry['type'], count)
+
+    return from_compact({
+        'meta': header['meta'],
+        'tables': header['tables'],
+        'letters': columns,
+        'indices': header['indices']
+    })
+
+
+def verify_binary_roundtrip(data: dict, binary_file: Path) -> bool:
+    """Prueft, dass die Binaerdatei exakt den JSON-Output wiederherstellt."""
+    restored = read_binary(binary_file)
+    return (
+        json.dumps(restored, ensure_ascii=False, sort_keys=True)
+        == json.dumps(data, ensure_ascii=False, sort_keys=True, default=record_to_json)
+    )
+
+
+def write_precompressed(path: Path, brotli_quality: int = BROTLI_QUALITY) -> list:
+    """Schreibt .gz- und (falls brotli verfuegbar) .br-Varianten neben eine Datei."""
+    raw = path.read_bytes()
+    written = []
+
+    gz_path = path.with_name(path.name + '.gz')
+    with open(gz_path, 'wb') as f:
+        # mtime=0 haelt die Datei bei unveraendertem Inhalt byte-identisch
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(raw)
+    written.append(gz_path)
+
+    if brotli is not None:
+        br_path = path.with_name(path.name + '.br')
+        br_path.write_bytes(brotli.compress(raw, quality=brotli_quality))
+        written.append(br_path)
+
+    return written
@@ -0,0 +1,375 @@
+"""
+Entity Resolution fuer Korrespondenzpartner
+
+Der Personen-Index in hsa-letters.json enthaelt nur Personen mit VIAF-ID.
+Personen mit GND-, HSA-ID oder nur einem Namen fehlen dort, und dieselbe
+Person kann in verschiedenen Briefen unter verschiedenen Authorities
+auftreten. Dieses Modul fuehrt die Sender- und Empfaenger-Eintraege aller
+Briefe zu Personen zusammen:
+
+    1. Knoten        - je (Authority, ID) ein Knoten ('viaf:123', 'gnd:118...',
+                       'unknown:<URI>'); Eintraege ohne ID je kanonischem
+                       Namen ('name:hugo schuchardt'). Gleiche Authority-ID
+                       ist damit immer derselbe Knoten.
+    2. Blocking      - Hash-Tabelle kanonischer Name -> Knoten. Kanonisch:
+                       hsa_search.normalize(), Woerter sortiert, sodass
+                       'Schuchardt, Hugo' und 'Hugo Schuchardt' denselben
+                       Block treffen. Verglichen wird nur innerhalb eines
+                       Blocks, nie paarweise ueber alle Namen.
+    3. Union-Find    - die Knoten mit ID eines Blocks werden paarweise
+                       geprueft. Zwei verschiedene IDs derselben Authority
+                       schliessen eine Vereinigung aus (gleichnamige,
+                       verschiedene Personen). IDs verschiedener Authorities
+                       (VIAF und GND) werden nur mit einem weiteren Beleg
+                       vereinigt: einem gemeinsamen Korrespondenzpartner
+                       oder einem Paar aus der Konkordanz (concordance,
+                       z.B. aus einem GND-VIAF-Abgleich); der Name allein
+                       genuegt nicht. Ein Namens-Knoten wird nur
+                       angeschlossen, wenn der Block danach genau eine
+                       Person mit ID hat.
+
+Union nach Groesse mit Pfadhalbierung; der Aufwand ist nahezu linear in der
+Zahl der Eintraege.
+
+Output: hsa-letters.persons.json
+    persons    - je Person key (bevorzugt viaf, gnd, hsa_person, sonst die
+                 erste ID bzw. der Name), name (haeufigste Schreibung),
+                 names (alle Schreibungen, absteigend nach Haeufigkeit),
+                 ids ({Authority: ID}), letters_sent, letters_received
+    letters    - sender/recipient: Personen-Ordinalzahl je Brief (-1 = keine)
+    decisions  - Entscheidungen aus dem Blocking: merged (Knoten a und b
+                 vereinigt, bei IDs evidence: Korrespondent oder
+                 Konkordanz), rejected (ID-Konflikt, reason nennt die
+                 Authority), ambiguous (IDs a und b ohne Beleg, reason;
+                 oder Namens-Knoten a passt zu mehreren Personen,
+                 candidates, und bleibt eigenstaendig)
+    stats      - records, nodes, persons und Anzahl je Entscheidung
+
+Personen sind nach erstem Auftreten im Korpus geordnet.
+"""
+
+from collections import Counter
+from pathlib import Path
+import json
+
+from hsa_search import normalize
+
+
+PERSONS_VERSION = 2
+
+KEY_PREFERENCE = ('viaf', 'gnd', 'hsa_person')
+NAME_AUTHORITY = 'name'
+
+
+def canonical_name(name: str) -> str:
+    """Normalisierter Name mit sortierten Woertern (Blocking-Schluessel)."""
+    return ' '.join(sorted(normalize(name).split()))
+
+
+class UnionFind:
+    """Disjunkte Mengen ueber Knoten 0..n-1 mit Authority-IDs je Wurzel."""
+
+    def __init__(self):
+        self.parent = []
+        self.size = []
+        self.ids = []
+
+    def add(self, ids: dict) -> int:
+        node = len(self.parent)
+        self.parent.append(node)
+        self.size.append(1)
+        self.ids.append(ids)
+        return node
+
+    def find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def conflict(self, a: int, b: int):
+        """Authority, unter der die Wurzeln a und b verschiedene IDs haben, sonst None."""
+        ids_a, ids_b = self.ids[a], self.ids[b]
+        if len(ids_a) > len(ids_b):
+            ids_a, ids_b = ids_b, ids_a
+        for authority, auth_id in ids_a.items():
+            other = ids_b.get(authority)
+            if other is not None and other != auth_id:
+                return authority
+        return None
+
+    def union(self, a: int, b: int):
+        """Vereinigt die Mengen von a und b; liefert (Wurzel, Konflikt-Authority)."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a, None
+        authority = self.conflict(a, b)
+        if authority is not None:
+            return None, authority
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        # Die kleinere ID-Menge wird in die groessere uebernommen
+        if len(self.ids[a]) < len(self.ids[b]):
+            self.ids[a], self.ids[b] = self.ids[b], self.ids[a]
+        self.ids[a].update(self.ids[b])
+        self.ids[b] = None
+        return a, None
+
+
+class PersonResolver:
+    """Sammelt Sender und Empfaenger Brief fuer Brief und loest Personen auf."""
+
+    def __init__(self, concordance=None):
+        # Paare von Knoten-Schluesseln ('viaf:123', 'gnd:118...') derselben Person
+        self.concordance = {frozenset(pair) for pair in concordance or ()}
+        self.node_ids = {}
+        self.canonicals = {}
+        self.keys = []
+        self.name_only = []
+        self.names = []
+        self.sent = []
+        self.received = []
+        self.partners = []
+        self.letters = {'sender': [], 'recipient': []}
+        self.uf = UnionFind()
+        self.records = 0
+
+    def _canonical(self, name: str) -> str:
+        # Dieselben Schreibweisen kehren in vielen Briefen wieder
+        canonical = self.canonicals.get(name)
+        if canonical is None:
+            canonical = self.canonicals[name] = canonical_name(name)
+        return canonical
+
+    def _node(self, person: dict):
+        if not person:
+            return None
+        name = person.get('name') or ''
+        auth_id = person.get('id')
+        if auth_id:
+            authority = person.get('authority') or 'unknown'
+            key = f"{authority}:{auth_id}"
+            ids = {authority: auth_id}
+        else:
+            canonical = self._canonical(name)
+            if not canonical:
+                return None
+            key = f"{NAME_AUTHORITY}:{canonical}"
+            ids = {}
+
+        node = self.node_ids.get(key)
+        if node is None:
+            node = self.node_ids[key] = self.uf.add(ids)
+            self.keys.append(key)
+            self.name_only.append(not ids)
+            self.names.append(Counter())
+            self.sent.append(0)
+            self.received.append(0)
+            self.partners.append(set())
+        if name:
+            self.names[node][name] += 1
+        return node
+
+    def add(self, letter: dict):
+        nodes = []
+        for role, counts in (('sender', self.sent), ('recipient', self.received)):
+            node = self._node(letter[role])
+            nodes.append(node)
+            if node is None:
+                self.letters[role].append(-1)
+            else:
+                counts[node] += 1
+                self.records += 1
+                self.letters[role].append(node)
+        sender, recipient = nodes
+        if sender is not None and recipient is not None and sender != recipient:
+            self.partners[sender].add(recipient)
+            self.partners[recipient].add(sender)
+
+    def _blocks(self) -> dict:
+        """Kanonischer Name -> Knoten (Knoten mit ID vor dem Namens-Knoten)."""
+        blocks = {}
+        for node, names in enumerate(self.names):
+            # dict statt set: Reihenfolge der Bloecke und damit der Entscheidungen stabil
+            for canonical in dict.fromkeys(self._canonical(name) for name in names):
+                if canonical:
+                    blocks.setdefault(canonical, []).append(node)
+        for nodes in blocks.values():
+            nodes.sort(key=lambda node: (self.name_only[node], node))
+        return blocks
+
+    def _evidence(self, a: int, b: int):
+        """Beleg, dass die Wurzeln a und b dieselbe Person sind, sonst None."""
+        uf = self.uf
+        if self.concordance:
+            keys_a = [f"{authority}:{auth_id}" for authority, auth_id in uf.ids[a].items()]
+            keys_b = [f"{authority}:{auth_id}" for authority, auth_id in uf.ids[b].items()]
+            if any(frozenset((key_a, key_b)) in self.concordance
+                   for key_a in keys_a for key_b in keys_b):
+                return 'Konkordanz'
+        partners_a = {uf.find(node) for node in self.partners[a]}
+        partners_b = {uf.find(node) for node in self.partners[b]}
+        if (partners_a & partners_b) - {a, b}:
+            return 'Korrespondent'
+        return None
+
+    def _union(self, a: int, b: int) -> int:
+        """Vereinigt die Wurzeln a und b und fuehrt ihre Korrespondenzpartner zusammen."""
+        root, _ = self.uf.union(a, b)
+        other = b if root == a else a
+        self.partners[root] |= self.partners[other]
+        self.partners[other] = set()
+        return root
+
+    def resolve(self) -> list:
+        """Vereinigt die Knoten jedes Blocks; liefert die Entscheidungen."""
+        uf = self.uf
+        keys = self.keys
+        name_only = self.name_only
+        decisions = []
+        for canonical, nodes in self._blocks().items():
+            if len(nodes) < 2:
+                continue
+            with_id = [node for node in nodes if not name_only[node]]
+
+            # Paarweise: auch Knoten, die nicht am ersten haengen, werden verglichen
+            unresolved = []
+            rejected = set()
+            for i, a in enumerate(with_id):
+                for b in with_id[i + 1:]:
+                    root_a, root_b = uf.find(a), uf.find(b)
+                    if root_a == root_b or frozenset((root_a, root_b)) in rejected:
+                        continue
+                    authority = uf.conflict(root_a, root_b)
+                    if authority is not None:
+                        rejected.add(frozenset((root_a, root_b)))
+                        decisions.append({
+                            'decision': 'rejected',
+                            'block': canonical,
+                            'a': keys[a],
+                            'b': keys[b],
+                            'reason': f"{authority}-Konflikt"
+                        })
+                        continue
+                    evidence = self._evidence(root_a, root_b)
+                    if evidence is None:
+                        unresolved.append((a, b))
+                        continue
+                    self._union(root_a, root_b)
+                    decisions.append({
+                        'decision': 'merged',
+                        'block': canonical,
+                        'a': keys[a],
+                        'b': keys[b],
+                        'evidence': evidence
+                    })
+            # Erst am Ende: spaetere Vereinigungen koennen ein Paar noch verbinden
+            for a, b in unresolved:
+                if uf.find(a) != uf.find(b):
+                    decisions.append({
+                        'decision': 'ambiguous',
+                        'block': canonical,
+                        'a': keys[a],
+                        'b': keys[b],
+                        'reason': 'nur Namensgleichheit'
+                    })
+
+            anchor = with_id[0] if with_id else None
+            roots = {uf.find(node) for node in with_id}
+            for node in nodes[len(with_id):]:
+                if len(roots) > 1:
+                    decisions.append({
+                        'decision': 'ambiguous',
+                        'block': canonical,
+                        'a': keys[node],
+                        'candidates': sorted(keys[root] for root in roots)
+                    })
+                elif anchor is not None and uf.find(node) != uf.find(anchor):
+                    self._union(uf.find(anchor), uf.find(node))
+                    decisions.append({
+                        'decision': 'merged',
+                        'block': canonical,
+                        'a': keys[anchor],
+                        'b': keys[node]
+                    })
+        return decisions
+
+    def result(self) -> dict:
+        decisions = self.resolve()
+        uf = self.uf
+
+        # Personen in Reihenfolge des ersten Knotens (erstes Auftreten)
+        person_of_root = {}
+        members = []
+        for node in range(len(self.keys)):
+            root = uf.find(node)
+            if root not in person_of_root:
+                person_of_root[root] = len(members)
+                members.append([])
+            members[person_of_root[root]].append(node)
+
+        persons = []
+        for person_nodes in members:
+            ids = uf.ids[uf.find(person_nodes[0])]
+            names = Counter()
+            for node in person_nodes:
+                names.update(self.names[node])
+            persons.append({
+                'key': self._person_key(ids, person_nodes),
+                # most_common haelt bei Gleichstand die Reihenfolge des Auftretens
+                'name': names.most_common(1)[0][0] if names else '',
+                'names': [name for name, _ in names.most_common()],
+                'ids': dict(sorted(ids.items())),
+                'letters_sent': sum(self.sent[node] for node in person_nodes),
+                'letters_received': sum(self.received[node] for node in person_nodes)
+            })
+
+        person_of_node = [person_of_root[uf.find(node)] for node in range(len(self.keys))]
+        letters = {
+            role: [person_of_node[node] if node >= 0 else -1 for node in nodes]
+            for role, nodes in self.letters.items()
+        }
+        counts = Counter(decision['decision'] for decision in decisions)
+        return {
+            'version': PERSONS_VERSION,
+            'persons': persons,
+            'letters': letters,
+            'decisions': decisions,
+            'stats': {
+                'records': self.records,
+                'nodes': len(self.keys),
+                'persons': len(persons),
+                'merged': counts['merged'],
+                'rejected': counts['rejected'],
+                'ambiguous': counts['ambiguous']
+            }
+        }
+
+    def _person_key(self, ids: dict, person_nodes: list) -> str:
+        for authority in KEY_PREFERENCE:
+            if authority in ids:
+                return f"{authority}:{ids[authority]}"
+        if ids:
+            return f"{min(ids)}:{ids[min(ids)]}"
+        return self.keys[person_nodes[0]]
+
+
+def resolve_persons(letters: list, concordance=None) -> dict:
+    """Loest die Korrespondenzpartner einer Briefliste zu Personen auf.
+
+    concordance: Paare von Knoten-Schluesseln, die dieselbe Person bezeichnen.
+    """
+    resolver = PersonResolver(concordance)
+    for letter in letters:
+        resolver.add(letter)
+    return resolver.result()
+
+
+def write_persons(persons: dict, output_file: Path) -> Path:
+    """Schreibt Personen, Brief-Zuordnung und Entscheidungen ohne Einrueckung."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(persons, f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
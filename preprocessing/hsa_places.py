@@ -0,0 +1,98 @@
+"""
+Orts-Tabelle fuer die Koordinaten-Anreicherung (--place-table)
+
+Statt lat/lon in jeden place_sent- und mentions.places-Eintrag zu kopieren,
+wird jede GeoNames-ID einmal in einer dichten Tabelle aufgeloest; Briefe
+verweisen mit 'place' auf die Zeile. Speicher und Output fuer Koordinaten
+wachsen damit mit der Zahl der Orte, nicht mit der Zahl der Erwaehnungen.
+
+Output (zusaetzlicher Top-Level-Schluessel in hsa-letters.json):
+    "places": {"geonames_id": [...], "name": [...], "lat": [...], "lon": [...]}
+    letter.place_sent = {"name": ..., "geonames_id": ..., "place": 17}
+
+lat/lon sind null fuer Orte ohne Koordinaten. name ist die erste
+Schreibweise im Korpus; die Schreibweise des Briefs bleibt im Brief.
+"""
+
+PLACE_TABLE_COLUMNS = ['geonames_id', 'name', 'lat', 'lon']
+
+
+class PlaceTable:
+    """Dichte Orts-Tabelle; jede GeoNames-ID wird genau einmal nachgeschlagen."""
+
+    def __init__(self, coordinates: dict):
+        self.coordinates = coordinates
+        self.ids = {}
+        self.rows = []
+
+    def resolve(self, place: dict):
+        """Zeilennummer fuer einen Ort (neu angelegt beim ersten Auftreten)."""
+        geo_id = place.get('geonames_id')
+        if not geo_id:
+            return None
+        index = self.ids.get(geo_id)
+        if index is None:
+            coords = self.coordinates.get(geo_id)
+            index = self.ids[geo_id] = len(self.rows)
+            self.rows.append((
+                geo_id, place['name'],
+                coords['lat'] if coords else None,
+                coords['lon'] if coords else None
+            ))
+        return index
+
+    def enrich_letter(self, letter: dict):
+        """Setzt 'place' in place_sent und mentions.places."""
+        places = [letter['place_sent']] if letter['place_sent'] else []
+        places.extend(letter['mentions']['places'])
+        for place in places:
+            index = self.resolve(place)
+            if index is not None:
+                place['place'] = index
+                # z.B. aus einem inkrementellen Build mit kopierten Koordinaten
+                place.pop('lat', None)
+                place.pop('lon', None)
+
+    def enrich_places_index(self, meta: dict, indices: dict):
+        """Koordinaten fuer den Places-Index und die Abdeckung in einem Durchlauf.
+
+        Gleiche meta-Felder wie enrich_places_index() in build_hsa_data.py.
+        """
+        with_coords = 0
+        for geo_id, place_data in indices['places'].items():
+            _, _, lat, lon = self.rows[self.ids[geo_id]]
+            if lat is not None:
+                place_data['lat'] = lat
+                place_data['lon'] = lon
+                with_coords += 1
+
+        total = len(indices['places'])
+        meta['places_with_coordinates'] = with_coords
+        meta['places_without_coordinates'] = total - with_coords
+        meta['coordinate_coverage_pct'] = round(with_coords / total * 100, 1) if total else 0
+
+    def result(self) -> dict:
+        """Tabelle als Spalten (struct of arrays)."""
+        return {
+            field: [row[i] for row in self.rows]
+            for i, field in enumerate(PLACE_TABLE_COLUMNS)
+        }
+
+
+def resolve_place_table(data: dict) -> dict:
+    """Schreibt lat/lon aus der Orts-Tabelle zurueck in die Briefe (Referenz/Tests)."""
+    table = data.get('places')
+    if not table:
+        return data
+    lats = table['lat']
+    lons = table['lon']
+    for letter in data['letters']:
+        places = [letter['place_sent']] if letter['place_sent'] else []
+        places.extend(letter['mentions']['places'])
+        for place in places:
+            index = place.pop('place', None)
+            if index is not None and lats[index] is not None:
+                place['lat'] = lats[index]
+                place['lon'] = lons[index]
+    del data['places']
+    return data
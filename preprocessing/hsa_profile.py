@@ -0,0 +1,146 @@
+"""
+Stufen-Profiling fuer die HSA-Pipeline (opt-in mit --profile)
+
+Misst je Stufe (Parsen, Koordinaten laden, Anreichern, Serialisieren,
+jede Aggregation und jedes Artefakt):
+
+    seconds       - Wall-Zeit
+    cpu_seconds   - CPU-Zeit des Prozesses (ohne Worker-Prozesse)
+    peak_rss_mb   - Peak-RSS des Prozesses nach der Stufe
+    rss_growth_mb - um wie viel die Stufe den Peak angehoben hat
+    items         - verarbeitete Briefe bzw. Eintraege, daraus items_per_second
+
+Fuer genau eine Stufe kann zusaetzlich ein cProfile-Dump (.prof, lesbar mit
+pstats oder snakeviz) oder ein tracemalloc-Bericht (Top-Allokationen und
+Python-Peak) geschrieben werden.
+
+Ohne --profile ist der Profiler deaktiviert und stage() kostet nur einen
+Funktionsaufruf.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PROFILE_VERSION = 1
+PROFILE_MODES = ['cprofile', 'tracemalloc']
+TRACEMALLOC_TOP = 25
+
+
+def peak_rss_mb() -> float:
+    """Peak-RSS des Prozesses in MB (ru_maxrss: KB unter Linux, Bytes unter macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StageProfiler:
+    """Sammelt Messwerte je Stufe; deaktiviert ein reiner Durchlauf."""
+
+    def __init__(self, enabled: bool = False, profile_stage: str = None,
+                 mode: str = 'cprofile', dump_prefix: Path = None):
+        self.enabled = enabled
+        self.profile_stage = profile_stage
+        self.mode = mode
+        self.dump_prefix = dump_prefix
+        self.stages = []
+        self.dumps = []
+
+    @contextmanager
+    def stage(self, name: str, items: int = None):
+        """Misst den umschlossenen Block; items kann im Block gesetzt werden."""
+        record = {'stage': name, 'items': items}
+        if not self.enabled:
+            yield record
+            return
+
+        profiler = None
+        detailed = name == self.profile_stage
+        if detailed and self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+        elif detailed:
+            tracemalloc.start()
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            record['seconds'] = round(seconds, 3)
+            record['cpu_seconds'] = round(time.process_time() - cpu_start, 3)
+            record['peak_rss_mb'] = peak_rss_mb()
+            if rss_before is not None:
+                record['rss_growth_mb'] = round(record['peak_rss_mb'] - rss_before, 1)
+            if record['items'] is not None and seconds > 0:
+                record['items_per_second'] = round(record['items'] / seconds)
+            if detailed:
+                self._dump(name, record, profiler)
+            self.stages.append(record)
+
+    def _dump(self, name: str, record: dict, profiler):
+        prefix = self.dump_prefix or Path(f"profile-{name}")
+        if profiler:
+            dump_file = prefix.with_name(f"{prefix.name}.{name}.prof")
+            profiler.dump_stats(str(dump_file))
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record['traced_peak_mb'] = round(traced_peak / 1024 / 1024, 1)
+            dump_file = prefix.with_name(f"{prefix.name}.{name}.tracemalloc.txt")
+            with open(dump_file, 'w', encoding='utf-8') as f:
+                f.write(f"tracemalloc {name}: Peak {record['traced_peak_mb']} MB\n\n")
+                for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+        record['dump'] = str(dump_file)
+        self.dumps.append(dump_file)
+
+    def report(self) -> dict:
+        """Maschinenlesbarer Bericht."""
+        return {
+            'version': PROFILE_VERSION,
+            'generated': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'total_seconds': round(sum(s['seconds'] for s in self.stages), 3),
+            'stages': self.stages
+        }
+
+    def write_json(self, output_file: Path) -> Path:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return output_file
+
+    def print_report(self):
+        print("\n" + "="*78)
+        print("PROFIL JE STUFE")
+        print("="*78)
+        print(f"{'Stufe':<16} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS':>10} "
+              f"{'+RSS':>8} {'Items':>9} {'Items/s':>11}")
+        for s in self.stages:
+            items = s['items'] if s['items'] is not None else ''
+            rate = f"{s['items_per_second']:,}" if 'items_per_second' in s else ''
+            peak = f"{s['peak_rss_mb']:.1f}" if s['peak_rss_mb'] is not None else ''
+            growth = f"{s['rss_growth_mb']:.1f}" if 'rss_growth_mb' in s else ''
+            print(f"{s['stage']:<16} {s['seconds']:>9.3f} {s['cpu_seconds']:>9.3f} "
+                  f"{peak:>10} {growth:>8} {items:>9} {rate:>11}")
+        print(f"{'Gesamt':<16} {self.report()['total_seconds']:>9.3f}")
+        for dump_file in self.dumps:
+            print(f"Detailprofil: {dump_file}")
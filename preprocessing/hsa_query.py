@@ -0,0 +1,163 @@
+"""
+Abfragen gegen einen gebauten Korpus (hsa-letters.json) im Prozess
+
+Laedt den Build einmal und legt Posting-Listen (sortierte Brief-
+Ordinalzahlen) fuer die Filterfelder an; Auswertungsskripte und Tests
+muessen die Briefliste dann nicht fuer jede Abfrage durchlaufen:
+
+    sender, recipient - sender.id / recipient.id
+    person            - sender.id oder recipient.id
+    place             - place_sent.geonames_id
+    subject           - mentions.subjects[].uri (sonst label)
+    language          - language.code, 'None' fuer Briefe ohne Sprache
+    precision         - datePrecision
+    certainty         - dateCertainty
+
+Schluessel wie in hsa_postings.py. Jahresbereiche (year_from, year_to,
+jeweils inklusive) laufen ueber eine nach Jahr sortierte Ordinalzahl-
+Liste; Briefe ohne Jahr fallen bei einem Jahresfilter heraus, wie in der
+Timeline des meta-Blocks.
+
+Tagesbereiche mit Unsicherheit laufen ueber dateBounds und den
+IntervalIndex aus hsa_intervals.py: during=(start, end) mit Tagesnummern
+oder CMIF-Daten ('1890', '1890-05', '1890-05-12'); certain=True verlangt,
+dass das ganze Datumsintervall eines Briefs im Bereich liegt, sonst genuegt
+eine Ueberschneidung.
+
+Mehrere Felder werden geschnitten (beginnend mit der kuerzesten Liste),
+mehrere Werte eines Felds vereinigt. Der Aufwand haengt von der Laenge der
+beteiligten Listen ab, nicht von der Zahl der Briefe.
+
+Beispiel:
+    query = CorpusQuery.load(Path('docs/data/hsa-letters.json'))
+    query.count(year_from=1900, year_to=1905, sender='12345', language='de')
+    query.timeline(subject='https://lexikon.schuchardt.uni-graz.at/.../123')
+    query.page(offset=0, limit=50, place=['2761369', '2778067'])
+    query.count(during=('1890-05', '1890-08'), certain=True)
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from pathlib import Path
+import json
+
+from hsa_intervals import IntervalIndex, day_range
+from hsa_postings import intersect_postings, letter_keys, union_postings
+
+
+QUERY_FIELDS = ['sender', 'recipient', 'person', 'place', 'subject', 'language',
+                'precision', 'certainty']
+
+
+class CorpusQuery:
+    """In-Memory-Indizes ueber die Briefliste eines Builds."""
+
+    def __init__(self, data: dict):
+        self.meta = data.get('meta', {})
+        self.letters = data['letters']
+        self.postings = {field: {} for field in QUERY_FIELDS}
+        self.years = []
+
+        for ordinal, letter in enumerate(self.letters):
+            for field, key in letter_keys(letter):
+                if field not in self.postings:
+                    continue  # year: eigener, sortierter Index
+                postings = self.postings[field].setdefault(key, [])
+                # Sender und Empfaenger (person) bzw. doppelte Subjects
+                if not postings or postings[-1] != ordinal:
+                    postings.append(ordinal)
+            self.years.append(letter['year'] or None)
+
+        dated = sorted((year, ordinal) for ordinal, year in enumerate(self.years) if year)
+        self.year_keys = [year for year, _ in dated]
+        self.year_ordinals = [ordinal for _, ordinal in dated]
+        # Builds vor dateBounds liefern einen leeren Index
+        self.intervals = IntervalIndex([letter.get('dateBounds') for letter in self.letters])
+
+    @classmethod
+    def load(cls, data_file: Path) -> 'CorpusQuery':
+        with open(data_file, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _postings(self, field: str, value) -> list:
+        if field not in self.postings:
+            raise ValueError(f"Unbekannter Filter: {field} (erlaubt: {', '.join(QUERY_FIELDS)})")
+        index = self.postings[field]
+        if isinstance(value, (str, int)):
+            return index.get(str(value), [])
+        return union_postings(*(index.get(str(v), []) for v in value))
+
+    def _year_slice(self, year_from, year_to) -> tuple:
+        lo = 0 if year_from is None else bisect_left(self.year_keys, year_from)
+        hi = len(self.year_keys) if year_to is None else bisect_right(self.year_keys, year_to)
+        return lo, max(lo, hi)
+
+    def select(self, year_from: int = None, year_to: int = None, during: tuple = None,
+               certain: bool = False, **filters) -> list:
+        """Sortierte Ordinalzahlen aller Briefe, die jeden Filter erfuellen.
+
+        Ein Filterwert ist ein Schluessel oder eine Liste von Schluesseln
+        (Vereinigung); None laesst den Filter aus.
+        """
+        lists = [self._postings(field, value) for field, value in filters.items()
+                 if value is not None]
+        if during is not None:
+            start, end = day_range(*during)
+            if certain:
+                lists.append(self.intervals.certainly(start, end))
+            else:
+                lists.append(self.intervals.possibly(start, end))
+        ranged = year_from is not None or year_to is not None
+        if ranged:
+            lo, hi = self._year_slice(year_from, year_to)
+            # Der Jahresbereich wird nur dann als eigene Liste geschnitten,
+            # wenn er kuerzer ist als die kuerzeste Posting-Liste
+            if not lists or hi - lo < min(map(len, lists)):
+                lists.append(sorted(self.year_ordinals[lo:hi]))
+                ranged = False
+
+        if not lists:
+            return list(range(len(self.letters)))
+        result = intersect_postings(*lists)
+        if ranged:
+            low = year_from if year_from is not None else float('-inf')
+            high = year_to if year_to is not None else float('inf')
+            years = self.years
+            return [o for o in result if years[o] is not None and low <= years[o] <= high]
+        # intersect_postings liefert eine einzelne Liste unveraendert zurueck
+        return list(result)
+
+    def count(self, **filters) -> int:
+        during = filters.pop('during', None)
+        certain = filters.pop('certain', False)
+        # Nur ein unscharfer Tagesbereich: zwei Binaersuchen statt Trefferliste
+        if during is not None and not certain and all(v is None for v in filters.values()):
+            return self.intervals.count_possibly(*day_range(*during))
+        return len(self.select(during=during, certain=certain, **filters))
+
+    def timeline(self, **filters) -> list:
+        """Briefe je Jahr wie meta.timeline, eingeschraenkt auf die Filter."""
+        years = self.years
+        counts = Counter(years[o] for o in self.select(**filters))
+        counts.pop(None, None)
+        return [{'year': year, 'count': counts[year]} for year in sorted(counts)]
+
+    def facet(self, field: str, limit: int = None, **filters) -> list:
+        """(Schluessel, Anzahl) fuer field ueber die gefilterten Briefe, absteigend."""
+        if field not in self.postings:
+            raise ValueError(f"Unbekanntes Feld: {field} (erlaubt: {', '.join(QUERY_FIELDS)})")
+        counts = Counter()
+        for ordinal in self.select(**filters):
+            # Je Brief nur einmal zaehlen, auch wenn der Schluessel mehrfach vorkommt
+            counts.update({key for f, key in letter_keys(self.letters[ordinal]) if f == field})
+        return counts.most_common(limit)
+
+    def page(self, offset: int = 0, limit: int = 50, **filters) -> dict:
+        """Eine Seite der gefilterten Briefe in Dokumentreihenfolge."""
+        ordinals = self.select(**filters)
+        return {
+            'total': len(ordinals),
+            'offset': offset,
+            'ordinals': ordinals[offset:offset + limit],
+            'letters': [self.letters[o] for o in ordinals[offset:offset + limit]]
+        }
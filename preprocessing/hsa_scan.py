@@ -0,0 +1,289 @@
+"""
+Zerlegen einer CMIF-Datei in Bytebereiche fuer Worker-Prozesse
+
+Fuer paralleles Parsen (build_hsa_data.py --workers) und die Validierung
+(validate_cmif.py). Der Hauptprozess baut keinen Baum auf und sucht die
+Briefe nicht selbst: plan_ranges() teilt die Datei in Bereiche von etwa
+shard_bytes, die jeweils direkt hinter einem </correspDesc> enden. Jeder
+Worker oeffnet die Datei selbst (mmap), sucht in seinem Bereich die
+correspDesc (scan_range) und parst sie einzeln (parse_raw_letter).
+
+    map_ranges(path, func)  - func(path, start, stop, wrapper) je Bereich,
+                              seriell oder im Prozess-Pool (hoechstens
+                              2 * workers Bereiche gleichzeitig); Ergebnisse
+                              in Dokumentreihenfolge
+    scan_range(...)         - [(Zeile im Bereich, Bytes)] je correspDesc und
+                              das Skelett des Bereichs
+    SkeletonParser          - prueft die Skelette im Hauptprozess
+
+Skelett: alles ausserhalb der Briefe (Header, Text zwischen den Briefen),
+die Briefe selbst ersetzt durch ihre Zeilenumbrueche. Der Hauptprozess
+fuettert die Skelette der Bereiche der Reihe nach in einen Feed-Parser ohne
+Baum; das prueft die Wohlgeformtheit ausserhalb der Briefe (auch einen
+abgeschnittenen letzten Brief) und liefert die Startzeile jedes Bereichs.
+
+Zeilennummern: libxml2 speichert die Zeile eines Elements in 16 Bit, ab
+Zeile 65535 ist sourceline ungenau. Hier zaehlt der Scanner die
+Zeilenumbrueche selbst; innerhalb eines Briefs gilt sourceline relativ zum
+Brief und ist exakt, solange ein einzelner Brief unter 65535 Zeilen bleibt.
+
+Annahmen: Kommentare und CDATA-Abschnitte werden uebersprungen; die
+Namespaces stammen aus den Deklarationen vor dem ersten Brief (in CMIF an
+tei:TEI); Entitaeten aus einer DTD werden in den Briefen nicht aufgeloest.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import mmap
+import re
+
+from lxml import etree
+
+
+TEI_NS = 'http://www.tei-c.org/ns/1.0'
+SHARD_BYTES = 1 << 20
+
+# Kommentar, CDATA oder Beginn eines (ggf. praefigierten) correspDesc
+MARKUP = re.compile(rb'<!--|<!\[CDATA\[|<((?:[A-Za-z_][\w.-]*:)?)correspDesc(?=[\s/>])')
+# Rest des Start-Tags; Attributwerte duerfen '>' enthalten
+START_TAG_REST = re.compile(rb'(?:[^>"\']|"[^"]*"|\'[^\']*\')*>')
+# Anfang eines schliessenden Tags vor 'correspDesc>'
+CLOSE_TAG_START = re.compile(rb'</(?:[A-Za-z_][\w.-]*:)?$')
+LINE_IN_MESSAGE = re.compile(r'\bline (\d+)')
+XML_ENCODING = re.compile(rb'<\?xml[^>]*encoding\s*=\s*["\']([A-Za-z][\w.-]*)["\']')
+
+
+@contextmanager
+def open_cmif(file_path: Path):
+    """Dateiinhalt als mmap (leere Dateien als b'')."""
+    with open(file_path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            yield b''
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def syntax_error(msg: str, code: int, lineno: int, column: int, shift: int) -> etree.XMLSyntaxError:
+    """XMLSyntaxError um shift Zeilen verschoben, auch die Angaben im Meldungstext."""
+    msg = LINE_IN_MESSAGE.sub(lambda m: f"line {int(m.group(1)) + shift}", msg)
+    return etree.XMLSyntaxError(msg, code, (lineno or 1) + shift, column or 0)
+
+
+class SkeletonParser:
+    """Feed-Parser ohne Baum fuer die Skelette; zaehlt die Zeilen mit.
+
+    line ist jeweils die Zeile am Anfang des naechsten Skeletts, also die
+    Startzeile des naechsten Bereichs.
+    """
+
+    def __init__(self):
+        self.root_tag = None
+        self.namespaces = {}
+        self.line = 1
+        self.parser = etree.XMLParser(target=self)
+
+    def feed(self, chunk: bytes):
+        self.parser.feed(chunk)
+        self.line += chunk.count(b'\n')
+
+    def finish(self):
+        self.parser.close()
+
+    # Parser-Target
+    def start(self, tag, attrib, nsmap=None):
+        if self.root_tag is None:
+            self.root_tag = tag
+
+    def start_ns(self, prefix, uri):
+        self.namespaces[prefix or ''] = uri
+
+    def end(self, tag):
+        pass
+
+    def data(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+def _skip_opaque(data, match, stop: int) -> int:
+    """Position hinter dem Kommentar bzw. CDATA-Abschnitt, der bei match beginnt."""
+    end = data.find(b'-->' if match.group(0) == b'<!--' else b']]>', match.end(), stop)
+    return stop if end < 0 else end + 3
+
+
+def read_wrapper(data) -> tuple:
+    """(Kopf, Ende) des Elements, in das jeder Brief zum Parsen eingebettet wird.
+
+    Namespaces und Encoding aus dem Prolog vor dem ersten Brief. Deklaration
+    und Start-Tag stehen ohne Zeilenumbruch davor, Zeile 1 ist damit die
+    erste Zeile des Briefs.
+    """
+    match = XML_ENCODING.match(data, 0, 200)
+    encoding = match.group(1).decode('ascii') if match else 'UTF-8'
+
+    size = len(data)
+    pos = 0
+    while pos < size:
+        match = MARKUP.search(data, pos)
+        if match is None:
+            pos = size
+        elif match.group(0)[1] == ord('!'):
+            pos = _skip_opaque(data, match, size)
+            continue
+        else:
+            pos = match.start()
+        break
+    prolog = SkeletonParser()
+    try:
+        prolog.feed(data[:pos])
+    except etree.XMLSyntaxError:
+        pass  # meldet die Skelett-Pruefung im Hauptprozess
+
+    declarations = ''.join(
+        f' xmlns="{uri}"' if not prefix else f' xmlns:{prefix}="{uri}"'
+        for prefix, uri in prolog.namespaces.items()
+    )
+    head = f'<?xml version="1.0" encoding="{encoding}"?><raw{declarations}>'
+    return head.encode('ascii'), b'</raw>'
+
+
+def _opaque_regions(data):
+    """Kommentare und CDATA-Abschnitte als (Anfang, Ende) in Dateireihenfolge."""
+    size = len(data)
+    pos = 0
+    while True:
+        comment = data.find(b'<!--', pos)
+        cdata = data.find(b'<![CDATA[', pos)
+        if comment < 0 and cdata < 0:
+            return
+        if cdata < 0 or 0 <= comment < cdata:
+            start, end = comment, data.find(b'-->', comment + 4)
+        else:
+            start, end = cdata, data.find(b']]>', cdata + 9)
+        end = size if end < 0 else end + 3
+        yield start, end
+        pos = end
+
+
+def plan_ranges(data, shard_bytes: int = SHARD_BYTES):
+    """Bereiche (start, stop), die die Datei lueckenlos abdecken.
+
+    Jeder Bereich ausser dem letzten endet direkt hinter einem
+    </correspDesc> ausserhalb von Kommentaren und CDATA. Der Hauptprozess
+    sucht dafuer je Bereich nur ein schliessendes Tag (bytes.find).
+    """
+    size = len(data)
+    regions = _opaque_regions(data)
+    region = next(regions, None)
+    start = 0
+    while start < size:
+        pos = start + shard_bytes
+        stop = size
+        while pos < size:
+            found = data.find(b'correspDesc>', pos)
+            if found < 0:
+                break
+            pos = found + len(b'correspDesc>')
+            while region is not None and region[1] <= found:
+                region = next(regions, None)
+            if region is not None and region[0] <= found:
+                pos = region[1]
+                continue
+            if CLOSE_TAG_START.search(data[max(0, found - 64):found]):
+                stop = pos
+                break
+        yield start, stop
+        start = stop
+
+
+def scan_range(data, start: int, stop: int) -> tuple:
+    """correspDesc eines Bereichs und dessen Skelett.
+
+    Liefert ([(Zeile, Bytes)], Skelett); Zeile zaehlt ab 1 am Bereichsanfang.
+    Ein nicht geschlossener letzter Brief bleibt im Skelett, der
+    SkeletonParser meldet dann die Stelle.
+    """
+    letters = []
+    skeleton = []
+    line = 1
+    pos = search = start
+    while True:
+        match = MARKUP.search(data, search, stop)
+        if match is None:
+            break
+        if match.group(0)[1] == ord('!'):
+            search = _skip_opaque(data, match, stop)
+            continue
+
+        letter_start = match.start()
+        rest = START_TAG_REST.match(data, match.end(), stop)
+        if rest is None:
+            break
+        if data[rest.end() - 2:rest.end()] == b'/>':
+            letter_stop = rest.end()
+        else:
+            close = data.find(b'</' + match.group(1) + b'correspDesc', rest.end(), stop)
+            letter_stop = -1 if close < 0 else data.find(b'>', close, stop) + 1
+            if letter_stop <= 0:
+                break
+
+        gap = data[pos:letter_start]
+        skeleton.append(gap)
+        line += gap.count(b'\n')
+        raw = data[letter_start:letter_stop]
+        letters.append((line, raw))
+        newlines = raw.count(b'\n')
+        skeleton.append(b'\n' * newlines)
+        line += newlines
+        pos = search = letter_stop
+
+    skeleton.append(data[pos:stop])
+    return letters, b''.join(skeleton)
+
+
+def parse_raw_letter(raw: bytes, line: int, wrapper: tuple):
+    """Parst einen correspDesc; Fehlerzeilen ab line (erste Zeile des Briefs).
+
+    Liefert das Element oder None, wenn es kein tei:correspDesc ist (etwa ein
+    correspDesc in einem anderen Namespace, den iterparse ebenfalls auslaesst).
+    """
+    head, tail = wrapper
+    try:
+        root = etree.fromstring(head + raw + tail)
+    except etree.XMLSyntaxError as e:
+        raise syntax_error(e.msg, e.code, e.lineno, e.offset, line - 1) from None
+    corresp = root[0] if len(root) else None
+    if corresp is None or corresp.tag != f"{{{TEI_NS}}}correspDesc":
+        return None
+    return corresp
+
+
+def map_ranges(file_path: Path, func, workers: int = 1, shard_bytes: int = SHARD_BYTES):
+    """Liefert func(file_path, start, stop, wrapper) aller Bereiche in Dokumentreihenfolge.
+
+    func muss auf Modulebene definiert sein (Pickle fuer den Prozess-Pool).
+    """
+    with open_cmif(file_path) as data:
+        wrapper = read_wrapper(data)
+        ranges = plan_ranges(data, shard_bytes)
+        if workers <= 1:
+            for start, stop in ranges:
+                yield func(file_path, start, stop, wrapper)
+            return
+
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, stop in ranges:
+                pending.append(pool.submit(func, file_path, start, stop, wrapper))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,230 @@
+"""
+Vorberechneter Suchindex fuer die HSA-Pipeline
+
+Ersetzt die lineare Substring-Suche im Explorer (Personen, Orte, Themen,
+Briefliste) durch einen Index ueber normalisierte Namen:
+
+    names     - alle unterschiedlichen Namen/Labels, normalisiert
+    grams     - Token -> Namens-Ordinalzahlen (delta-kodiert)
+    persons   - Personen-Index: keys (VIAF-ID) und names (Namens-Ordinalzahl)
+    places    - Orts-Index: keys (GeoNames-ID) und names
+    subjects  - Subject-Index: keys (URI) und names
+    letters   - Namens-Ordinalzahl -> Brief-Ordinalzahlen (delta-kodiert) fuer
+                sender.name, recipient.name und place_sent.name wie in
+                renderLettersList()
+
+Normalisierung: NFKD, Entfernen der Kombinationszeichen, casefold (ß -> ss),
+alles ausser Buchstaben und Ziffern wird zu Leerzeichen. Im Browser
+entspricht das s.normalize('NFKD').replace(/\\p{M}/gu, '').toLowerCase()
+.replace(/ß/g, 'ss').replace(/[^\\p{L}\\p{N}]+/gu, ' ').trim().
+
+Tokens je Wort: ' ' + erster Buchstabe, ' ' + erste zwei Buchstaben und alle
+Trigramme von ' ' + Wort. Ein Suchwort mit drei oder mehr Zeichen findet
+Namen, die es irgendwo enthalten (wie includes() im Explorer), kuerzere
+Suchwoerter treffen Wortanfaenge. Die kuerzeste Posting-Liste der Tokens
+liefert die Kandidaten, die gegen den normalisierten Namen geprueft werden.
+
+Output: hsa-letters.search.json
+"""
+
+from pathlib import Path
+import json
+import re
+import unicodedata
+
+from hsa_postings import delta_decode, delta_encode
+
+
+SEARCH_VERSION = 1
+NGRAM = 3
+SEARCH_FIELDS = ['persons', 'places', 'subjects', 'letters']
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Faltet Gross-/Kleinschreibung und Diakritika."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return NON_WORD.sub(' ', stripped.casefold()).strip()
+
+
+def word_grams(word: str) -> set:
+    """Tokens eines normalisierten Worts (Wortanfaenge und Trigramme)."""
+    padded = ' ' + word
+    grams = {padded[:2], padded[:3]}
+    grams.update(padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+    return grams
+
+
+def query_grams(word: str) -> set:
+    """Tokens, die ein Name fuer ein Suchwort enthalten muss."""
+    if len(word) < NGRAM:
+        return {' ' + word}
+    return {word[i:i + NGRAM] for i in range(len(word) - NGRAM + 1)}
+
+
+class SearchBuilder:
+    """Sammelt die Namen der Briefe Brief fuer Brief (auch im Streaming-Modus).
+
+    Personen, Orte und Subjects kommen aus den fertigen Indices, daher
+    erwartet result() die indices des Builds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.name_ids = {}
+        self.names = []
+        self.letters = []
+
+    def _name(self, text: str):
+        name = normalize(text)
+        if not name:
+            return None
+        index = self.name_ids.get(name)
+        if index is None:
+            index = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+            self.letters.append([])
+        return index
+
+    def add(self, letter: dict):
+        ordinal = self.count
+        self.count += 1
+
+        for field in ('sender', 'recipient', 'place_sent'):
+            entity = letter[field]
+            index = self._name(entity['name']) if entity else None
+            if index is not None:
+                postings = self.letters[index]
+                if not postings or postings[-1] != ordinal:
+                    postings.append(ordinal)
+
+    def _entities(self, index: dict, label_field: str) -> dict:
+        keys = []
+        names = []
+        for key, entry in index.items():
+            name = self._name(entry[label_field])
+            if name is not None:
+                keys.append(key)
+                names.append(name)
+        return {'keys': keys, 'names': names}
+
+    def result(self, indices: dict) -> dict:
+        """Liefert den Suchindex; indices wie in build_output()."""
+        persons = self._entities(indices['persons'], 'name')
+        places = self._entities(indices['places'], 'name')
+        subjects = self._entities(indices['subjects'], 'label')
+
+        grams = {}
+        for ordinal, name in enumerate(self.names):
+            for gram in set().union(*(word_grams(word) for word in name.split())):
+                grams.setdefault(gram, []).append(ordinal)
+
+        return {
+            'version': SEARCH_VERSION,
+            'encoding': 'delta',
+            'ngram': NGRAM,
+            'names': self.names,
+            'grams': {gram: delta_encode(ordinals) for gram, ordinals in sorted(grams.items())},
+            'persons': persons,
+            'places': places,
+            'subjects': subjects,
+            'letters': [delta_encode(ordinals) for ordinals in self.letters]
+        }
+
+
+def build_search(letters: list, indices: dict) -> dict:
+    """Berechnet den Suchindex fuer eine Briefliste und ihre Indices."""
+    builder = SearchBuilder()
+    for letter in letters:
+        builder.add(letter)
+    return builder.result(indices)
+
+
+class SearchIndex:
+    """Abfragen gegen einen geladenen Suchindex (gleiche Normalisierung wie der Build)."""
+
+    def __init__(self, search: dict):
+        self.names = search['names']
+        self.padded = [' ' + name for name in self.names]
+        self.grams = {gram: delta_decode(deltas) for gram, deltas in search['grams'].items()}
+        self.letters = [delta_decode(deltas) for deltas in search['letters']]
+        self.entities = {}
+        for field in ('persons', 'places', 'subjects'):
+            by_name = {}
+            for key, name in zip(search[field]['keys'], search[field]['names']):
+                by_name.setdefault(name, []).append(key)
+            self.entities[field] = by_name
+
+    def match_names(self, query: str) -> list:
+        """Ordinalzahlen aller Namen, die jedes Suchwort enthalten."""
+        return list(self.iter_names(query))
+
+    def iter_names(self, query: str):
+        """Wie match_names(), aber lazy, damit Typeahead nach limit abbrechen kann."""
+        words = normalize(query).split()
+        if not words:
+            return
+        # Die kuerzeste Posting-Liste liefert die Kandidaten; geprueft wird
+        # gegen den Namen selbst, das ist billiger als alle Listen zu schneiden.
+        # Ein Token, das das ganze Suchwort abdeckt, braucht keine Pruefung.
+        candidates = None
+        patterns = []
+        for word in words:
+            pattern = word if len(word) >= NGRAM else ' ' + word
+            if pattern not in patterns:
+                patterns.append(pattern)
+            for gram in query_grams(word):
+                postings = self.grams.get(gram)
+                if postings is None:
+                    return
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+                    covered = pattern if len(word) <= NGRAM else None
+        patterns = [pattern for pattern in patterns if pattern != covered]
+
+        if not patterns:
+            yield from candidates
+            return
+        padded = self.padded
+        for ordinal in candidates:
+            name = padded[ordinal]
+            if all(pattern in name for pattern in patterns):
+                yield ordinal
+
+    def search(self, query: str, field: str = 'persons', limit: int = None) -> list:
+        """Liefert Entitaets-Schluessel (persons/places/subjects) oder Brief-Ordinalzahlen.
+
+        Fuer letters muss jedes Suchwort in sender, recipient oder place_sent
+        vorkommen (nicht zwingend im selben Feld).
+        """
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Unbekanntes Suchfeld: {field}")
+
+        if field == 'letters':
+            words = normalize(query).split()
+            if not words:
+                return []
+            matches = [
+                set().union(*(self.letters[n] for n in self.match_names(word)))
+                for word in words
+            ]
+            result = sorted(set.intersection(*matches))
+            return result[:limit] if limit is not None else result
+
+        by_name = self.entities[field]
+        result = []
+        for ordinal in self.iter_names(query):
+            result.extend(by_name.get(ordinal, ()))
+            if limit is not None and len(result) >= limit:
+                return result[:limit]
+        return result
+
+
+def write_search(search: dict, output_file: Path) -> Path:
+    """Schreibt den Suchindex ohne Einrueckung."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(search, f, ensure_ascii=False, separators=(',', ':'))
+    return output_file
@@ -0,0 +1,404 @@
+"""
+SQLite-Ausgabe fuer die HSA-Pipeline (--sqlite)
+
+Schreibt Briefe und Entitaeten normalisiert in eine SQLite-Datei fuer
+Analyse- und Reporting-Skripte, die nicht den ganzen JSON-Output laden
+wollen:
+
+    letters          - ein Datensatz je Brief (ordinal = Position in hsa-letters.json)
+    persons          - (name, authority_id, authority), Sender/Empfaenger/Erwaehnte
+    places           - (name, geonames_id, lat, lon)
+    subjects         - (uri, label, category)
+    languages        - (code, label)
+    letter_persons   - mentions.persons  (letter, position, person)
+    letter_places    - mentions.places   (letter, position, place)
+    letter_subjects  - mentions.subjects (letter, position, subject)
+    names_fts        - FTS5 ueber Namen und Labels (kind, ref -> Zeile der Tabelle)
+    meta             - meta-Block als key/JSON-Wert; die Statistiken werden
+                       per SQL-Aggregat aus den Tabellen berechnet
+
+dateBounds steht in date_earliest/date_latest (Tagesnummern, hsa_intervals.py).
+
+Indizes: letters(year), letters(date_earliest), letters(date_latest),
+letters(sender), letters(recipient), letters(place_sent) und die
+Entitaetsspalten der Erwaehnungstabellen. Ohne FTS5 im SQLite des
+Interpreters wird names_fts ausgelassen (FTS5_AVAILABLE).
+
+Beispiel:
+    SELECT l.date, s.name FROM letters l JOIN persons s ON s.id = l.sender
+    WHERE l.year BETWEEN 1900 AND 1905;
+    SELECT kind, ref FROM names_fts WHERE names_fts MATCH 'schuch*';
+"""
+
+from pathlib import Path
+import json
+import os
+import sqlite3
+
+
+SQLITE_VERSION = 2
+BATCH_SIZE = 10000
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+
+SCHEMA = '''
+CREATE TABLE persons (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    authority_id TEXT,
+    authority TEXT
+);
+CREATE TABLE places (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    geonames_id TEXT,
+    lat REAL,
+    lon REAL
+);
+CREATE TABLE subjects (
+    id INTEGER PRIMARY KEY,
+    uri TEXT,
+    label TEXT,
+    category TEXT
+);
+CREATE TABLE languages (
+    code TEXT PRIMARY KEY,
+    label TEXT
+);
+CREATE TABLE letters (
+    ordinal INTEGER PRIMARY KEY,
+    id TEXT,
+    url TEXT,
+    sender INTEGER REFERENCES persons(id),
+    recipient INTEGER REFERENCES persons(id),
+    date TEXT,
+    date_to TEXT,
+    year INTEGER,
+    date_precision TEXT,
+    date_certainty TEXT,
+    date_earliest INTEGER,
+    date_latest INTEGER,
+    place_sent INTEGER REFERENCES places(id),
+    language TEXT REFERENCES languages(code)
+);
+CREATE TABLE letter_persons (
+    letter INTEGER REFERENCES letters(ordinal),
+    position INTEGER,
+    person INTEGER REFERENCES persons(id)
+);
+CREATE TABLE letter_places (
+    letter INTEGER REFERENCES letters(ordinal),
+    position INTEGER,
+    place INTEGER REFERENCES places(id)
+);
+CREATE TABLE letter_subjects (
+    letter INTEGER REFERENCES letters(ordinal),
+    position INTEGER,
+    subject INTEGER REFERENCES subjects(id)
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+# Nach dem Einfuegen angelegt, das ist deutlich schneller als laufend zu pflegen
+INDEXES = '''
+CREATE INDEX letters_year ON letters(year);
+CREATE INDEX letters_date_earliest ON letters(date_earliest);
+CREATE INDEX letters_date_latest ON letters(date_latest);
+CREATE INDEX letters_sender ON letters(sender);
+CREATE INDEX letters_recipient ON letters(recipient);
+CREATE INDEX letters_place_sent ON letters(place_sent);
+CREATE INDEX letter_persons_person ON letter_persons(person);
+CREATE INDEX letter_places_place ON letter_places(place);
+CREATE INDEX letter_subjects_subject ON letter_subjects(subject);
+CREATE INDEX persons_authority_id ON persons(authority_id);
+CREATE INDEX places_geonames_id ON places(geonames_id);
+CREATE INDEX subjects_uri ON subjects(uri);
+'''
+
+
+def _fts5_available() -> bool:
+    try:
+        with sqlite3.connect(':memory:') as conn:
+            conn.execute(f"CREATE VIRTUAL TABLE t USING fts5(x, tokenize='{FTS_TOKENIZER}')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+FTS5_AVAILABLE = _fts5_available()
+
+
+class SqliteWriter:
+    """Schreibt Brief fuer Brief (auch im Streaming-Modus); close() legt Indizes und meta an.
+
+    coordinates ergaenzt lat/lon fuer Orte, die im Brief noch keine tragen
+    (im Streaming-Modus laufen Builder vor der Anreicherung).
+    """
+
+    def __init__(self, output_file: Path, coordinates: dict = None):
+        self.output_file = output_file
+        self.tmp_file = output_file.with_suffix('.sqlite.tmp')
+        if self.tmp_file.exists():
+            self.tmp_file.unlink()
+        self.conn = sqlite3.connect(self.tmp_file)
+        self.conn.execute('PRAGMA journal_mode = OFF')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        self.conn.executescript(SCHEMA)
+        self.coordinates = coordinates or {}
+        self.count = 0
+        self.persons = {}
+        self.places = {}
+        self.place_coords = []
+        self.subjects = {}
+        self.languages = {}
+        self.rows = {name: [] for name in
+                     ('letters', 'letter_persons', 'letter_places', 'letter_subjects')}
+
+    def _person(self, person: dict):
+        if person is None:
+            return None
+        key = (person['name'], person['id'], person['authority'])
+        index = self.persons.get(key)
+        if index is None:
+            index = self.persons[key] = len(self.persons)
+        return index
+
+    def _place(self, place: dict):
+        if place is None:
+            return None
+        key = (place['name'], place['geonames_id'])
+        index = self.places.get(key)
+        if index is None:
+            index = self.places[key] = len(self.places)
+            self.place_coords.append(self._coords(place))
+        return index
+
+    def _coords(self, place: dict) -> tuple:
+        if place.get('lat') is not None:
+            return place['lat'], place['lon']
+        coords = self.coordinates.get(place['geonames_id'])
+        return (coords['lat'], coords['lon']) if coords else (None, None)
+
+    def _subject(self, subject: dict):
+        key = (subject['uri'], subject['label'], subject['category'])
+        index = self.subjects.get(key)
+        if index is None:
+            index = self.subjects[key] = len(self.subjects)
+        return index
+
+    def add(self, letter: dict):
+        ordinal = self.count
+        self.count += 1
+
+        language = letter['language']
+        if language:
+            self.languages.setdefault(language['code'], language['label'])
+
+        self.rows['letters'].append((
+            ordinal, letter['id'], letter['url'],
+            self._person(letter['sender']), self._person(letter['recipient']),
+            letter['date'], letter['dateTo'], letter['year'],
+            letter['datePrecision'], letter['dateCertainty'],
+            *(letter['dateBounds'] or (None, None)),
+            self._place(letter['place_sent']),
+            language['code'] if language else None
+        ))
+        mentions = letter['mentions']
+        for position, person in enumerate(mentions['persons']):
+            self.rows['letter_persons'].append((ordinal, position, self._person(person)))
+        for position, place in enumerate(mentions['places']):
+            self.rows['letter_places'].append((ordinal, position, self._place(place)))
+        for position, subject in enumerate(mentions['subjects']):
+            self.rows['letter_subjects'].append((ordinal, position, self._subject(subject)))
+
+        if len(self.rows['letters']) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        placeholders = {'letters': 14, 'letter_persons': 3,
+                        'letter_places': 3, 'letter_subjects': 3}
+        for table, rows in self.rows.items():
+            if rows:
+                marks = ', '.join('?' * placeholders[table])
+                self.conn.executemany(f'INSERT INTO {table} VALUES ({marks})', rows)
+                rows.clear()
+
+    def close(self, meta: dict = None) -> Path:
+        """Schreibt Entitaeten, Indizes, FTS und meta; liefert den Pfad der Datenbank.
+
+        meta (z.B. aus build_meta) liefert generated, source und die
+        Koordinaten-Abdeckung; die Statistiken werden per SQL ueberschrieben.
+        """
+        self._flush()
+        conn = self.conn
+        conn.executemany('INSERT INTO persons VALUES (?, ?, ?, ?)', (
+            (index, name, auth_id, authority)
+            for (name, auth_id, authority), index in self.persons.items()
+        ))
+        conn.executemany('INSERT INTO places VALUES (?, ?, ?, ?, ?)', (
+            (index, name, geo_id, *self.place_coords[index])
+            for (name, geo_id), index in self.places.items()
+        ))
+        conn.executemany('INSERT INTO subjects VALUES (?, ?, ?, ?)', (
+            (index, uri, label, category)
+            for (uri, label, category), index in self.subjects.items()
+        ))
+        conn.executemany('INSERT INTO languages VALUES (?, ?)', self.languages.items())
+        conn.executescript(INDEXES)
+
+        if FTS5_AVAILABLE:
+            conn.execute(f"CREATE VIRTUAL TABLE names_fts USING fts5("
+                         f"text, kind UNINDEXED, ref UNINDEXED, tokenize='{FTS_TOKENIZER}')")
+            conn.execute("INSERT INTO names_fts SELECT name, 'person', id FROM persons")
+            conn.execute("INSERT INTO names_fts SELECT name, 'place', id FROM places")
+            conn.execute("INSERT INTO names_fts SELECT label, 'subject', id FROM subjects")
+            conn.execute("INSERT INTO names_fts SELECT label, 'language', code FROM languages")
+
+        statistics = sql_meta(conn)
+        meta = {**meta, **statistics} if meta else statistics
+        meta['sqlite_version'] = SQLITE_VERSION
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', (
+            (key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()
+        ))
+        conn.commit()
+        conn.execute('ANALYZE')
+        conn.close()
+        os.replace(self.tmp_file, self.output_file)
+        return self.output_file
+
+
+def sql_meta(conn: sqlite3.Connection) -> dict:
+    """Berechnet die Statistiken des meta-Blocks per SQL (wie hsa_stats.py)."""
+    def scalar(query):
+        return conn.execute(query).fetchone()[0]
+
+    def correspondents(role):
+        return scalar(f'''
+            SELECT COUNT(DISTINCT p.authority_id) FROM letters l
+            JOIN persons p ON p.id = l.{role}
+            WHERE p.authority = 'viaf' AND p.authority_id IS NOT NULL AND p.authority_id != ''
+        ''')
+
+    total = scalar('SELECT COUNT(*) FROM letters')
+    timeline = conn.execute('''
+        SELECT year, COUNT(*) FROM letters WHERE year IS NOT NULL AND year != 0
+        GROUP BY year ORDER BY year
+    ''').fetchall()
+    precision = dict(conn.execute(
+        'SELECT date_precision, COUNT(*) FROM letters GROUP BY date_precision'
+    ).fetchall())
+    certainty = dict(conn.execute(
+        'SELECT date_certainty, COUNT(*) FROM letters GROUP BY date_certainty'
+    ).fetchall())
+    imprecise = sum(precision.get(key, 0) for key in ('year', 'month', 'range', 'unknown'))
+
+    return {
+        'total_letters': total,
+        'unique_senders': correspondents('sender'),
+        'unique_recipients': correspondents('recipient'),
+        'unique_places': scalar('''
+            SELECT COUNT(DISTINCT p.geonames_id) FROM letters l
+            JOIN places p ON p.id = l.place_sent
+            WHERE p.geonames_id IS NOT NULL AND p.geonames_id != ''
+        '''),
+        'unique_subjects': scalar('''
+            SELECT COUNT(DISTINCT s.uri) FROM letter_subjects ls
+            JOIN subjects s ON s.id = ls.subject
+        '''),
+        'languages': scalar('SELECT COUNT(DISTINCT language) FROM letters'),
+        'date_range': {
+            'min': timeline[0][0] if timeline else None,
+            'max': timeline[-1][0] if timeline else None
+        },
+        'timeline': [{'year': year, 'count': count} for year, count in timeline],
+        'uncertainty': {
+            'date_precision': {
+                key: precision.get(key, 0) for key in ('day', 'month', 'year', 'range', 'unknown')
+            },
+            'date_certainty': {
+                key: certainty.get(key, 0) for key in ('high', 'medium', 'low')
+            },
+            'imprecise_dates_total': imprecise,
+            'imprecise_dates_pct': round(imprecise / total * 100, 1) if total else 0
+        }
+    }
+
+
+def write_sqlite(data: dict, output_file: Path) -> Path:
+    """Schreibt einen vollstaendigen Build (meta, letters) als SQLite-Datei.
+
+    Bei --place-table stehen die Koordinaten nur in data['places'].
+    """
+    coordinates = {}
+    table = data.get('places')
+    if table:
+        coordinates = {
+            geo_id: {'lat': lat, 'lon': lon}
+            for geo_id, lat, lon in zip(table['geonames_id'], table['lat'], table['lon'])
+            if lat is not None
+        }
+    writer = SqliteWriter(output_file, coordinates)
+    for letter in data['letters']:
+        writer.add(letter)
+    return writer.close(data['meta'])
+
+
+def read_meta(db_file: Path) -> dict:
+    """Liest den meta-Block aus einer SQLite-Datei."""
+    with sqlite3.connect(db_file) as conn:
+        return {key: json.loads(value) for key, value in conn.execute('SELECT key, value FROM meta')}
+
+
+def read_letters(db_file: Path) -> list:
+    """Baut die Briefliste wie in hsa-letters.json aus der Datenbank auf (Referenz/Tests)."""
+    conn = sqlite3.connect(db_file)
+    persons = {
+        row[0]: {'name': row[1], 'id': row[2], 'authority': row[3]}
+        for row in conn.execute('SELECT id, name, authority_id, authority FROM persons')
+    }
+    places = {}
+    for index, name, geo_id, lat, lon in conn.execute('SELECT * FROM places'):
+        place = {'name': name, 'geonames_id': geo_id}
+        if lat is not None:
+            place['lat'] = lat
+            place['lon'] = lon
+        places[index] = place
+    subjects = {
+        row[0]: {'uri': row[1], 'label': row[2], 'category': row[3]}
+        for row in conn.execute('SELECT * FROM subjects')
+    }
+    languages = dict(conn.execute('SELECT code, label FROM languages'))
+
+    def ref(table, index):
+        return dict(table[index]) if index is not None else None
+
+    letters = []
+    for row in conn.execute('SELECT * FROM letters ORDER BY ordinal'):
+        (_, letter_id, url, sender, recipient, date, date_to, year,
+         precision, certainty, earliest, latest, place_sent, language) = row
+        letters.append({
+            'id': letter_id,
+            'url': url,
+            'sender': ref(persons, sender),
+            'recipient': ref(persons, recipient),
+            'date': date,
+            'dateTo': date_to,
+            'year': year,
+            'datePrecision': precision,
+            'dateCertainty': certainty,
+            'dateBounds': [earliest, latest]
+            if earliest is not None or latest is not None else None,
+            'place_sent': ref(places, place_sent),
+            'language': {'code': language, 'label': languages[language]}
+            if language is not None else None,
+            'mentions': {'subjects': [], 'persons': [], 'places': []}
+        })
+    for table, field, entities in (('letter_subjects', 'subjects', subjects),
+                                   ('letter_persons', 'persons', persons),
+                                   ('letter_places', 'places', places)):
+        for letter, _, entity in conn.execute(f'SELECT * FROM {table} ORDER BY letter, position'):
+            letters[letter]['mentions'][field].append(ref(entities, entity))
+    conn.close()
+    return letters
@@ -0,0 +1,170 @@
+"""
+Statistik-Akkumulatoren fuer die HSA-Pipeline
+
+Jede Statistik im meta-Block wird von einem Akkumulator berechnet, der
+einmal pro Brief im Parse-Loop aktualisiert wird. Damit entfallen weitere
+Durchlaeufe ueber die Briefliste, und die Statistiken funktionieren auch
+im Streaming-Modus, in dem die Briefe nicht im Speicher bleiben.
+
+Neue Statistik hinzufuegen:
+
+    @register_accumulator
+    class MyAccumulator(Accumulator):
+        def add(self, letter): ...
+        def merge(self, other): ...
+        def contribute(self, meta): ...
+"""
+
+from collections import defaultdict
+
+
+ACCUMULATORS = []
+
+
+def register_accumulator(cls):
+    """Registriert eine Akkumulator-Klasse fuer alle Builds."""
+    ACCUMULATORS.append(cls)
+    return cls
+
+
+def new_accumulators() -> list:
+    """Erzeugt je registrierter Klasse einen frischen Akkumulator."""
+    return [cls() for cls in ACCUMULATORS]
+
+
+def accumulate(accumulators: list, letter: dict):
+    """Aktualisiert alle Akkumulatoren mit einem Brief."""
+    for accumulator in accumulators:
+        accumulator.add(letter)
+
+
+def merge_accumulators(target: list, partial: list):
+    """Fuehrt die Akkumulatoren eines Shards in die Gesamt-Akkumulatoren zusammen."""
+    for accumulator, other in zip(target, partial):
+        accumulator.merge(other)
+
+
+class Accumulator:
+    """Basisklasse: add() je Brief, merge() fuer Shards, contribute() schreibt in meta."""
+
+    def add(self, letter: dict):
+        raise NotImplementedError
+
+    def merge(self, other: 'Accumulator'):
+        raise NotImplementedError
+
+    def contribute(self, meta: dict):
+        raise NotImplementedError
+
+
+@register_accumulator
+class TotalAccumulator(Accumulator):
+    """Anzahl der Briefe."""
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, letter):
+        self.total += 1
+
+    def merge(self, other):
+        self.total += other.total
+
+    def contribute(self, meta):
+        meta['total_letters'] = self.total
+
+
+@register_accumulator
+class CorrespondentAccumulator(Accumulator):
+    """Eindeutige Sender und Empfaenger mit VIAF-ID (wie im Personen-Index)."""
+
+    def __init__(self):
+        self.senders = set()
+        self.recipients = set()
+
+    def add(self, letter):
+        sender = letter['sender']
+        if sender and sender['id'] and sender['authority'] == 'viaf':
+            self.senders.add(sender['id'])
+        recipient = letter['recipient']
+        if recipient and recipient['id'] and recipient['authority'] == 'viaf':
+            self.recipients.add(recipient['id'])
+
+    def merge(self, other):
+        self.senders |= other.senders
+        self.recipients |= other.recipients
+
+    def contribute(self, meta):
+        meta['unique_senders'] = len(self.senders)
+        meta['unique_recipients'] = len(self.recipients)
+
+
+@register_accumulator
+class TimelineAccumulator(Accumulator):
+    """Briefe pro Jahr, daraus Timeline und Zeitraum."""
+
+    def __init__(self):
+        self.years = defaultdict(int)
+
+    def add(self, letter):
+        if letter['year']:
+            self.years[letter['year']] += 1
+
+    def merge(self, other):
+        for year, count in other.years.items():
+            self.years[year] += count
+
+    def contribute(self, meta):
+        meta['date_range'] = {
+            'min': min(self.years, default=None),
+            'max': max(self.years, default=None)
+        }
+        meta['timeline'] = [{'year': y, 'count': c} for y, c in sorted(self.years.items())]
+
+
+@register_accumulator
+class UncertaintyAccumulator(Accumulator):
+    """Verteilung von Datumspraezision und -sicherheit."""
+
+    def __init__(self):
+        self.total = 0
+        self.precision = defaultdict(int)
+        self.certainty = defaultdict(int)
+
+    def add(self, letter):
+        self.total += 1
+        self.precision[letter['datePrecision']] += 1
+        self.certainty[letter['dateCertainty']] += 1
+
+    def merge(self, other):
+        self.total += other.total
+        for key, count in other.precision.items():
+            self.precision[key] += count
+        for key, count in other.certainty.items():
+            self.certainty[key] += count
+
+    def contribute(self, meta):
+        precision_counts = self.precision
+        certainty_counts = self.certainty
+        imprecise_dates = (
+            precision_counts['year'] +
+            precision_counts['month'] +
+            precision_counts['range'] +
+            precision_counts['unknown']
+        )
+        meta['uncertainty'] = {
+            'date_precision': {
+                'day': precision_counts['day'],
+                'month': precision_counts['month'],
+                'year': precision_counts['year'],
+                'range': precision_counts['range'],
+                'unknown': precision_counts['unknown']
+            },
+            'date_certainty': {
+                'high': certainty_counts['high'],
+                'medium': certainty_counts['medium'],
+                'low': certainty_counts['low']
+            },
+            'imprecise_dates_total': imprecise_dates,
+            'imprecise_dates_pct': round(imprecise_dates / self.total * 100, 1) if self.total else 0
+        }
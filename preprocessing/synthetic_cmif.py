@@ -0,0 +1,258 @@
+"""
+Synthetischer CMIF-Generator
+
+Erzeugt deterministisch (fester Seed) CMIF-Dateien beliebiger Groesse fuer
+Benchmarks. Die Struktur folgt dem, was analyze_hsa_cmif.py fuer das HSA
+berichtet:
+
+    - ego-zentriertes Netzwerk: eine zentrale Person ist in ego_share der
+      Briefe Sender oder Empfaenger, die uebrigen Korrespondenten und Orte
+      sind Zipf-verteilt
+    - Personen zu 96 % mit VIAF-, sonst mit GND-URI
+    - Absende-Orte mit GeoNames-URI (sws.geonames.org)
+    - note/ref mit LOD-Academy-Typen: hasLanguage, mentionsSubject (HSA-
+      Subjects, HSA-Languages, Lexvo), mentionsPerson, mentionsPlace
+    - Datumspraezision und -sicherheit nach einstellbarer Mischung
+
+Zu jeder CMIF-Datei wird eine Koordinatendatei im Format von
+data/geonames_coordinates.json geschrieben (coverage Anteil der Orte mit
+Koordinaten), damit enrich_with_coordinates realistisch arbeitet.
+
+Usage:
+    python preprocessing/synthetic_cmif.py --letters 100000 --output /tmp/cmif-100k.xml
+"""
+
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+import argparse
+import bisect
+import itertools
+import json
+import random
+
+
+VOCAB = 'https://lod.academy/cmif/vocab/terms#'
+YEAR_RANGE = (1859, 1927)
+LANGUAGES = [
+    ('de', 'Deutsch'), ('fr', 'Französisch'), ('es', 'Spanisch'), ('it', 'Italienisch'),
+    ('eu', 'Baskisch'), ('en', 'Englisch'), ('pt', 'Portugiesisch'), ('hu', 'Ungarisch'),
+    ('ro', 'Rumänisch'), ('ca', 'Katalanisch'), ('nl', 'Niederländisch'), ('sl', 'Slowenisch'),
+    ('cs', 'Tschechisch'), ('sv', 'Schwedisch'), ('da', 'Dänisch'), ('la', 'Latein'),
+    ('hr', 'Kroatisch'), ('ru', 'Russisch')
+]
+SYLLABLES = [
+    'ma', 'ri', 'schu', 'chardt', 'ko', 'lá', 'vić', 'gra', 'zen', 'ber', 'ö', 'stein',
+    'el', 'nu', 'ja', 'ő', 'ur', 'qui', 'jo', 'spit', 'zer', 'la', 'combe', 'gart', 'ner'
+]
+DEFAULT_PRECISION = {'day': 0.62, 'month': 0.12, 'year': 0.1, 'range': 0.08, 'unknown': 0.08}
+DEFAULT_CERTAINTY = {'high': 0.85, 'medium': 0.1, 'low': 0.05}
+
+
+def zipf_sampler(rng: random.Random, n: int, exponent: float = 1.1):
+    """Liefert eine Funktion, die Indizes 0..n-1 Zipf-verteilt zieht."""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+    total = cumulative[-1]
+    return lambda: bisect.bisect_left(cumulative, rng.random() * total)
+
+
+def weighted_choice(rng: random.Random, weights: dict):
+    keys = list(weights)
+    return rng.choices(keys, weights=[weights[k] for k in keys])[0]
+
+
+def make_name(rng: random.Random) -> str:
+    def word():
+        return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return f"{word()}, {word()}"
+
+
+def date_element(rng: random.Random, precision: str, certainty: str) -> str:
+    if precision == 'unknown':
+        return ''
+    year = rng.randint(*YEAR_RANGE)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    cert = '' if certainty == 'high' else f' cert="{certainty}"'
+    if precision == 'day':
+        attrs = f'when="{year}-{month:02d}-{day:02d}"'
+    elif precision == 'month':
+        attrs = f'when="{year}-{month:02d}"'
+    elif precision == 'year':
+        attrs = f'when="{year}"'
+    elif rng.random() < 0.5:
+        attrs = f'from="{year}-{month:02d}-01" to="{year}-{month:02d}-28"'
+    else:
+        attrs = f'notBefore="{year}-01-01" notAfter="{min(year + 1, YEAR_RANGE[1])}-12-31"'
+    return f'\n          <date {attrs}{cert}/>'
+
+
+class CorpusModel:
+    """Personen, Orte und Subjects eines synthetischen Korpus."""
+
+    def __init__(self, rng: random.Random, persons: int, places: int, subjects: int):
+        self.rng = rng
+        self.persons = [
+            (f'https://viaf.org/viaf/{10000000 + i}' if rng.random() < 0.96
+             else f'https://d-nb.info/gnd/{118000000 + i}', make_name(rng))
+            for i in range(persons)
+        ]
+        self.places = [
+            (2000000 + i, make_name(rng).split(',')[0],
+             round(rng.uniform(-40, 65), 6), round(rng.uniform(-120, 150), 6))
+            for i in range(places)
+        ]
+        self.subjects = []
+        for i in range(subjects):
+            kind = rng.random()
+            if kind < 0.78:
+                uri = f'https://gams.uni-graz.at/o:hsa.subjects#S.{1000 + i}'
+            elif kind < 0.9:
+                uri = f'https://gams.uni-graz.at/o:hsa.languages#L.{100 + i}'
+            else:
+                uri = f'http://lexvo.org/id/iso639-3/x{i:02x}'
+            self.subjects.append((uri, make_name(rng).split(',')[0]))
+        self.person = zipf_sampler(rng, persons)
+        self.place = zipf_sampler(rng, places)
+        self.subject = zipf_sampler(rng, subjects)
+
+
+def person_element(ref: str, name: str) -> str:
+    return f'<persName ref={quoteattr(ref)}>{escape(name)}</persName>'
+
+
+def generate_letter(model: CorpusModel, key: int, ego_share: float, mention_density: float,
+                    precision: dict, certainty: dict) -> str:
+    rng = model.rng
+    ego = model.persons[0]
+    other = model.persons[1 + model.person() % (len(model.persons) - 1)]
+    if rng.random() < ego_share:
+        sender, recipient = (ego, other) if rng.random() < 0.2 else (other, ego)
+    else:
+        sender, recipient = other, model.persons[model.person()]
+
+    place = model.places[model.place()]
+    date = date_element(rng, weighted_choice(rng, precision), weighted_choice(rng, certainty))
+
+    refs = []
+    if rng.random() < 0.9:
+        code, label = LANGUAGES[min(int(rng.expovariate(0.5)), len(LANGUAGES) - 1)]
+        refs.append(f'<ref type="{VOCAB}hasLanguage" target="{code}">{label}</ref>')
+    mentions = int(rng.expovariate(1 / mention_density)) if mention_density > 0 else 0
+    for _ in range(mentions):
+        kind = rng.random()
+        if kind < 0.6:
+            uri, label = model.subjects[model.subject()]
+            refs.append(f'<ref type="{VOCAB}mentionsSubject" target={quoteattr(uri)}>'
+                        f'{escape(label)}</ref>')
+        elif kind < 0.85:
+            uri, name = model.persons[model.person()]
+            refs.append(f'<ref type="{VOCAB}mentionsPerson" target={quoteattr(uri)}>'
+                        f'{escape(name)}</ref>')
+        else:
+            geo_id, name, _, _ = model.places[model.place()]
+            refs.append(f'<ref type="{VOCAB}mentionsPlace" '
+                        f'target="http://sws.geonames.org/{geo_id}">{escape(name)}</ref>')
+    note = ''
+    if refs:
+        note = '\n        <note>\n          ' + '\n          '.join(refs) + '\n        </note>'
+
+    return f'''      <correspDesc ref="https://example.org/letter/{key}" key="{key}">
+        <correspAction type="sent">
+          {person_element(*sender)}
+          <placeName ref="http://sws.geonames.org/{place[0]}">{escape(place[1])}</placeName>{date}
+        </correspAction>
+        <correspAction type="received">
+          {person_element(*recipient)}
+        </correspAction>{note}
+      </correspDesc>
+'''
+
+
+def generate_cmif(output_file: Path, letters: int, persons: int = 1000, places: int = 800,
+                  subjects: int = 1600, mention_density: float = 1.5, ego_share: float = 0.9,
+                  precision: dict = None, certainty: dict = None, coverage: float = 0.83,
+                  seed: int = 42) -> Path:
+    """Schreibt eine synthetische CMIF-Datei und liefert den Pfad der Koordinatendatei.
+
+    Gleiche Parameter und gleicher Seed ergeben byteidentische Dateien.
+    """
+    rng = random.Random(seed)
+    model = CorpusModel(rng, max(persons, 2), max(places, 1), max(subjects, 1))
+    precision = precision or DEFAULT_PRECISION
+    certainty = certainty or DEFAULT_CERTAINTY
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <teiHeader>
+    <fileDesc>
+      <titleStmt>
+        <title>Synthetisches CMIF ({letters} Briefe, Seed {seed})</title>
+      </titleStmt>
+    </fileDesc>
+    <profileDesc>
+''')
+        for key in range(1, letters + 1):
+            f.write(generate_letter(model, key, ego_share, mention_density, precision, certainty))
+        f.write('''    </profileDesc>
+  </teiHeader>
+  <text><body><p/></body></text>
+</TEI>
+''')
+
+    coordinates = {
+        str(geo_id): {'lat': lat, 'lon': lon, 'label_en': name, 'label_de': name}
+        for geo_id, name, lat, lon in model.places
+        if rng.random() < coverage
+    }
+    coords_file = output_file.with_suffix('.coordinates.json')
+    with open(coords_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {'source': 'synthetic', 'total_requested': len(model.places),
+                     'total_resolved': len(coordinates)},
+            'coordinates': coordinates
+        }, f, ensure_ascii=False)
+    return coords_file
+
+
+def parse_mix(value: str) -> dict:
+    """'day=0.6,month=0.2' -> {'day': 0.6, 'month': 0.2}"""
+    mix = {}
+    for part in value.split(','):
+        key, _, weight = part.partition('=')
+        mix[key.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetisches CMIF fuer Benchmarks')
+    parser.add_argument('--letters', type=int, default=10000, help='Anzahl Briefe')
+    parser.add_argument('--persons', type=int, default=1000, help='Anzahl Personen')
+    parser.add_argument('--places', type=int, default=800, help='Anzahl Orte')
+    parser.add_argument('--subjects', type=int, default=1600, help='Anzahl Subjects')
+    parser.add_argument('--mentions', type=float, default=1.5,
+                        help='Mittlere Anzahl mentions* je Brief')
+    parser.add_argument('--ego-share', type=float, default=0.9,
+                        help='Anteil der Briefe mit der zentralen Person')
+    parser.add_argument('--precision', type=parse_mix, default=None,
+                        help='Mischung der Datumspraezision, z.B. day=0.6,month=0.2,unknown=0.2')
+    parser.add_argument('--certainty', type=parse_mix, default=None,
+                        help='Mischung der Datumssicherheit, z.B. high=0.8,low=0.2')
+    parser.add_argument('--coverage', type=float, default=0.83,
+                        help='Anteil der Orte mit Koordinaten')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, required=True, help='Ziel-CMIF-Datei')
+    args = parser.parse_args()
+
+    coords_file = generate_cmif(
+        args.output, args.letters, persons=args.persons, places=args.places,
+        subjects=args.subjects, mention_density=args.mentions, ego_share=args.ego_share,
+        precision=args.precision, certainty=args.certainty, coverage=args.coverage,
+        seed=args.seed
+    )
+    print(f"CMIF: {args.output} ({args.output.stat().st_size / 1024 / 1024:.1f} MB)")
+    print(f"Koordinaten: {coords_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""Die Preprocessing-Skripte importieren sich gegenseitig als Top-Level-Module."""
+
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
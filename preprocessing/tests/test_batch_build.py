@@ -0,0 +1,18 @@
+import pytest
+
+from batch_build import inner_workers
+
+
+@pytest.mark.parametrize('workers, jobs, cpu_count, expected', [
+    (0, 1, 8, 8),     # ein Build: alle Kerne
+    (0, 4, 8, 2),     # --workers 0 teilt die Kerne auf
+    (0, 8, 8, 1),
+    (0, 16, 8, 1),    # mehr Builds als Kerne: seriell parsen
+    (1, 4, 8, 1),
+    (2, 2, 8, 2),     # passt, bleibt
+    (8, 4, 8, 2),     # explizit zu viele
+    (0, 3, 8, 2),
+])
+def test_inner_workers(workers, jobs, cpu_count, expected):
+    assert inner_workers(workers, jobs, cpu_count) == expected
+    assert jobs * inner_workers(workers, jobs, cpu_count) <= max(cpu_count, jobs)
@@ -0,0 +1,32 @@
+import pytest
+
+from cmif_uri import extract_id_from_uri
+
+
+@pytest.mark.parametrize('uri, expected', [
+    ('http://viaf.org/viaf/261931943', ('261931943', 'viaf')),
+    ('https://viaf.org/viaf/261931943/', ('261931943', 'viaf')),
+    ('http://viaf.org/', (None, 'viaf')),
+    ('http://www.geonames.org/2778067', ('2778067', 'geonames')),
+    ('https://sws.geonames.org/2778067/', ('2778067', 'geonames')),
+    ('https://gams.uni-graz.at/o:hsa.subjects#S.1234', ('1234', 'hsa_subject')),
+    ('https://gams.uni-graz.at/o:hsa.subjects', (None, 'hsa_subject')),
+    ('https://gams.uni-graz.at/o:hsa.languages#L.7', ('7', 'hsa_language')),
+    ('http://lexvo.org/id/iso639-3/deu', ('deu', 'lexvo')),
+    ('https://schuchardt.uni-graz.at/id/person/2087', ('2087', 'hsa_person')),
+    # GND: frueher in build_hsa_data.py (URI, 'unknown'), jetzt ID und Typ
+    ('http://d-nb.info/gnd/118610643', ('118610643', 'gnd')),
+    ('https://d-nb.info/gnd/10004764X', ('10004764X', 'gnd')),
+    ('https://d-nb.info/gnd/', (None, 'gnd')),
+    ('https://example.org/person/1', ('https://example.org/person/1', 'unknown')),
+    ('', (None, None)),
+    (None, (None, None)),
+])
+def test_extract_id_from_uri(uri, expected):
+    assert extract_id_from_uri(uri) == expected
+
+
+def test_marker_order_decides():
+    # viaf steht in der Kette vor geonames, unabhaengig von der Position in der URI
+    uri = 'https://geonames.org/1?same=http://viaf.org/viaf/2'
+    assert extract_id_from_uri(uri) == ('2', 'viaf')
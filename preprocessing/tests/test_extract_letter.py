@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from build_hsa_data import CORRESP_DESC, extract_letter, parse_cmif
+from hsa_records import Interner, record_to_json
+
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'docs' / 'data'
+
+# Randfaelle der frueheren Pfad-Auswertung: erste correspAction je type auch
+# verschachtelt, darin das erste persName/placeName/date, nur die erste note
+# direkt unter correspDesc, Kommentare dazwischen
+TRICKY = '''<TEI xmlns="http://www.tei-c.org/ns/1.0"><correspDesc ref="a/1">
+<!-- c --><correspAction type="received"><persName>R1</persName><persName ref="x">R2</persName></correspAction>
+<wrap><correspAction type="sent"><note>n</note><placeName ref="http://sws.geonames.org/12">P</placeName><persName ref="https://viaf.org/viaf/1">S</persName><date notBefore="1890" notAfter="1891"/><date when="1900"/></correspAction></wrap>
+<correspAction type="sent"><persName>Other</persName></correspAction>
+<correspAction><note><ref type="#mentionsPerson">no</ref></note></correspAction>
+<note><ref type="https://x#mentionsSubject#hasLanguage" target="t">L</ref><!--x--><ref type="">e</ref><ref>z</ref><ref type="#mentionsPlace" target="http://sws.geonames.org/3">pl</ref><ref type="#hasLanguage" target="de">Deutsch</ref></note>
+<note><ref type="#mentionsPerson" target="https://viaf.org/viaf/9">ignored</ref></note>
+</correspDesc><correspDesc/><correspDesc><note/><correspAction type="sent"/></correspDesc></TEI>'''
+
+EMPTY = {
+    'id': '', 'url': '', 'sender': None, 'recipient': None, 'date': None, 'dateTo': None,
+    'year': None, 'datePrecision': 'unknown', 'dateCertainty': 'high', 'dateBounds': None,
+    'place_sent': None, 'language': None,
+    'mentions': {'subjects': [], 'persons': [], 'places': []}
+}
+
+EXPECTED = [
+    {
+        'id': '1',
+        'url': 'a/1',
+        'sender': {'name': 'S', 'id': '1', 'authority': 'viaf'},
+        'recipient': {'name': 'R1', 'id': None, 'authority': None},
+        'date': '1890',
+        'dateTo': '1891',
+        'year': 1890,
+        'datePrecision': 'range',
+        'dateCertainty': 'high',
+        'dateBounds': [689944, 690673],
+        'place_sent': {'name': 'P', 'geonames_id': '12'},
+        'language': {'code': 'de', 'label': 'Deutsch'},
+        'mentions': {'subjects': [{'uri': 't', 'label': 'L', 'category': 'unknown'}],
+                     'persons': [],
+                     'places': [{'name': 'pl', 'geonames_id': '3'}]}
+    },
+    EMPTY,
+    EMPTY,
+]
+
+
+def as_json(letter) -> dict:
+    return json.loads(json.dumps(letter, default=record_to_json))
+
+
+@pytest.mark.parametrize('interner', [None, Interner()], ids=['unshared', 'interned'])
+def test_extract_letter_edge_cases(interner):
+    root = etree.fromstring(TRICKY)
+    letters = [as_json(extract_letter(corresp, interner)) for corresp in root.iter(CORRESP_DESC)]
+    assert letters == EXPECTED
+
+
+def test_extract_letter_keeps_field_order():
+    corresp = next(etree.fromstring(TRICKY).iter(CORRESP_DESC))
+    assert list(as_json(extract_letter(corresp))) == list(EXPECTED[0])
+
+
+@pytest.mark.parametrize('name', ['schoenbach.xml', 'test-uncertainty.xml', 'demo-showcase.xml'])
+def test_parse_modes_match(name):
+    def parse(**kwargs):
+        data = parse_cmif(DATA_DIR / name, **kwargs)
+        data['meta'].pop('generated', None)
+        return json.dumps(data, default=record_to_json)
+
+    tree = parse()
+    assert parse(streaming=True) == tree
+    assert parse(workers=2) == tree
@@ -0,0 +1,37 @@
+from hsa_cache import cache_key, load_cached, store_cached
+
+
+def write_cmif(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+def test_roundtrip(tmp_path):
+    cmif_file = write_cmif(tmp_path / 'a' / 'CMIF.xml', '<TEI/>')
+    key = cache_key(cmif_file, 1)
+    store_cached(tmp_path / 'cache', cmif_file, key, {'letters': [1, 2]})
+    assert load_cached(tmp_path / 'cache', cmif_file, key) == {'letters': [1, 2]}
+    assert load_cached(tmp_path / 'cache', cmif_file, cache_key(cmif_file, 2)) is None
+
+
+def test_same_stem_in_different_directories(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = write_cmif(tmp_path / 'a' / 'CMIF.xml', '<TEI n="a"/>')
+    second = write_cmif(tmp_path / 'b' / 'CMIF.xml', '<TEI n="b"/>')
+    first_key, second_key = cache_key(first, 1), cache_key(second, 1)
+    store_cached(cache_dir, first, first_key, 'a')
+    store_cached(cache_dir, second, second_key, 'b')
+    assert load_cached(cache_dir, first, first_key) == 'a'
+    assert load_cached(cache_dir, second, second_key) == 'b'
+
+
+def test_newer_entry_replaces_older(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cmif_file = write_cmif(tmp_path / 'CMIF.xml', '<TEI n="1"/>')
+    old_key = cache_key(cmif_file, 1)
+    store_cached(cache_dir, cmif_file, old_key, 'alt')
+    cmif_file.write_text('<TEI n="2"/>', encoding='utf-8')
+    new_path = store_cached(cache_dir, cmif_file, cache_key(cmif_file, 1), 'neu')
+    assert load_cached(cache_dir, cmif_file, old_key) is None
+    assert sorted(p.name for p in cache_dir.iterdir()) == [new_path.name]
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from hsa_clusters import build_clusters, clusters_for_zoom
+
+
+def make_places(count=120, seed=9):
+    rng = random.Random(seed)
+    places = {}
+    for i in range(count):
+        # Dichte Gruppen um einige Zentren, dazu verstreute Orte
+        if rng.random() < 0.7:
+            lat, lon = rng.choice([(47.07, 15.44), (48.21, 16.37), (41.9, 12.5)])
+            lat += rng.gauss(0, 0.3)
+            lon += rng.gauss(0, 0.3)
+        else:
+            lat, lon = rng.uniform(-60, 70), rng.uniform(-170, 170)
+        places[str(1000 + i)] = {'name': f'Ort {i}', 'lat': lat, 'lon': lon,
+                                 'letter_count': rng.randint(0, 40)}
+    # Gleiche Koordinaten zerfallen auf keiner Stufe
+    places['1'] = {'name': 'Graz', 'lat': 47.06667, 'lon': 15.45, 'letter_count': 3}
+    places['2'] = {'name': 'Graz (Stadt)', 'lat': 47.06667, 'lon': 15.45, 'letter_count': 5}
+    places['3'] = {'name': 'ohne Koordinaten', 'letter_count': 7}
+    return places
+
+
+PLACES = make_places()
+
+
+@pytest.fixture(scope='module')
+def clusters():
+    return build_clusters(PLACES, max_zoom=10)
+
+
+def test_every_place_once_per_level(clusters):
+    located = {geo_id for geo_id, p in PLACES.items() if p.get('lat') is not None}
+    total = sum(PLACES[geo_id]['letter_count'] for geo_id in located)
+    assert clusters['places'] == len(located)
+    assert clusters['places_without_coordinates'] == 1
+    assert [level['zoom'] for level in clusters['zooms']] == list(range(11))
+    for level in clusters['zooms']:
+        members = [geo_id for c in level['clusters'] for geo_id in c['places']]
+        assert sorted(members) == sorted(located)
+        assert sum(c['letter_count'] for c in level['clusters']) == total
+        assert all(c['place_count'] == len(c['places']) for c in level['clusters'])
+
+
+def test_clusters_nest_across_levels(clusters):
+    levels = clusters['zooms']
+    for coarse, fine in zip(levels, levels[1:]):
+        parent_of = {geo_id: i for i, c in enumerate(coarse['clusters']) for geo_id in c['places']}
+        for cluster in fine['clusters']:
+            assert len({parent_of[geo_id] for geo_id in cluster['places']}) == 1
+
+
+def test_expansion_zoom_is_first_split(clusters):
+    levels = clusters['zooms']
+    max_zoom = clusters['max_zoom']
+    cluster_of = [
+        {geo_id: i for i, c in enumerate(level['clusters']) for geo_id in c['places']}
+        for level in levels
+    ]
+    expanded_at_max = 0
+    for zoom, level in enumerate(levels):
+        for cluster in level['clusters']:
+            members = cluster['places']
+            if len(members) == 1:
+                assert cluster['expansion_zoom'] is None
+                continue
+            expansion = cluster['expansion_zoom']
+            assert zoom < expansion <= max_zoom + 1
+            for finer in range(zoom + 1, min(expansion, max_zoom + 1)):
+                assert len({cluster_of[finer][geo_id] for geo_id in members}) == 1
+            if expansion <= max_zoom:
+                assert len({cluster_of[expansion][geo_id] for geo_id in members}) > 1
+            else:
+                expanded_at_max += 1
+    # Die beiden Graz-Eintraege mit gleichen Koordinaten
+    assert expanded_at_max
+
+
+def test_cluster_center_is_weighted_mean(clusters):
+    for level in clusters['zooms']:
+        for cluster in level['clusters']:
+            members = [PLACES[geo_id] for geo_id in cluster['places']]
+            weights = [max(p['letter_count'], 1) for p in members]
+            lat = sum(p['lat'] * w for p, w in zip(members, weights)) / sum(weights)
+            assert cluster['lat'] == pytest.approx(lat, abs=1e-6)
+
+
+def test_clusters_for_zoom(clusters):
+    assert clusters_for_zoom(clusters, 3.7) is clusters['zooms'][3]['clusters']
+    assert clusters_for_zoom(clusters, -1) is clusters['zooms'][0]['clusters']
+    assert clusters_for_zoom(clusters, 11) is None
@@ -0,0 +1,101 @@
+import random
+from datetime import date
+
+import pytest
+
+from hsa_intervals import IntervalIndex, date_bounds, day_range
+
+
+def day(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+
+@pytest.mark.parametrize('attributes, expected', [
+    ({'when': '1890-05-12'}, ['1890-05-12', '1890-05-12']),
+    ({'when': '1890-05'}, ['1890-05-01', '1890-05-31']),
+    ({'when': '1892-02'}, ['1892-02-01', '1892-02-29']),
+    ({'when': '1890'}, ['1890-01-01', '1890-12-31']),
+    ({'from_date': '1890-05', 'to_date': '1891'}, ['1890-05-01', '1891-12-31']),
+    ({'not_before': '1890-05-12'}, ['1890-05-12', None]),
+    ({'not_after': '1891'}, [None, '1891-12-31']),
+    ({'when': '1890', 'not_before': '1890-06'}, ['1890-06-01', '1890-12-31']),
+])
+def test_date_bounds(attributes, expected):
+    assert date_bounds(**attributes) == [day(v) if v else None for v in expected]
+
+
+@pytest.mark.parametrize('attributes', [
+    {}, {'when': '1890-13'}, {'when': '1890-02-30'}, {'when': '0000'}, {'when': 'um 1890'},
+    {'not_before': '1891', 'not_after': '1890'},
+])
+def test_date_bounds_without_interval(attributes):
+    assert date_bounds(**attributes) is None
+
+
+def test_day_range():
+    assert day_range('1890', '1891-02') == (day('1890-01-01'), day('1891-02-28'))
+    assert day_range(5, '0001-01-10') == (5, 10)
+    with pytest.raises(ValueError):
+        day_range('1890-13', '1891')
+
+
+def brute_force(bounds, a, b):
+    possibly, certainly = [], []
+    if a > b:
+        return possibly, certainly
+    for ordinal, interval in enumerate(bounds):
+        if not interval:
+            continue
+        earliest, latest = interval
+        lower_ok = earliest is None or earliest <= b
+        upper_ok = latest is None or latest >= a
+        if lower_ok and upper_ok:
+            possibly.append(ordinal)
+        if earliest is not None and latest is not None and a <= earliest and latest <= b:
+            certainly.append(ordinal)
+    return possibly, certainly
+
+
+BASE = day('1880-01-01')
+
+
+def random_bounds(rng, count):
+    bounds = []
+    for _ in range(count):
+        kind = rng.random()
+        earliest = BASE + rng.randint(0, 400)
+        latest = earliest + rng.choice([0, 0, 1, 5, 30, 200])
+        if kind < 0.1:
+            bounds.append(None)
+        elif kind < 0.2:
+            bounds.append([earliest, None])
+        elif kind < 0.3:
+            bounds.append([None, latest])
+        else:
+            bounds.append([earliest, latest])
+    return bounds
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, 7, 64, 300])
+def test_index_matches_brute_force(count):
+    rng = random.Random(count)
+    bounds = random_bounds(rng, count)
+    index = IntervalIndex(bounds)
+    assert len(index) == sum(1 for b in bounds if b)
+    for _ in range(200):
+        a = BASE + rng.randint(-20, 650)
+        b = a + rng.choice([-1, 0, 0, 3, 40, 400])
+        possibly, certainly = brute_force(bounds, a, b)
+        assert index.possibly(a, b) == possibly, (a, b)
+        assert index.certainly(a, b) == certainly, (a, b)
+        assert index.count_possibly(a, b) == len(possibly), (a, b)
+
+
+def test_index_with_equal_bounds():
+    bounds = [[10, 20]] * 5 + [[10, None], [None, 20]]
+    index = IntervalIndex(bounds)
+    for a, b in ((10, 20), (20, 20), (21, 30), (1, 9), (10, 19), (20, 10)):
+        possibly, certainly = brute_force(bounds, a, b)
+        assert index.possibly(a, b) == possibly
+        assert index.certainly(a, b) == certainly
+        assert index.count_possibly(a, b) == len(possibly)
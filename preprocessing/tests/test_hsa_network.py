@@ -0,0 +1,127 @@
+from collections import Counter
+from itertools import combinations
+import random
+
+import pytest
+
+from hsa_network import UNDATED, build_network, sum_edges
+
+
+PERSONS = [
+    {'name': 'Hugo Schuchardt', 'id': '1', 'authority': 'viaf'},
+    {'name': 'Leo Spitzer', 'id': '2', 'authority': 'viaf'},
+    {'name': 'Paul Meyer', 'id': None, 'authority': None},
+    {'name': 'Anonym', 'id': None, 'authority': None},
+]
+PLACES = [{'name': 'Graz', 'geonames_id': '2778067'}, {'name': 'Wien', 'geonames_id': '2761369'},
+          {'name': 'Lemberg', 'geonames_id': None}]
+SUBJECTS = [{'uri': 's:1', 'label': 'Baskisch'}, {'uri': 's:2', 'label': 'Kreolsprachen'},
+            {'uri': None, 'label': 'Romanistik'}]
+
+
+def make_letters(count=150, seed=5):
+    rng = random.Random(seed)
+    letters = []
+    for _ in range(count):
+        letters.append({
+            'sender': rng.choice(PERSONS + [None]),
+            'recipient': rng.choice(PERSONS + [None]),
+            'year': rng.choice([1885, 1890, 1891, 1900, None]),
+            'mentions': {
+                # Mit Wiederholungen: ein Paar zaehlt je Brief nur einmal
+                'persons': rng.choices(PERSONS, k=rng.randint(0, 4)),
+                'places': rng.choices(PLACES, k=rng.randint(0, 3)),
+                'subjects': rng.choices(SUBJECTS, k=rng.randint(0, 3)),
+            }
+        })
+    return letters
+
+
+LETTERS = make_letters()
+KEYS = {
+    'persons': lambda p: p['id'] or p['name'],
+    'places': lambda p: p['geonames_id'] or p['name'],
+    'subjects': lambda s: s['uri'] or s['label'],
+}
+
+
+@pytest.fixture(scope='module')
+def network():
+    return build_network(LETTERS)
+
+
+def direct_edges(year_min=None, year_max=None):
+    filtered = year_min is not None or year_max is not None
+    weights = Counter()
+    for letter in LETTERS:
+        if not letter['sender'] or not letter['recipient']:
+            continue
+        year = letter['year']
+        if filtered and (year is None or (year_min is not None and year < year_min)
+                         or (year_max is not None and year > year_max)):
+            continue
+        weights[(KEYS['persons'](letter['sender']), KEYS['persons'](letter['recipient']))] += 1
+    return weights
+
+
+def test_correspondence_edges(network):
+    edges = network['correspondence']['edges']
+    assert {(e['source'], e['target']): e['weight'] for e in edges} == direct_edges()
+    assert [e['weight'] for e in edges] == sorted((e['weight'] for e in edges), reverse=True)
+    for edge in edges:
+        assert sum(count for _, count in edge['years']) == edge['weight']
+        years = Counter(
+            letter['year'] or UNDATED for letter in LETTERS
+            if letter['sender'] and letter['recipient']
+            and KEYS['persons'](letter['sender']) == edge['source']
+            and KEYS['persons'](letter['recipient']) == edge['target']
+        )
+        assert dict(edge['years']) == years
+
+
+def test_correspondence_nodes(network):
+    nodes = network['correspondence']['nodes']
+    with_both = [l for l in LETTERS if l['sender'] and l['recipient']]
+    assert {k: n['sent'] for k, n in nodes.items() if n['sent']} == Counter(
+        KEYS['persons'](l['sender']) for l in with_both)
+    assert {k: n['received'] for k, n in nodes.items() if n['received']} == Counter(
+        KEYS['persons'](l['recipient']) for l in with_both)
+
+
+@pytest.mark.parametrize('year_min, year_max', [
+    (None, None), (1890, None), (None, 1890), (1890, 1891), (1886, 1889), (1900, 1900),
+])
+def test_sum_edges(network, year_min, year_max):
+    result = sum_edges(network, year_min, year_max)
+    assert {(e['source'], e['target']): e['weight'] for e in result} == direct_edges(
+        year_min, year_max)
+    assert all(e['weight'] > 0 for e in result)
+
+
+@pytest.mark.parametrize('field', ['persons', 'places', 'subjects'])
+def test_comention_pairs(network, field):
+    matrix = network['mentions'][field]
+    nodes = matrix['nodes']
+    assert len(set(nodes)) == len(nodes)
+
+    pairs = Counter()
+    pairs_by_year = {}
+    letter_counts = Counter()
+    for letter in LETTERS:
+        keys = sorted({KEYS[field](item) for item in letter['mentions'][field]})
+        letter_counts.update(keys)
+        year = str(letter['year'] or UNDATED)
+        for pair in combinations(keys, 2):
+            pairs[pair] += 1
+            pairs_by_year.setdefault(year, Counter())[pair] += 1
+
+    def as_counter(entries):
+        # Symmetrisch: ein Paar steht einmal, mit i < j
+        assert all(i < j for i, j, _ in entries)
+        assert len({(i, j) for i, j, _ in entries}) == len(entries)
+        return Counter({tuple(sorted((nodes[i], nodes[j]))): c for i, j, c in entries})
+
+    assert as_counter(matrix['pairs']) == pairs
+    by_year = {year: as_counter(entries) for year, entries in matrix['by_year'].items()}
+    assert by_year == pairs_by_year
+    assert dict(zip(nodes, matrix['letters'])) == letter_counts
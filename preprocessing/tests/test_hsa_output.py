@@ -0,0 +1,220 @@
+import copy
+import gzip
+import json
+from pathlib import Path
+import struct
+
+import pytest
+
+from build_hsa_data import build_streaming, enrich_with_coordinates, parse_cmif
+from hsa_output import (BROTLI_AVAILABLE, from_compact, load_sharded, read_binary, to_compact,
+                        write_binary, write_json, write_json_stream, write_precompressed,
+                        write_sharded)
+from hsa_records import record_to_json
+
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'docs' / 'data'
+
+
+SCHUCHARDT = {'name': 'Hugo Schuchardt', 'id': '261931943', 'authority': 'viaf'}
+SPITZER = {'name': 'Leo Spitzer', 'id': '118616331', 'authority': 'gnd'}
+GRAZ = {'name': 'Graz', 'geonames_id': '2778067', 'lat': 47.06667, 'lon': 15.45}
+TBILISI = {'name': 'Tbilissi – თბილისი', 'geonames_id': '611717'}
+
+
+def make_letter(**fields):
+    letter = {
+        'id': 'L1',
+        'url': 'https://gams.uni-graz.at/o:hsa.letter.L1',
+        'sender': SCHUCHARDT,
+        'recipient': SPITZER,
+        'date': '1890-01-01',
+        'dateTo': None,
+        'year': 1890,
+        'datePrecision': 'day',
+        'dateCertainty': 'high',
+        'dateBounds': [690246, 690246],
+        'place_sent': GRAZ,
+        'language': {'code': 'de', 'label': 'Deutsch'},
+        'mentions': {
+            'subjects': [{'uri': 'https://gams.uni-graz.at/o:hsa.subjects#T1',
+                          'label': 'Baskisch', 'category': 'hsa_subject'}],
+            'persons': [SPITZER],
+            'places': [GRAZ]
+        }
+    }
+    letter.update(fields)
+    return copy.deepcopy(letter)
+
+
+def make_data():
+    letters = [
+        make_letter(),
+        # Nullwerte und leere Listen
+        make_letter(id='L2', url='https://gams.uni-graz.at/o:hsa.letter.L2',
+                    sender=None, recipient=None, date=None, year=None,
+                    datePrecision='unknown', dateCertainty='low', dateBounds=None,
+                    place_sent=None, language=None,
+                    mentions={'subjects': [], 'persons': [], 'places': []}),
+        # Nicht-ASCII, Zeitraum, Ort ohne Koordinaten
+        make_letter(id='L3', url='https://gams.uni-graz.at/o:hsa.letter.L3',
+                    sender={'name': 'Ǵorǵi Čubinašvili – გიორგი', 'id': None,
+                            'authority': None},
+                    date='1885', dateTo='1886-03', year=1885, datePrecision='range',
+                    dateBounds=[687563, 688126], place_sent=TBILISI,
+                    mentions={'subjects': [], 'persons': [SCHUCHARDT, SCHUCHARDT],
+                              'places': [TBILISI, GRAZ]}),
+        make_letter(id='L4', url='https://gams.uni-graz.at/o:hsa.letter.L4',
+                    dateBounds=[None, 690000]),
+    ]
+    return {
+        'meta': {'title': 'Hugo Schuchardt Archiv – Test', 'total_letters': len(letters)},
+        'letters': letters,
+        'indices': {'persons': {'261931943': {'name': 'Hugo Schuchardt', 'letter_count': 3}}}
+    }
+
+
+def test_compact_roundtrip():
+    data = make_data()
+    assert from_compact(to_compact(data)) == data
+
+
+def test_compact_roundtrip_empty():
+    data = {'meta': {}, 'letters': [], 'indices': {}}
+    assert from_compact(to_compact(data)) == data
+
+
+def test_compact_keeps_ids_not_derived_from_url():
+    data = make_data()
+    data['letters'][1]['id'] = 'abweichend'
+    compact = to_compact(data)
+    assert 'id' in compact['letters']
+    assert from_compact(compact) == data
+
+
+def test_compact_copies_shared_objects():
+    restored = from_compact(to_compact(make_data()))
+    first, second = restored['letters'][0], restored['letters'][3]
+    assert first['sender'] == second['sender']
+    assert first['sender'] is not second['sender']
+
+
+def test_binary_roundtrip(tmp_path):
+    data = make_data()
+    binary_file = write_binary(data, tmp_path / 'hsa-letters.bin')
+    assert read_binary(binary_file) == data
+
+
+def test_binary_roundtrip_empty(tmp_path):
+    data = {'meta': {}, 'letters': [], 'indices': {}}
+    assert read_binary(write_binary(data, tmp_path / 'empty.bin')) == data
+
+
+def test_binary_columns_are_aligned(tmp_path):
+    raw = write_binary(make_data(), tmp_path / 'hsa-letters.bin').read_bytes()
+    assert raw[:4] == b'CEXB'
+    _, header_length = struct.unpack_from('<II', raw, 4)
+    assert (12 + header_length) % 8 == 0
+    header = json.loads(raw[12:12 + header_length])
+    assert all(entry['offset'] % 8 == 0 for entry in header['columns'])
+
+
+def make_unsorted_data():
+    """Briefe nicht nach Jahr sortiert, mit Briefen ohne Jahr dazwischen."""
+    data = make_data()
+    years = [1899, None, 1871, 1899, 1885, None, 1872, 1910]
+    data['letters'] = [
+        make_letter(id=f'L{i}', url=f'https://gams.uni-graz.at/o:hsa.letter.L{i}', year=year)
+        for i, year in enumerate(years)
+    ]
+    return data
+
+
+@pytest.mark.parametrize('shard_by', ['years', 'size'])
+def test_sharded_roundtrip_keeps_corpus_order(tmp_path, shard_by):
+    data = make_unsorted_data()
+    write_sharded(data, tmp_path / 'hsa-letters', shard_by=shard_by,
+                  shard_size=3, years_per_shard=5)
+    assert load_sharded(tmp_path / 'hsa-letters') == data
+
+
+def test_year_shards_group_by_period(tmp_path):
+    manifest_file = write_sharded(make_unsorted_data(), tmp_path / 'hsa-letters',
+                                  shard_by='years', years_per_shard=5)
+    shards = json.loads(manifest_file.read_text(encoding='utf-8'))['shards']
+    assert [(s['year_min'], s['year_max'], s['undated']) for s in shards] == [
+        (1871, 1872, False), (1885, 1885, False), (1899, 1899, False),
+        (1910, 1910, False), (None, None, True)
+    ]
+
+
+def reference_json(data: dict, indent: int = None) -> bytes:
+    """json.dump mit den Trennzeichen des Builds."""
+    separators = (',', ': ') if indent is not None else (',', ':')
+    return json.dumps(data, ensure_ascii=False, indent=indent, separators=separators,
+                      default=record_to_json).encode('utf-8')
+
+
+INDENTS = [None, 0, 2, 4]
+
+
+@pytest.mark.parametrize('indent', INDENTS)
+@pytest.mark.parametrize('letters', ['all', 'empty'])
+def test_write_json_matches_json_dump(tmp_path, indent, letters):
+    data = make_data()
+    if letters == 'empty':
+        data['letters'] = []
+    output_file = write_json(data, tmp_path / 'hsa-letters.json', indent=indent)
+    assert output_file.read_bytes() == reference_json(data, indent)
+
+
+@pytest.mark.parametrize('indent', INDENTS)
+def test_write_json_empty_dict(tmp_path, indent):
+    output_file = write_json({}, tmp_path / 'empty.json', indent=indent)
+    assert output_file.read_bytes() == reference_json({}, indent)
+
+
+@pytest.mark.parametrize('indent', INDENTS)
+@pytest.mark.parametrize('letters', ['all', 'empty'])
+def test_write_json_stream_matches_write_json(tmp_path, indent, letters):
+    data = make_data()
+    if letters == 'empty':
+        data['letters'] = []
+    trailer = {'meta': data['meta'], 'indices': data['indices']}
+    count = write_json_stream(iter(data['letters']), lambda: trailer,
+                              tmp_path / 'stream.json', indent=indent)
+    assert count == len(data['letters'])
+    in_memory = write_json({'letters': data['letters'], **trailer},
+                           tmp_path / 'memory.json', indent=indent)
+    assert (tmp_path / 'stream.json').read_bytes() == in_memory.read_bytes()
+    assert in_memory.read_bytes() == reference_json({'letters': data['letters'], **trailer}, indent)
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('name', ['schoenbach.xml', 'test-uncertainty.xml'])
+def test_build_streaming_matches_in_memory_build(tmp_path, indent, name):
+    coordinates = {'2778067': {'lat': 47.06667, 'lon': 15.45}}
+    stream_file = tmp_path / 'stream.json'
+    meta, _ = build_streaming(DATA_DIR / name, stream_file, coordinates, indent=indent)
+
+    data = enrich_with_coordinates(parse_cmif(DATA_DIR / name), coordinates)
+    data['meta']['generated'] = meta['generated']
+    # --stream-output schreibt die Briefe vor meta und indices
+    ordered = {'letters': data['letters'], 'meta': data['meta'], 'indices': data['indices']}
+    memory_file = write_json(ordered, tmp_path / 'memory.json', indent=indent)
+    assert stream_file.read_bytes() == memory_file.read_bytes()
+
+
+@pytest.mark.parametrize('quality', [None, 0, 11])
+def test_precompressed_variants(tmp_path, quality):
+    source = write_json(make_data(), tmp_path / 'hsa-letters.json')
+    kwargs = {} if quality is None else {'brotli_quality': quality}
+    written = write_precompressed(source, **kwargs)
+    raw = source.read_bytes()
+    assert gzip.decompress(written[0].read_bytes()) == raw
+    if BROTLI_AVAILABLE:
+        import brotli
+        assert [p.name for p in written] == ['hsa-letters.json.gz', 'hsa-letters.json.br']
+        assert brotli.decompress(written[1].read_bytes()) == raw
+    else:
+        assert len(written) == 1
@@ -0,0 +1,114 @@
+from hsa_persons import canonical_name, resolve_persons
+
+
+def person(name, authority=None, auth_id=None):
+    return {'name': name, 'id': auth_id, 'authority': authority}
+
+
+def letter(sender, recipient):
+    return {'sender': sender, 'recipient': recipient}
+
+
+SCHUCHARDT_VIAF = person('Hugo Schuchardt', 'viaf', '261931943')
+SCHUCHARDT_GND = person('Schuchardt, Hugo', 'gnd', '118610643')
+SCHUCHARDT_HSA = person('Hugo Schuchardt', 'hsa_person', 'P.1')
+SPITZER = person('Leo Spitzer', 'viaf', '66462636')
+MEYER = person('Paul Meyer', 'viaf', '7394658')
+
+
+def decisions(result, kind):
+    return [d for d in result['decisions'] if d['decision'] == kind]
+
+
+def person_of(result, key):
+    return next(p for p in result['persons'] if key in (f"{a}:{i}" for a, i in p['ids'].items()))
+
+
+def test_canonical_name_ignores_word_order_and_diacritics():
+    assert canonical_name('Schuchardt, Hugo') == canonical_name('Hugo  Schüchardt')
+
+
+def test_cross_authority_name_match_alone_is_ambiguous():
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, SPITZER),
+        letter(SCHUCHARDT_GND, MEYER),
+    ])
+    assert decisions(result, 'merged') == []
+    [ambiguous] = decisions(result, 'ambiguous')
+    assert {ambiguous['a'], ambiguous['b']} == {'viaf:261931943', 'gnd:118610643'}
+    assert result['stats']['persons'] == 4
+
+
+def test_cross_authority_merge_with_shared_correspondent():
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, SPITZER),
+        letter(SPITZER, SCHUCHARDT_GND),
+    ])
+    [merged] = decisions(result, 'merged')
+    assert merged['evidence'] == 'Korrespondent'
+    schuchardt = person_of(result, 'gnd:118610643')
+    assert schuchardt['ids'] == {'gnd': '118610643', 'viaf': '261931943'}
+    assert schuchardt['key'] == 'viaf:261931943'
+    assert (schuchardt['letters_sent'], schuchardt['letters_received']) == (1, 1)
+    assert result['letters']['sender'][0] == result['letters']['recipient'][1]
+
+
+def test_cross_authority_merge_with_concordance():
+    result = resolve_persons(
+        [letter(SCHUCHARDT_VIAF, SPITZER), letter(SCHUCHARDT_GND, MEYER)],
+        concordance=[('gnd:118610643', 'viaf:261931943')]
+    )
+    [merged] = decisions(result, 'merged')
+    assert merged['evidence'] == 'Konkordanz'
+    assert result['stats']['persons'] == 3
+
+
+def test_conflicts_are_checked_pairwise():
+    # viaf und gnd ohne Beleg; gnd und hsa_person teilen Spitzer als Partner.
+    # Nur gegen den ersten Knoten geprueft, bliebe das zweite Paar unbemerkt.
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, MEYER),
+        letter(SCHUCHARDT_GND, SPITZER),
+        letter(SPITZER, SCHUCHARDT_HSA),
+    ])
+    [merged] = decisions(result, 'merged')
+    assert {merged['a'], merged['b']} == {'gnd:118610643', 'hsa_person:P.1'}
+    ambiguous = decisions(result, 'ambiguous')
+    assert {(d['a'], d['b']) for d in ambiguous} == {
+        ('viaf:261931943', 'gnd:118610643'), ('viaf:261931943', 'hsa_person:P.1')
+    }
+
+
+def test_same_authority_different_ids_are_rejected():
+    other_gnd = person('Hugo Schuchardt', 'gnd', '000000000')
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, SPITZER),
+        letter(SCHUCHARDT_GND, SPITZER),
+        letter(other_gnd, SPITZER),
+    ])
+    [merged] = decisions(result, 'merged')
+    assert {merged['a'], merged['b']} == {'viaf:261931943', 'gnd:118610643'}
+    [rejected] = decisions(result, 'rejected')
+    assert rejected['reason'] == 'gnd-Konflikt'
+    assert 'gnd:000000000' in (rejected['a'], rejected['b'])
+
+
+def test_name_only_node_joins_single_person():
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, SPITZER),
+        letter(person('Schuchardt, Hugo'), SPITZER),
+    ])
+    [merged] = decisions(result, 'merged')
+    assert merged['b'] == 'name:hugo schuchardt'
+    assert result['letters']['sender'] == [0, 0]
+
+
+def test_name_only_node_stays_apart_when_ambiguous():
+    result = resolve_persons([
+        letter(SCHUCHARDT_VIAF, SPITZER),
+        letter(SCHUCHARDT_GND, MEYER),
+        letter(person('Hugo Schuchardt'), MEYER),
+    ])
+    name_decision = [d for d in decisions(result, 'ambiguous') if 'candidates' in d]
+    assert name_decision[0]['a'] == 'name:hugo schuchardt'
+    assert len(name_decision[0]['candidates']) == 2
@@ -0,0 +1,77 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from build_hsa_data import enrich_with_coordinates, enrich_with_place_table, parse_cmif
+from hsa_places import PLACE_TABLE_COLUMNS, resolve_place_table
+from hsa_records import record_to_json
+
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'docs' / 'data'
+
+GRAZ = {'name': 'Graz', 'geonames_id': '2778067'}
+WIEN = {'name': 'Wien', 'geonames_id': '2761369'}
+LEMBERG = {'name': 'Lemberg', 'geonames_id': '702550'}
+OHNE_ID = {'name': 'Unbekannt', 'geonames_id': None}
+COORDINATES = {
+    '2778067': {'lat': 47.06667, 'lon': 15.45},
+    '2761369': {'lat': 48.20849, 'lon': 16.37208},
+}
+
+
+def make_letter(place_sent, mentioned):
+    return {'place_sent': place_sent, 'mentions': {'subjects': [], 'persons': [],
+                                                   'places': mentioned}}
+
+
+def make_data():
+    # Wien nur in mentions, Lemberg ohne Koordinaten, Graz in zwei Schreibweisen
+    letters = [
+        make_letter(GRAZ, [WIEN, LEMBERG]),
+        make_letter(None, [GRAZ, GRAZ]),
+        make_letter(LEMBERG, [OHNE_ID]),
+        make_letter(OHNE_ID, []),
+        make_letter({'name': 'Gratz', 'geonames_id': '2778067'}, []),
+    ]
+    places = {
+        geo_id: {'name': name, 'geonames_id': geo_id, 'letter_count': count}
+        for geo_id, name, count in (('2778067', 'Graz', 2), ('702550', 'Lemberg', 1))
+    }
+    return copy.deepcopy({'meta': {}, 'letters': letters, 'indices': {'places': places}})
+
+
+def as_json(data) -> dict:
+    """Wie nach dem Schreiben und Laden im Explorer."""
+    return json.loads(json.dumps(data, default=record_to_json))
+
+
+def test_place_table_resolves_to_copied_coordinates():
+    expected = enrich_with_coordinates(make_data(), COORDINATES)
+    data = as_json(enrich_with_place_table(make_data(), COORDINATES))
+    assert data['meta'] == expected['meta']
+    assert data['indices'] == expected['indices']
+    assert resolve_place_table(data) == expected
+
+
+def test_place_table_rows():
+    data = enrich_with_place_table(make_data(), COORDINATES)
+    table = data['places']
+    assert list(table) == PLACE_TABLE_COLUMNS
+    # Eine Zeile je GeoNames-ID in Reihenfolge des ersten Auftretens
+    assert table['geonames_id'] == ['2778067', '2761369', '702550']
+    assert table['name'] == ['Graz', 'Wien', 'Lemberg']
+    assert table['lat'] == [47.06667, 48.20849, None]
+    letters = data['letters']
+    assert letters[4]['place_sent'] == {'name': 'Gratz', 'geonames_id': '2778067', 'place': 0}
+    assert letters[3]['place_sent'] == OHNE_ID
+    assert 'lat' not in letters[2]['place_sent']
+
+
+@pytest.mark.parametrize('name', ['schoenbach.xml', 'test-uncertainty.xml', 'demo-showcase.xml'])
+def test_place_table_on_corpus(name):
+    parsed = as_json(parse_cmif(DATA_DIR / name))
+    expected = enrich_with_coordinates(copy.deepcopy(parsed), COORDINATES)
+    data = as_json(enrich_with_place_table(parsed, COORDINATES))
+    assert resolve_place_table(data) == expected
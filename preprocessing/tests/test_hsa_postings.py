@@ -0,0 +1,65 @@
+from hsa_postings import (
+    build_postings, delta_decode, delta_encode, intersect_postings, letter_keys, union_postings
+)
+from hsa_query import CorpusQuery
+
+
+def make_letter(sender_id, recipient_id, year, language='de', subjects=()):
+    return {
+        'sender': {'name': 'S', 'id': sender_id, 'authority': 'viaf'} if sender_id else None,
+        'recipient': {'name': 'R', 'id': recipient_id, 'authority': 'viaf'},
+        'place_sent': {'name': 'Graz', 'geonames_id': '2778067'} if year else None,
+        'language': {'code': language, 'label': language} if language else None,
+        'year': year,
+        'datePrecision': 'day' if year else 'unknown',
+        'dateCertainty': 'high',
+        'dateBounds': None,
+        'mentions': {
+            'subjects': [{'uri': uri, 'label': 'x', 'category': None} for uri in subjects],
+            'persons': [], 'places': []
+        }
+    }
+
+
+LETTERS = [
+    make_letter('1', '2', 1890, subjects=['s:a', 's:a']),
+    make_letter('2', '2', 1891, language=None),
+    make_letter(None, '3', None, subjects=['s:b']),
+    make_letter('1', '3', 1890, language='fr'),
+]
+
+
+def test_delta_roundtrip():
+    ordinals = [0, 3, 4, 10, 1000]
+    assert delta_encode(ordinals) == [0, 3, 1, 6, 990]
+    assert delta_decode(delta_encode(ordinals)) == ordinals
+
+
+def test_intersect_and_union():
+    assert intersect_postings([1, 3, 5, 7], [3, 4, 5], [0, 3, 5, 9]) == [3, 5]
+    assert union_postings([1, 5], [2, 5, 8]) == [1, 2, 5, 8]
+
+
+def test_letter_keys():
+    assert letter_keys(LETTERS[1]) == [
+        ('sender', '2'), ('person', '2'), ('recipient', '2'), ('person', '2'),
+        ('place', '2778067'), ('language', 'None'), ('year', '1891'),
+        ('precision', 'day'), ('certainty', 'high')
+    ]
+
+
+def test_build_postings_matches_query_index():
+    postings = build_postings(LETTERS)
+    decoded = {field: {key: delta_decode(deltas) for key, deltas in postings[field].items()}
+               for field in ('persons', 'places', 'subjects', 'languages', 'years')}
+    assert decoded['persons'] == {'1': [0, 3], '2': [0, 1], '3': [2, 3]}
+    assert decoded['subjects'] == {'s:a': [0], 's:b': [2]}
+    assert decoded['languages'] == {'de': [0, 2], 'None': [1], 'fr': [3]}
+    assert decoded['years'] == {'1890': [0, 3], '1891': [1]}
+
+    query = CorpusQuery({'letters': LETTERS})
+    assert query.postings['person'] == decoded['persons']
+    assert query.postings['place'] == decoded['places']
+    assert query.postings['subject'] == decoded['subjects']
+    assert query.postings['language'] == decoded['languages']
+    assert query.postings['sender'] == {'1': [0, 3], '2': [1]}
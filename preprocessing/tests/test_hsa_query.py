@@ -0,0 +1,200 @@
+import random
+
+import pytest
+
+from hsa_intervals import date_bounds, date_span
+from hsa_query import CorpusQuery
+
+
+PERSONS = ['1', '2', '3', '4', None]
+PLACES = ['2778067', '2761369', None]
+SUBJECTS = ['s:a', 's:b', 's:c']
+LANGUAGES = ['de', 'fr', None]
+DATES = [
+    ({'when': '1890-05-12'}, 'day', 'high'),
+    ({'when': '1890-05'}, 'month', 'high'),
+    ({'when': '1891'}, 'year', 'high'),
+    ({'from_date': '1890-04', 'to_date': '1890-09'}, 'range', 'high'),
+    ({'not_before': '1890-06-01'}, 'range', 'low'),
+    ({'not_after': '1889-12'}, 'range', 'low'),
+    ({}, 'unknown', 'low'),
+]
+
+
+def make_letters(count=200, seed=3):
+    rng = random.Random(seed)
+    letters = []
+    for _ in range(count):
+        sender, recipient = rng.choice(PERSONS), rng.choice(PERSONS)
+        place, language = rng.choice(PLACES), rng.choice(LANGUAGES)
+        attributes, precision, certainty = rng.choice(DATES)
+        bounds = date_bounds(**attributes)
+        first = (attributes.get('when') or attributes.get('from_date')
+                 or attributes.get('not_before'))
+        letters.append({
+            'sender': {'name': 'S', 'id': sender, 'authority': 'viaf'} if sender else None,
+            'recipient': {'name': 'R', 'id': recipient, 'authority': 'viaf'},
+            'place_sent': {'name': 'Ort', 'geonames_id': place} if place else None,
+            'language': {'code': language, 'label': language} if language else None,
+            'year': int(first[:4]) if first else None,
+            'datePrecision': precision,
+            'dateCertainty': certainty,
+            'dateBounds': bounds,
+            'mentions': {
+                'subjects': [{'uri': uri, 'label': 'x', 'category': None}
+                             for uri in rng.sample(SUBJECTS, rng.randint(0, 2))],
+                'persons': [], 'places': []
+            }
+        })
+    return letters
+
+
+LETTERS = make_letters()
+
+
+@pytest.fixture(scope='module')
+def query():
+    return CorpusQuery({'letters': LETTERS})
+
+
+def person_ids(letter):
+    return {p['id'] for p in (letter['sender'], letter['recipient']) if p and p['id']}
+
+
+def matches(letter, person=None, place=None, subject=None, language=None,
+            year_from=None, year_to=None):
+    """Orakel: ein Filter ueber die Briefliste, Listenwerte vereinigt."""
+    def accepts(value, keys):
+        if value is None:
+            return True
+        values = {value} if isinstance(value, str) else set(value)
+        return bool(values & keys)
+
+    if not accepts(person, person_ids(letter)):
+        return False
+    if not accepts(place, {letter['place_sent']['geonames_id']} if letter['place_sent'] else set()):
+        return False
+    if not accepts(subject, {s['uri'] for s in letter['mentions']['subjects']}):
+        return False
+    code = letter['language']['code'] if letter['language'] else 'None'
+    if not accepts(language, {code}):
+        return False
+    if year_from is not None or year_to is not None:
+        year = letter['year']
+        if year is None:
+            return False
+        if year_from is not None and year < year_from:
+            return False
+        if year_to is not None and year > year_to:
+            return False
+    return True
+
+
+def scan(**filters):
+    return [o for o, letter in enumerate(LETTERS) if matches(letter, **filters)]
+
+
+FILTERS = [
+    {},
+    {'person': '1'},
+    {'person': ['1', '3']},
+    {'person': '1', 'place': '2778067'},
+    {'place': ['2778067', '2761369'], 'language': 'de'},
+    {'subject': 's:a', 'language': 'None'},
+    {'person': '2', 'subject': ['s:b', 's:c'], 'language': ['de', 'fr']},
+    {'person': '9'},
+    {'year_from': 1890},
+    {'year_to': 1889},
+    {'year_from': 1890, 'year_to': 1890},
+    {'year_from': 1891, 'year_to': 1890},
+    {'year_from': 1890, 'person': '1', 'subject': 's:c'},
+    {'year_to': 1891, 'place': '2761369', 'language': 'fr'},
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=[str(f) for f in FILTERS])
+def test_select_matches_scan(query, filters):
+    expected = scan(**filters)
+    assert query.select(**filters) == expected
+    assert query.count(**filters) == len(expected)
+
+
+def test_sender_and_recipient_filters(query):
+    assert query.select(sender='1') == [
+        o for o, letter in enumerate(LETTERS) if letter['sender'] and letter['sender']['id'] == '1'
+    ]
+    assert query.select(recipient='2', precision='range', certainty='low') == [
+        o for o, letter in enumerate(LETTERS)
+        if letter['recipient']['id'] == '2' and letter['datePrecision'] == 'range'
+        and letter['dateCertainty'] == 'low'
+    ]
+
+
+def test_year_filter_drops_undated_letters(query):
+    undated = [o for o, letter in enumerate(LETTERS) if letter['year'] is None]
+    assert undated
+    assert not set(query.select(year_from=0)) & set(undated)
+    assert len(query.select(year_from=0)) + len(undated) == len(LETTERS)
+
+
+def test_timeline(query):
+    for filters in ({}, {'person': '1'}, {'language': 'fr', 'year_from': 1890}):
+        ordinals = scan(**filters)
+        years = sorted({LETTERS[o]['year'] for o in ordinals} - {None})
+        expected = [{'year': y, 'count': sum(1 for o in ordinals if LETTERS[o]['year'] == y)}
+                    for y in years]
+        assert query.timeline(**filters) == expected
+
+
+def within(letter, start, end, certain):
+    if not letter['dateBounds']:
+        return False
+    earliest, latest = letter['dateBounds']
+    if certain:
+        return earliest is not None and latest is not None and start <= earliest and latest <= end
+    return (earliest is None or earliest <= end) and (latest is None or latest >= start)
+
+
+@pytest.mark.parametrize('period', [
+    ('1890-05', '1890-05'), ('1890-05-12', '1890-05-12'), ('1890', '1890'),
+    ('1889', '1891'), ('1890-06-01', '1891-12'), ('1800', '1889-06'), ('1895', '1900'),
+])
+@pytest.mark.parametrize('certain', [False, True])
+def test_during(query, period, certain):
+    start, end = date_span(period[0])[0], date_span(period[1])[1]
+    expected = [o for o, letter in enumerate(LETTERS) if within(letter, start, end, certain)]
+    assert query.select(during=period, certain=certain) == expected
+    assert query.count(during=period, certain=certain) == len(expected)
+    assert query.select(during=(start, end), certain=certain) == expected
+
+
+def test_during_certain_excludes_uncertain_bounds(query):
+    # notBefore/notAfter sind offen und liegen nie sicher im Bereich
+    open_bounds = {o for o, letter in enumerate(LETTERS)
+                   if letter['dateBounds'] and None in letter['dateBounds']}
+    certain = set(query.select(during=('0001', '9999'), certain=True))
+    assert open_bounds and not certain & open_bounds
+    assert open_bounds <= set(query.select(during=('0001', '9999')))
+
+
+def test_during_with_filters(query):
+    start, end = date_span('1890')
+    expected = [o for o in scan(person='1', language='de')
+                if within(LETTERS[o], start, end, False)]
+    assert query.select(during=('1890', '1890'), person='1', language='de') == expected
+    assert query.count(during=('1890', '1890'), person='1', language='de') == len(expected)
+
+
+@pytest.mark.parametrize('offset, limit', [(0, 50), (10, 5), (30, 100), (500, 10), (0, 0)])
+def test_page(query, offset, limit):
+    expected = scan(person='1')
+    page = query.page(offset=offset, limit=limit, person='1')
+    assert page['total'] == len(expected)
+    assert page['offset'] == offset
+    assert page['ordinals'] == expected[offset:offset + limit]
+    assert page['letters'] == [LETTERS[o] for o in expected[offset:offset + limit]]
+
+
+def test_unknown_filter(query):
+    with pytest.raises(ValueError):
+        query.select(author='1')
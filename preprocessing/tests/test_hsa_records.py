@@ -0,0 +1,57 @@
+import pickle
+
+import pytest
+
+from hsa_records import LETTER_FIELDS, Letter, Mentions, record_to_json
+
+
+def make_letter():
+    letter = Letter('L1', 'https://example.org/L1')
+    letter['sender'] = {'name': 'Hugo Schuchardt', 'id': '261931943', 'authority': 'viaf'}
+    letter['year'] = 1890
+    letter['mentions'].places.append({'name': 'Graz', 'geonames_id': '2778067'})
+    return letter
+
+
+def test_dict_access():
+    letter = make_letter()
+    assert letter['year'] == 1890
+    assert letter.get('year') == 1890
+    assert 'sender' in letter
+    assert list(letter.keys()) == list(LETTER_FIELDS)
+
+
+@pytest.mark.parametrize('key', ['unknown', 'to_dict', 'keys', '__class__'])
+def test_missing_key_raises_key_error(key):
+    letter = make_letter()
+    with pytest.raises(KeyError):
+        letter[key]
+    assert key not in letter
+    assert letter.get(key, 'fehlt') == 'fehlt'
+
+
+def test_set_unknown_key_raises_key_error():
+    with pytest.raises(KeyError):
+        make_letter()['unknown'] = 1
+
+
+def test_unset_slot_raises_key_error():
+    mentions = Mentions.__new__(Mentions)
+    with pytest.raises(KeyError):
+        mentions['subjects']
+
+
+def test_to_dict_and_json_order():
+    letter = make_letter()
+    as_dict = record_to_json(letter)
+    assert list(as_dict) == list(LETTER_FIELDS)
+    assert as_dict['mentions'] == {'subjects': [], 'persons': [],
+                                   'places': [{'name': 'Graz', 'geonames_id': '2778067'}]}
+    assert letter == as_dict
+
+
+def test_pickle_roundtrip():
+    letter = make_letter()
+    restored = pickle.loads(pickle.dumps(letter, protocol=pickle.HIGHEST_PROTOCOL))
+    assert isinstance(restored, Letter)
+    assert restored == letter
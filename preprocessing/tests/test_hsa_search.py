@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+from hsa_search import SearchIndex, build_search, normalize
+
+
+PERSONS = {
+    '1': 'Hugo Schuchardt', '2': 'Schüchardt, Hugo', '3': 'Leo Spitzer',
+    '4': 'Ǵorǵi Čubinašvili', '5': 'Gustav Straße', '6': 'Jan Łoś', '7': 'SPITZER-Hugo',
+    '8': 'Ana María Ölmez', '9': 'Hugo Schuchardt',
+}
+PLACES = {'2778067': 'Graz', '2761369': 'Wien', '611717': 'Tbilissi – თბილისი', '3': 'Gräz'}
+SUBJECTS = {'s:1': 'Baskisch', 's:2': 'Kreolsprachen', 's:3': 'Baskische Dialekte'}
+
+
+def person(key):
+    return {'name': PERSONS[key], 'id': key, 'authority': 'viaf'}
+
+
+def place(key):
+    return {'name': PLACES[key], 'geonames_id': key}
+
+
+def make_letters():
+    rng = random.Random(7)
+    letters = []
+    for _ in range(80):
+        letters.append({
+            'sender': person(rng.choice(list(PERSONS))) if rng.random() < 0.9 else None,
+            'recipient': person(rng.choice(list(PERSONS))) if rng.random() < 0.9 else None,
+            'place_sent': place(rng.choice(list(PLACES))) if rng.random() < 0.7 else None,
+        })
+    return letters
+
+
+INDICES = {
+    'persons': {key: {'name': name} for key, name in PERSONS.items()},
+    'places': {key: {'name': name} for key, name in PLACES.items()},
+    'subjects': {key: {'label': label} for key, label in SUBJECTS.items()},
+}
+LABELS = {'persons': PERSONS, 'places': PLACES, 'subjects': SUBJECTS}
+
+
+def contains(name: str, word: str) -> bool:
+    """Wie im Explorer: ab drei Zeichen Teilstring, sonst Wortanfang."""
+    padded = ' ' + normalize(name)
+    return word in padded if len(word) >= 3 else ' ' + word in padded
+
+
+def scan_entities(search, field, query, limit=None):
+    words = normalize(query).split()
+    if not words:
+        return []
+    # Reihenfolge wie der Index: nach Namens-Ordinalzahl, dann nach Schluessel
+    order = {name: ordinal for ordinal, name in enumerate(search.names)}
+    keys = list(LABELS[field])
+    result = sorted(
+        (key for key, label in LABELS[field].items() if all(contains(label, w) for w in words)),
+        key=lambda key: (order[normalize(LABELS[field][key])], keys.index(key))
+    )
+    return result[:limit] if limit is not None else result
+
+
+def scan_letters(letters, query, limit=None):
+    words = normalize(query).split()
+    if not words:
+        return []
+    result = [
+        ordinal for ordinal, letter in enumerate(letters)
+        if all(any(letter[field] and contains(letter[field]['name'], w)
+                   for field in ('sender', 'recipient', 'place_sent'))
+               for w in words)
+    ]
+    return result[:limit] if limit is not None else result
+
+
+@pytest.fixture(scope='module')
+def index():
+    letters = make_letters()
+    return letters, SearchIndex(build_search(letters, INDICES))
+
+
+def test_normalize():
+    assert normalize('Schüchardt, Hugo') == 'schuchardt hugo'
+    assert normalize('Ǵorǵi Čubinašvili') == 'gorgi cubinasvili'
+    assert normalize('Straße') == 'strasse'
+    assert normalize('SPITZER-Hugo') == 'spitzer hugo'
+    assert normalize('Tbilissi – თბილისი') == 'tbilissi თბილისი'
+    assert normalize('  ,; ') == ''
+    assert normalize(None) == ''
+
+
+QUERIES = [
+    'hugo', 'Hu', 'h', 'SCHÜ', 'chard', 'hugo schu', 'schu leo', 'ardt hugo', 'gr',
+    'graz', 'gräz', 'rasse', 'łoś', 'los', 'cubinas', 'თბი', 'bask', 'baskische dia',
+    'sprach', 'zz', 'x', '', '  ', 'hugo hugo', 'spitzer hugo', 'itz', 'ana mar', 'ölm',
+]
+
+
+@pytest.mark.parametrize('field', ['persons', 'places', 'subjects'])
+@pytest.mark.parametrize('query', QUERIES)
+def test_entities_match_scan(index, field, query):
+    _, search = index
+    assert search.search(query, field) == scan_entities(search, field, query)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_letters_match_scan(index, query):
+    letters, search = index
+    assert search.search(query, 'letters') == scan_letters(letters, query)
+
+
+def test_short_and_trigram_paths_agree(index):
+    # Zwei Zeichen treffen nur Wortanfaenge, drei Zeichen jeden Teilstring
+    _, search = index
+    assert search.search('sp', 'persons') == ['3', '7']
+    assert search.search('pi', 'persons') == []
+    assert search.search('pit', 'persons') == ['3', '7']
+
+
+def test_random_queries_match_scan(index):
+    letters, search = index
+    rng = random.Random(11)
+    names = [normalize(n) for labels in LABELS.values() for n in labels.values()]
+    for _ in range(300):
+        words = []
+        for _ in range(rng.randint(1, 3)):
+            name = rng.choice(names)
+            start = rng.randrange(len(name))
+            words.append(name[start:start + rng.randint(1, 5)])
+        query = ' '.join(words)
+        for field in ('persons', 'places', 'subjects'):
+            expected = scan_entities(search, field, query)
+            assert search.search(query, field) == expected, (query, field)
+        assert search.search(query, 'letters') == scan_letters(letters, query), query
+
+
+def test_limit(index):
+    letters, search = index
+    for field in ('persons', 'places'):
+        assert search.search('a', field, limit=2) == scan_entities(search, field, 'a')[:2]
+    assert search.search('hugo', 'persons', limit=1) == ['1']
+    assert search.search('hugo', 'letters', limit=3) == scan_letters(letters, 'hugo')[:3]
+    assert search.search('hugo', 'persons', limit=0) == []
+
+
+def test_unknown_field(index):
+    _, search = index
+    with pytest.raises(ValueError):
+        search.search('hugo', 'dates')
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+import sqlite3
+
+import pytest
+
+from build_hsa_data import enrich_with_coordinates, enrich_with_place_table, parse_cmif
+from hsa_records import record_to_json
+from hsa_sqlite import FTS5_AVAILABLE, read_letters, read_meta, write_sqlite
+
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'docs' / 'data'
+COORDINATES = {'2778067': {'lat': 47.06667, 'lon': 15.45}}
+
+
+def build(name: str, enrich=None) -> dict:
+    data = parse_cmif(DATA_DIR / name)
+    if enrich:
+        data = enrich(data, COORDINATES)
+    return json.loads(json.dumps(data, default=record_to_json))
+
+
+@pytest.mark.parametrize('name', ['schoenbach.xml', 'test-uncertainty.xml', 'demo-showcase.xml'])
+def test_roundtrip_matches_json(tmp_path, name):
+    data = build(name, enrich_with_coordinates)
+    db_file = write_sqlite(data, tmp_path / 'hsa-letters.sqlite')
+    assert read_letters(db_file) == data['letters']
+
+    meta = read_meta(db_file)
+    assert meta.pop('sqlite_version')
+    assert meta == data['meta']
+
+
+def test_roundtrip_with_place_table(tmp_path):
+    # Koordinaten nur in der Orts-Tabelle; die Datenbank loest sie auf
+    expected = build('test-uncertainty.xml', enrich_with_coordinates)
+    data = build('test-uncertainty.xml', enrich_with_place_table)
+    db_file = write_sqlite(data, tmp_path / 'hsa-letters.sqlite')
+    assert read_letters(db_file) == expected['letters']
+
+
+@pytest.mark.skipif(not FTS5_AVAILABLE, reason='SQLite ohne FTS5')
+def test_name_search(tmp_path):
+    data = build('test-uncertainty.xml')
+    db_file = write_sqlite(data, tmp_path / 'hsa-letters.sqlite')
+    with sqlite3.connect(db_file) as conn:
+        names = {row[0] for row in conn.execute(
+            "SELECT p.name FROM names_fts f JOIN persons p ON p.id = f.ref "
+            "WHERE names_fts MATCH 'schuch*' AND f.kind = 'person'"
+        )}
+    expected = {
+        person['name'] for letter in data['letters']
+        for person in [letter['sender'], letter['recipient'], *letter['mentions']['persons']]
+        if person and any(word.lower().startswith('schuch') for word in person['name'].split())
+    }
+    assert expected
+    assert names == expected
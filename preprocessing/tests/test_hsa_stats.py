@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+import hsa_stats
+from build_hsa_data import parse_cmif
+from hsa_stats import (
+    Accumulator, accumulate, merge_accumulators, new_accumulators, register_accumulator
+)
+
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'docs' / 'data'
+
+
+@pytest.fixture(scope='module')
+def letters():
+    return [letter for name in ('test-uncertainty.xml', 'demo-showcase.xml', 'schoenbach.xml')
+            for letter in parse_cmif(DATA_DIR / name)['letters']]
+
+
+def contribute(accumulators: list) -> dict:
+    meta = {}
+    for accumulator in accumulators:
+        accumulator.contribute(meta)
+    return meta
+
+
+def single(letters: list) -> dict:
+    accumulators = new_accumulators()
+    for letter in letters:
+        accumulate(accumulators, letter)
+    return contribute(accumulators)
+
+
+def merged(letters: list, bounds: list) -> dict:
+    """Wie parse_cmif_parallel: je Bereich eigene Akkumulatoren, in Reihenfolge gemerged."""
+    total = new_accumulators()
+    for start, stop in zip([0] + bounds, bounds + [len(letters)]):
+        partial = new_accumulators()
+        for letter in letters[start:stop]:
+            accumulate(partial, letter)
+        merge_accumulators(total, partial)
+    return contribute(total)
+
+
+def test_merge_matches_single_accumulator(letters):
+    expected = single(letters)
+    assert expected['total_letters'] == len(letters)
+    n = len(letters)
+    for bounds in ([], [0], [n], [1, 2, 3], [n // 3, 2 * n // 3], [n // 2, n // 2],
+                   list(range(0, n, 7))):
+        assert merged(letters, bounds) == expected, bounds
+
+
+def test_merge_is_order_independent(letters):
+    half = len(letters) // 2
+    assert merged(letters[half:] + letters[:half], [len(letters) - half]) == single(letters)
+
+
+def test_statistics(letters):
+    meta = single(letters)
+    years = [letter['year'] for letter in letters if letter['year']]
+    assert meta['date_range'] == {'min': min(years), 'max': max(years)}
+    assert sum(entry['count'] for entry in meta['timeline']) == len(years)
+    assert meta['unique_senders'] == len({
+        letter['sender']['id'] for letter in letters
+        if letter['sender'] and letter['sender']['id'] and letter['sender']['authority'] == 'viaf'
+    })
+    uncertainty = meta['uncertainty']
+    assert sum(uncertainty['date_precision'].values()) == len(letters)
+    assert uncertainty['imprecise_dates_total'] == sum(
+        1 for letter in letters if letter['datePrecision'] != 'day')
+
+
+def test_empty_accumulators():
+    meta = single([])
+    assert meta['total_letters'] == 0
+    assert meta['date_range'] == {'min': None, 'max': None}
+    assert meta['timeline'] == []
+    assert meta['uncertainty']['imprecise_dates_pct'] == 0
+
+
+def test_registered_accumulator_joins_every_build(monkeypatch, letters):
+    monkeypatch.setattr(hsa_stats, 'ACCUMULATORS', list(hsa_stats.ACCUMULATORS))
+
+    @register_accumulator
+    class LanguageAccumulator(Accumulator):
+        def __init__(self):
+            self.codes = set()
+
+        def add(self, letter):
+            if letter['language']:
+                self.codes.add(letter['language']['code'])
+
+        def merge(self, other):
+            self.codes |= other.codes
+
+        def contribute(self, meta):
+            meta['language_codes'] = sorted(self.codes)
+
+    assert isinstance(new_accumulators()[-1], LanguageAccumulator)
+    expected = sorted({letter['language']['code'] for letter in letters if letter['language']})
+    assert single(letters)['language_codes'] == expected
+    assert merged(letters, [5, 40])['language_codes'] == expected
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from build_hsa_data import (
+    enrich_with_coordinates, enrich_with_place_table, parse_cmif, parse_cmif_incremental
+)
+from hsa_records import record_to_json
+
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><profileDesc>\n')
+FOOTER = '</profileDesc></teiHeader><text><body><p/></body></text></TEI>\n'
+TERMS = 'https://lod.academy/cmif/vocab/terms#'
+
+
+def letter(ref, sender, recipient, place, date, language=None, subjects=()):
+    notes = ''.join(f'<ref type="{TERMS}mentionsSubject" target="{uri}">{label}</ref>'
+                    for uri, label in subjects)
+    if language:
+        notes += f'<ref type="{TERMS}hasLanguage" target="{language[0]}">{language[1]}</ref>'
+    return (
+        f'<correspDesc ref="https://example.org/{ref}">'
+        f'<correspAction type="sent">'
+        f'<persName ref="http://viaf.org/viaf/{sender[0]}">{sender[1]}</persName>'
+        f'<placeName ref="http://sws.geonames.org/{place[0]}">{place[1]}</placeName>'
+        f'<date when="{date}"/></correspAction>'
+        f'<correspAction type="received">'
+        f'<persName ref="http://viaf.org/viaf/{recipient[0]}">{recipient[1]}</persName>'
+        f'</correspAction>'
+        f'<note>{notes}</note></correspDesc>\n'
+    )
+
+
+SCHUCHARDT = ('1', 'Hugo Schuchardt')
+SPITZER = ('2', 'Leo Spitzer')
+MEYER = ('3', 'Paul Meyer')
+GRAZ = ('2778067', 'Graz')
+WIEN = ('2761369', 'Wien')
+PARIS = ('2988507', 'Paris')
+BASKISCH = ('s:1', 'Baskisch')
+KREOL = ('s:2', 'Kreolsprachen')
+
+ORIGINAL = [
+    letter('l1', SCHUCHARDT, SPITZER, GRAZ, '1890-01-01', ('de', 'Deutsch'), [BASKISCH]),
+    letter('l2', SPITZER, SCHUCHARDT, WIEN, '1891', ('de', 'Deutsch'), [KREOL]),
+    letter('l3', MEYER, SCHUCHARDT, PARIS, '1885-05', ('fr', 'Französisch'), [KREOL]),
+    letter('l4', SCHUCHARDT, SPITZER, GRAZ, '1892-02-02'),
+]
+CHANGED = [
+    ORIGINAL[0],
+    # l2 geaendert: anderer Ort, anderes Subject, keine Sprache
+    letter('l2', SPITZER, SCHUCHARDT, GRAZ, '1891', None, [BASKISCH]),
+    # l3 geloescht (einziger Brief mit Meyer, Paris und fr)
+    ORIGINAL[3],
+    letter('l5', SCHUCHARDT, MEYER, WIEN, '1893', ('it', 'Italienisch'), [KREOL]),
+    letter('l6', MEYER, SPITZER, PARIS, '1894'),
+]
+
+
+def write_cmif(path, letters):
+    path.write_text(HEADER + ''.join(letters) + FOOTER, encoding='utf-8')
+    return path
+
+
+def as_json(data) -> dict:
+    """Output wie nach dem Schreiben und Laden, ohne Zeitstempel."""
+    data = json.loads(json.dumps(data, default=record_to_json))
+    data['meta'].pop('generated')
+    return data
+
+
+def build_incremental(tmp_path, before, after, enrich=None):
+    cmif_file = write_cmif(tmp_path / 'CMIF.xml', before)
+    previous, fingerprints, _ = parse_cmif_incremental(cmif_file)
+    if enrich:
+        previous = enrich(previous)
+    write_cmif(cmif_file, after)
+    output, fingerprints, stats = parse_cmif_incremental(cmif_file, as_json(previous), fingerprints)
+    return cmif_file, output, stats
+
+
+def test_incremental_matches_full_rebuild(tmp_path):
+    cmif_file, output, stats = build_incremental(tmp_path, ORIGINAL, CHANGED)
+    assert stats == {'unchanged': 2, 'extracted': 3, 'deleted': 1}
+    # dict-Vergleich: Schluesselreihenfolge der Indices spielt keine Rolle
+    assert as_json(output) == as_json(parse_cmif(cmif_file))
+
+
+def test_incremental_without_changes(tmp_path):
+    cmif_file, output, stats = build_incremental(tmp_path, ORIGINAL, ORIGINAL)
+    assert stats == {'unchanged': 4, 'extracted': 0, 'deleted': 0}
+    assert as_json(output) == as_json(parse_cmif(cmif_file))
+
+
+def test_incremental_removes_unused_index_entries(tmp_path):
+    _, output, _ = build_incremental(tmp_path, ORIGINAL, CHANGED[:1] + CHANGED[2:3])
+    indices = output['indices']
+    assert set(indices['persons']) == {'1', '2'}
+    assert set(indices['places']) == {'2778067'}
+    assert set(indices['subjects']) == {'s:1'}
+    assert indices['languages'] == {'de': 'Deutsch'}
+    assert indices['persons']['1']['letters_sent'] == 2
+
+
+COORDINATES = {
+    '2778067': {'lat': 47.06667, 'lon': 15.45},
+    '2761369': {'lat': 48.20849, 'lon': 16.37208},
+    '2988507': {'lat': 48.85341, 'lon': 2.3488},
+}
+
+
+@pytest.mark.parametrize('enrich', [enrich_with_coordinates, enrich_with_place_table],
+                         ids=['coordinates', 'place_table'])
+def test_incremental_drops_stale_enrichment(tmp_path, enrich):
+    # Vorheriger Build mit allen Koordinaten; Wien fehlt jetzt in der Datei
+    cmif_file, output, _ = build_incremental(
+        tmp_path, ORIGINAL, ORIGINAL, enrich=lambda data: enrich(data, COORDINATES)
+    )
+    coordinates = {geo_id: c for geo_id, c in COORDINATES.items() if geo_id != '2761369'}
+    output = as_json(enrich_with_coordinates(output, coordinates))
+    assert output == as_json(enrich_with_coordinates(parse_cmif(cmif_file), coordinates))
+    assert all('place' not in letter['place_sent'] for letter in output['letters'])
+    assert 'lat' not in output['letters'][1]['place_sent']
+    assert 'lat' not in output['indices']['places']['2761369']
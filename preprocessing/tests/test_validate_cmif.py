@@ -0,0 +1,143 @@
+import pytest
+
+from validate_cmif import validate_cmif
+
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<TEI xmlns="http://www.tei-c.org/ns/1.0"><teiHeader><profileDesc>\n')
+FOOTER = '</profileDesc></teiHeader><text><body><p/></body></text></TEI>\n'
+
+SENDER = '<persName ref="http://viaf.org/viaf/12345">Hugo Schuchardt</persName>'
+RECIPIENT = '<persName ref="http://viaf.org/viaf/67890">Leo Spitzer</persName>'
+
+
+def letter(ref='https://example.org/l1', sent=None, received=None, note=''):
+    sent = f'{SENDER}<date when="1890-01-01"/>' if sent is None else sent
+    received = RECIPIENT if received is None else received
+    ref_attr = f' ref="{ref}"' if ref else ''
+    return (f'<correspDesc{ref_attr}>'
+            f'<correspAction type="sent">{sent}</correspAction>'
+            f'<correspAction type="received">{received}</correspAction>'
+            f'{note}</correspDesc>\n')
+
+
+def write_cmif(tmp_path, body, header=HEADER, footer=FOOTER):
+    cmif_file = tmp_path / 'CMIF.xml'
+    cmif_file.write_text(header + body + footer, encoding='utf-8')
+    return cmif_file
+
+
+def problems(report, code):
+    return [p for p in report['problems'] if p['code'] == code]
+
+
+CODE_CASES = [
+    (letter(ref=None), 'missing_ref'),
+    (letter(sent=f'{SENDER}<date when="1890-13"/>'), 'invalid_date'),
+    (letter(sent=f'{SENDER}<date notBefore="1891" notAfter="1890"/>'), 'contradictory_date'),
+    (letter(sent=f'{SENDER}<date when="1890"/>',
+            note='<note><ref type="https://lod.academy/cmif/vocab/terms#mentionsPerson"/></note>'),
+     'missing_target'),
+    (letter(sent=f'{SENDER}<date when="1890" cert="maybe"/>'), 'invalid_cert'),
+    (letter(sent=f'{SENDER}<date from="1890"/>'), 'open_range'),
+    (letter(sent=f'{SENDER}<date/>'), 'empty_date'),
+    (letter(sent=f'{SENDER}<date when="1890"/><date when="1891"/>'), 'multiple_dates'),
+    (letter(sent='<date when="1890"/>'), 'missing_sender'),
+    (letter(received=''), 'missing_recipient'),
+    (letter(sent='<persName>Hugo Schuchardt</persName>'), 'missing_authority'),
+    (letter(sent='<persName ref="http://example.org/p/1">X</persName>'), 'unknown_authority'),
+    (letter(sent='<persName ref="http://www.geonames.org/2761369">Wien</persName>'),
+     'unexpected_authority'),
+    (letter(sent='<persName ref="http://viaf.org/viaf/1"></persName>'), 'empty_name'),
+    ('<correspDesc ref="x"><correspAction type="received">' + RECIPIENT
+     + '</correspAction></correspDesc>\n', 'missing_sent'),
+    ('<correspDesc ref="x"><correspAction type="sent">' + SENDER
+     + '</correspAction><correspAction type="archived"/></correspDesc>\n', 'unknown_action_type'),
+]
+
+
+@pytest.mark.parametrize('body, code', CODE_CASES, ids=[code for _, code in CODE_CASES])
+def test_problem_codes(tmp_path, body, code):
+    report = validate_cmif(write_cmif(tmp_path, letter('https://example.org/l0') + body))
+    found = problems(report, code)
+    assert found, report['codes']
+    # Der Kopf belegt zwei Zeilen, der gepruefte Brief steht in Zeile 4
+    assert found[0]['line'] == 4
+    assert report['letters'] == 2
+
+
+def test_valid_file(tmp_path):
+    report = validate_cmif(write_cmif(tmp_path, letter('a') + letter('b')))
+    assert report['valid']
+    assert report['errors'] == 0
+    assert report['warnings'] == 0
+    assert report['letters'] == 2
+
+
+def test_duplicate_ref_on_same_line(tmp_path):
+    body = (letter('https://example.org/l1') + letter('https://example.org/l1')).replace('\n', '')
+    cmif_file = write_cmif(tmp_path, body, header=HEADER.replace('\n', ''), footer=FOOTER.strip())
+    report = validate_cmif(cmif_file)
+    duplicates = problems(report, 'duplicate_ref')
+    assert len(duplicates) == 1
+    assert duplicates[0]['line'] == 1
+    assert duplicates[0]['value'] == 'erstmals Zeile 1'
+    assert not report['valid']
+
+
+def test_duplicate_ref_reports_first_line(tmp_path):
+    report = validate_cmif(write_cmif(tmp_path, letter('a') + letter('b') + letter('a')))
+    duplicates = problems(report, 'duplicate_ref')
+    assert [(p['line'], p['value']) for p in duplicates] == [(5, 'erstmals Zeile 3')]
+
+
+def test_lines_beyond_16_bit_limit(tmp_path):
+    # libxml2 speichert sourceline in 16 Bit; hier liegt der Fehler in Zeile 70008
+    body = '\n' * 70005 + letter(sent=f'{SENDER}<date when="1890-13"/>')
+    cmif_file = write_cmif(tmp_path, body)
+    for workers in (1, 2):
+        report = validate_cmif(cmif_file, workers=workers, shard_bytes=4096)
+        assert [p['line'] for p in problems(report, 'invalid_date')] == [70008]
+
+
+def test_xml_syntax_line(tmp_path):
+    body = letter('a') + '<correspDesc ref="b"><x></correspDesc>\n' + letter('c')
+    report = validate_cmif(write_cmif(tmp_path, body))
+    syntax = problems(report, 'xml_syntax')
+    assert len(syntax) == 1
+    assert syntax[0]['line'] == 4
+    # Die Pruefung bricht am Fehler ab
+    assert report['letters'] == 1
+
+
+def test_truncated_file(tmp_path):
+    report = validate_cmif(write_cmif(tmp_path, letter('a') + '<correspDesc ref="b"><corr', footer=''))
+    assert problems(report, 'xml_syntax')
+    assert report['letters'] == 1
+
+
+def test_wrong_root_and_no_letters(tmp_path):
+    cmif_file = write_cmif(tmp_path, '', header='<?xml version="1.0"?>\n<root>\n', footer='</root>\n')
+    report = validate_cmif(cmif_file)
+    assert [p['line'] for p in problems(report, 'wrong_root')] == [2]
+    assert problems(report, 'no_letters')
+
+
+def test_commented_letters_are_skipped(tmp_path):
+    body = letter('a') + '<!-- ' + letter('a').strip() + ' -->\n' + letter('b')
+    report = validate_cmif(write_cmif(tmp_path, body))
+    assert report['letters'] == 2
+    assert report['valid']
+
+
+def test_workers_and_ranges_match_serial(tmp_path):
+    body = ''.join(
+        letter(f'l{i % 7}', sent=f'{SENDER}<date when="1890-{i % 14:02d}"/>')
+        for i in range(60)
+    )
+    cmif_file = write_cmif(tmp_path, body)
+    serial = validate_cmif(cmif_file)
+    for workers, shard_bytes in ((1, 1), (2, 500), (2, 1 << 20)):
+        report = validate_cmif(cmif_file, workers=workers, shard_bytes=shard_bytes)
+        assert report['problems'] == serial['problems']
+        assert report['codes'] == serial['codes']
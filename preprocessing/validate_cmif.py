@@ -0,0 +1,457 @@
+"""
+Streaming-Validierung von CMIF-Dateien
+
+Prueft eine CMIF-Datei vor dem Build auf Struktur, Authority-URIs und
+Datumssyntax, ohne den Baum der ganzen Datei aufzubauen: jeder correspDesc
+wird einzeln aus seinem Bytebereich geparst (hsa_scan.py, siehe unten).
+parse_cmif akzeptiert fehlende ref-Attribute, unbekannte URIs und
+unlesbare Daten stillschweigend; die Validierung meldet sie mit
+Zeilennummer:
+
+    Fehler (Datei wird abgelehnt)
+        xml_syntax, wrong_root, no_letters, missing_ref, duplicate_ref,
+        invalid_date, contradictory_date, malformed_authority, missing_target
+    Warnungen
+        missing_sent, missing_received, unknown_action_type, missing_sender,
+        missing_recipient, multiple_dates, empty_date, open_range,
+        invalid_cert, empty_name, missing_authority, unknown_authority,
+        unexpected_authority, invalid_language
+
+Beschreibungen in PROBLEM_CODES. Bericht (JSON):
+
+    {
+      "version": 1, "file": "CMIF.xml", "generated": "...",
+      "valid": false, "letters": 11576, "errors": 2, "warnings": 310,
+      "codes": {"invalid_date": {"severity": "error", "count": 2,
+                                 "description": "..."}, ...},
+      "problems": [{"line": 812, "severity": "error", "code": "invalid_date",
+                    "letter": "https://...", "value": "when=1890-13"}, ...],
+      "truncated": false
+    }
+
+problems ist nach Zeile sortiert und je Code auf max_per_code Eintraege
+begrenzt (truncated = true); count zaehlt immer alle Vorkommen.
+
+Die Datei wird in Bytebereiche zerlegt (hsa_scan.py, wie parse_cmif_parallel);
+mit workers > 1 pruefen Worker-Prozesse die Bereiche (hoechstens
+2 * workers gleichzeitig), sonst laeuft dieselbe Pruefung im Hauptprozess.
+Zeilennummern sind exakt, auch jenseits von Zeile 65535, ab der lxml
+sourceline nicht mehr zuverlaessig liefert: der Scanner zaehlt die
+Zeilenumbrueche bis zu jedem Brief, sourceline gilt nur relativ zum Brief.
+Wurzel-, Skelett- und Duplikatpruefung laufen im Hauptprozess in
+Dokumentreihenfolge.
+
+Usage:
+    python preprocessing/validate_cmif.py data/hsa/CMIF.xml
+    python preprocessing/validate_cmif.py big.xml --workers 0 --report validation.json
+    python preprocessing/validate_cmif.py big.xml --strict   # Warnungen zaehlen als Fehler
+
+Exit-Code 1, wenn der Bericht Fehler enthaelt (mit --strict auch Warnungen).
+"""
+
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import re
+import sys
+
+from lxml import etree
+
+from build_hsa_data import (
+    CORRESP_ACTION, DATE, NOTE, PERS_NAME, PLACE_NAME, REF, TEI,
+    get_metadata_type
+)
+from cmif_uri import extract_id_from_uri
+from hsa_intervals import date_bounds, date_span
+from hsa_scan import (
+    SHARD_BYTES, SkeletonParser, map_ranges, open_cmif, parse_raw_letter, scan_range, syntax_error
+)
+
+
+VALIDATE_VERSION = 1
+
+MAX_PER_CODE = 1000
+
+PROBLEM_CODES = {
+    'xml_syntax': ('error', 'XML nicht wohlgeformt; die Pruefung bricht an dieser Stelle ab'),
+    'wrong_root': ('error', 'Wurzelelement ist nicht tei:TEI'),
+    'no_letters': ('error', 'Keine tei:correspDesc gefunden'),
+    'missing_ref': ('error', 'correspDesc ohne ref (Brief-ID und URL fehlen)'),
+    'duplicate_ref': ('error', 'ref bereits an einem frueheren correspDesc vergeben'),
+    'invalid_date': ('error', 'Datum nicht im Format YYYY, YYYY-MM oder YYYY-MM-DD'),
+    'contradictory_date': ('error', 'Datumsangaben widersprechen sich (fruehestes nach spaetestem Datum)'),
+    'malformed_authority': ('error', 'Authority-URI erkannt, aber ohne auswertbare ID'),
+    'missing_target': ('error', 'note/ref ohne target'),
+    'missing_sent': ('warning', 'Keine correspAction type="sent"'),
+    'missing_received': ('warning', 'Keine correspAction type="received"'),
+    'unknown_action_type': ('warning', 'correspAction mit type ausserhalb von sent, received, forwarded, redirected, transmitted'),
+    'missing_sender': ('warning', 'correspAction sent ohne persName (orgName wird nicht uebernommen)'),
+    'missing_recipient': ('warning', 'correspAction received ohne persName'),
+    'multiple_dates': ('warning', 'Mehrere date-Elemente in correspAction sent (nur das erste zaehlt)'),
+    'empty_date': ('warning', 'date ohne when, from, to, notBefore und notAfter'),
+    'open_range': ('warning', 'from ohne to bzw. to ohne from'),
+    'invalid_cert': ('warning', 'cert nicht high, medium, low oder unknown'),
+    'empty_name': ('warning', 'persName oder placeName ohne Text'),
+    'missing_authority': ('warning', 'persName oder placeName ohne ref'),
+    'unknown_authority': ('warning', 'Authority-URI nicht erkannt (wird unveraendert als ID uebernommen)'),
+    'unexpected_authority': ('warning', 'Authority-Typ passt nicht zum Element (z.B. GeoNames an persName)'),
+    'invalid_language': ('warning', 'hasLanguage-target weder ISO-639-Code noch Sprach-URI'),
+}
+
+DATE_ATTRIBUTES = ('when', 'from', 'to', 'notBefore', 'notAfter')
+CERT_VALUES = {'high', 'medium', 'low', 'unknown'}
+ACTION_TYPES = {'sent', 'received', 'forwarded', 'redirected', 'transmitted'}
+
+PERSON_AUTHORITIES = {'viaf', 'gnd', 'hsa_person'}
+PLACE_AUTHORITIES = {'geonames'}
+LANGUAGE_AUTHORITIES = {'hsa_language', 'lexvo'}
+LANGUAGE_CODE = re.compile(r'[a-z]{2,3}(?:-[A-Za-z0-9]{2,8})*')
+
+
+class CmifValidationError(ValueError):
+    """Die CMIF-Datei enthaelt Fehler; Details im Validierungsbericht."""
+
+
+def check_authority(add, elem, uri: str, expected: set, missing_code: str):
+    """Prueft eine Authority-URI (ref bzw. target) gegen die erwarteten Typen."""
+    if not uri:
+        add(elem, missing_code)
+        return
+    auth_id, auth_type = extract_id_from_uri(uri)
+    if auth_type == 'unknown':
+        add(elem, 'unknown_authority', uri)
+    elif auth_id is None:
+        add(elem, 'malformed_authority', uri)
+    elif expected is not None and auth_type not in expected:
+        add(elem, 'unexpected_authority', uri)
+
+
+def check_name(add, elem, expected: set):
+    """persName/placeName: Text und ref."""
+    if not (elem.text or '').strip():
+        add(elem, 'empty_name')
+    check_authority(add, elem, elem.get('ref'), expected, 'missing_authority')
+
+
+def check_date(add, date_elem):
+    """date: Syntax jedes Attributs, Zeitraeume und Widersprueche, cert."""
+    values = {name: date_elem.get(name) for name in DATE_ATTRIBUTES}
+    present = {name: value for name, value in values.items() if value is not None}
+    if not present:
+        add(date_elem, 'empty_date')
+
+    valid = True
+    for name, value in present.items():
+        if date_span(value) is None:
+            add(date_elem, 'invalid_date', f"{name}={value}")
+            valid = False
+    if ('from' in present) != ('to' in present):
+        add(date_elem, 'open_range', ' '.join(f"{k}={v}" for k, v in present.items()))
+    if valid and present and date_bounds(
+            values['when'], values['from'], values['to'],
+            values['notBefore'], values['notAfter']) is None:
+        add(date_elem, 'contradictory_date', ' '.join(f"{k}={v}" for k, v in present.items()))
+
+    cert = date_elem.get('cert')
+    if cert is not None and cert not in CERT_VALUES:
+        add(date_elem, 'invalid_cert', cert)
+
+
+def check_letter(corresp, line_offset: int = 0) -> list:
+    """Prueft einen correspDesc; liefert (Zeile, Code, Brief-ref, Wert)-Tupel.
+
+    line_offset verschiebt sourceline fuer Elemente, die einzeln aus einem
+    Bytebereich geparst wurden (Startzeile des Briefs - 1). Geprueft wird,
+    was extract_letter auswertet: die erste correspAction je type, darin
+    persName, placeName und date, sowie die erste note direkt unter
+    correspDesc.
+    """
+    problems = []
+    letter_ref = corresp.get('ref')
+
+    def add(elem, code, value=None):
+        problems.append((elem.sourceline + line_offset, code, letter_ref, value))
+
+    if not letter_ref:
+        add(corresp, 'missing_ref')
+
+    sent_action = recv_action = note = None
+    for elem in corresp.iter(CORRESP_ACTION, NOTE):
+        if elem.tag == CORRESP_ACTION:
+            action_type = elem.get('type')
+            if action_type == 'sent':
+                if sent_action is None:
+                    sent_action = elem
+            elif action_type == 'received':
+                if recv_action is None:
+                    recv_action = elem
+            elif action_type not in ACTION_TYPES:
+                add(elem, 'unknown_action_type', action_type)
+        elif note is None and elem.getparent() is corresp:
+            note = elem
+
+    if sent_action is None:
+        add(corresp, 'missing_sent')
+    else:
+        has_sender = False
+        dates = 0
+        for child in sent_action:
+            tag = child.tag
+            if tag == PERS_NAME:
+                has_sender = True
+                check_name(add, child, PERSON_AUTHORITIES)
+            elif tag == PLACE_NAME:
+                check_name(add, child, PLACE_AUTHORITIES)
+            elif tag == DATE:
+                dates += 1
+                if dates == 2:
+                    add(child, 'multiple_dates')
+                check_date(add, child)
+        if not has_sender:
+            add(sent_action, 'missing_sender')
+
+    if recv_action is None:
+        add(corresp, 'missing_received')
+    else:
+        has_recipient = False
+        for child in recv_action:
+            if child.tag == PERS_NAME:
+                has_recipient = True
+                check_name(add, child, PERSON_AUTHORITIES)
+            elif child.tag == PLACE_NAME:
+                check_name(add, child, PLACE_AUTHORITIES)
+        if not has_recipient:
+            add(recv_action, 'missing_recipient')
+
+    if note is not None:
+        for ref_elem in note.iterchildren(REF):
+            meta_type = get_metadata_type(ref_elem.get('type', ''))
+            if meta_type is None:
+                continue
+            target = ref_elem.get('target')
+            if not target:
+                add(ref_elem, 'missing_target', meta_type)
+            elif meta_type == 'hasLanguage':
+                if not LANGUAGE_CODE.fullmatch(target):
+                    lang_id, lang_type = extract_id_from_uri(target)
+                    if lang_type not in LANGUAGE_AUTHORITIES:
+                        add(ref_elem, 'invalid_language', target)
+                    elif lang_id is None:
+                        add(ref_elem, 'malformed_authority', target)
+            elif meta_type == 'mentionsPerson':
+                check_authority(add, ref_elem, target, PERSON_AUTHORITIES, 'missing_target')
+            elif meta_type == 'mentionsPlace':
+                check_authority(add, ref_elem, target, PLACE_AUTHORITIES, 'missing_target')
+            else:
+                # Subjects: Vokabulare sind offen, nur erkannte URIs ohne ID melden
+                _, subj_type = extract_id_from_uri(target)
+                if subj_type != 'unknown':
+                    check_authority(add, ref_elem, target, None, 'missing_target')
+
+    return problems
+
+
+def check_range(file_path: Path, start: int, stop: int, wrapper: tuple) -> tuple:
+    """Prueft einen Bytebereich der CMIF-Datei (im Worker-Prozess).
+
+    Liefert (Briefe, Probleme, Skelett, Fehler) mit Zeilen relativ zum
+    Bereichsanfang: Briefe als (Zeile, ref), Fehler als Argumente fuer
+    syntax_error zum ersten nicht wohlgeformten Brief (danach bricht die
+    Pruefung des Bereichs ab) oder None.
+    """
+    letters = []
+    problems = []
+    error = None
+    with open_cmif(file_path) as data:
+        raws, skeleton = scan_range(data, start, stop)
+    for line, raw in raws:
+        try:
+            corresp = parse_raw_letter(raw, line, wrapper)
+        except etree.XMLSyntaxError as e:
+            error = (e.msg, e.code, e.lineno, e.offset)
+            break
+        if corresp is None:
+            continue
+        letters.append((line, corresp.get('ref')))
+        problems.extend(check_letter(corresp, line - 1))
+    return letters, problems, skeleton, error
+
+
+class ValidationReport:
+    """Sammelt Probleme: Zaehler je Code, Eintraege je Code begrenzt."""
+
+    def __init__(self, cmif_file: Path, max_per_code: int = MAX_PER_CODE):
+        self.cmif_file = cmif_file
+        self.max_per_code = max_per_code
+        self.letters = 0
+        self.counts = Counter()
+        self.problems = []
+
+    def add(self, line: int, code: str, letter_ref: str = None, value=None):
+        self.counts[code] += 1
+        if self.counts[code] <= self.max_per_code:
+            self.problems.append((line, code, letter_ref, value))
+
+    def extend(self, problems: list):
+        for problem in problems:
+            self.add(*problem)
+
+    def total(self, severity: str) -> int:
+        return sum(count for code, count in self.counts.items()
+                   if PROBLEM_CODES[code][0] == severity)
+
+    def to_dict(self) -> dict:
+        errors = self.total('error')
+        # Zeile None (z.B. xml_syntax ohne Position) ans Ende
+        problems = sorted(self.problems, key=lambda p: (p[0] is None, p[0] or 0))
+        return {
+            'version': VALIDATE_VERSION,
+            'file': str(self.cmif_file),
+            'generated': datetime.now().isoformat(),
+            'valid': errors == 0,
+            'letters': self.letters,
+            'errors': errors,
+            'warnings': self.total('warning'),
+            'codes': {
+                code: {
+                    'severity': PROBLEM_CODES[code][0],
+                    'count': count,
+                    'description': PROBLEM_CODES[code][1]
+                }
+                for code, count in sorted(self.counts.items())
+            },
+            'problems': [
+                {'line': line, 'severity': PROBLEM_CODES[code][0], 'code': code,
+                 'letter': letter_ref, 'value': value}
+                for line, code, letter_ref, value in problems
+            ],
+            'truncated': any(count > self.max_per_code for count in self.counts.values())
+        }
+
+
+def check_root(cmif_file: Path, report: ValidationReport):
+    """Nur das erste Start-Event: Wurzel muss tei:TEI sein."""
+    for _, root in etree.iterparse(str(cmif_file), events=('start',)):
+        if root.tag != f"{TEI}TEI":
+            report.add(root.sourceline, 'wrong_root', None, root.tag)
+        break
+
+
+def validate_cmif(cmif_file: Path, workers: int = 1, shard_bytes: int = SHARD_BYTES,
+                  max_per_code: int = MAX_PER_CODE) -> dict:
+    """Validiert eine CMIF-Datei im Streaming-Modus und liefert den Bericht."""
+    report = ValidationReport(cmif_file, max_per_code)
+    skeleton = SkeletonParser()
+    seen = {}
+
+    try:
+        check_root(cmif_file, report)
+        for letters, problems, range_skeleton, error in map_ranges(
+                cmif_file, check_range, workers, shard_bytes):
+            shift = skeleton.line - 1
+            if error is not None:
+                error = syntax_error(*error, shift)
+            try:
+                skeleton.feed(range_skeleton)
+            except etree.XMLSyntaxError as e:
+                # Fehler ausserhalb der Briefe; es zaehlt der fruehere
+                if error is None or e.lineno < error.lineno:
+                    error = e
+            if error is not None:
+                letters = [letter for letter in letters if letter[0] + shift <= error.lineno]
+                problems = [problem for problem in problems if problem[0] + shift <= error.lineno]
+
+            for line, letter_ref in letters:
+                report.letters += 1
+                if not letter_ref:
+                    continue
+                if letter_ref in seen:
+                    report.add(line + shift, 'duplicate_ref', letter_ref, f"erstmals Zeile {seen[letter_ref]}")
+                else:
+                    seen[letter_ref] = line + shift
+            for line, code, letter_ref, value in problems:
+                report.add(line + shift, code, letter_ref, value)
+
+            if error is not None:
+                raise error
+        skeleton.finish()
+    except etree.XMLSyntaxError as e:
+        report.add(e.lineno, 'xml_syntax', None, e.msg)
+    else:
+        if report.letters == 0:
+            report.add(None, 'no_letters')
+
+    return report.to_dict()
+
+
+def write_report(report: dict, report_file: Path) -> Path:
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report_file
+
+
+def print_summary(report: dict, examples: int = 3):
+    """Kurzfassung: Anzahl je Code und die ersten Fundstellen."""
+    status = 'gueltig' if report['valid'] else 'UNGUELTIG'
+    print(f"{report['file']}: {status} - {report['letters']} Briefe, "
+          f"{report['errors']} Fehler, {report['warnings']} Warnungen")
+    by_code = {}
+    for problem in report['problems']:
+        by_code.setdefault(problem['code'], []).append(problem)
+    for code, info in sorted(report['codes'].items(),
+                             key=lambda item: (item[1]['severity'] != 'error', item[0])):
+        lines = ', '.join(str(p['line']) for p in by_code.get(code, [])[:examples]
+                          if p['line'] is not None)
+        print(f"  {info['severity']:7} {code:22} {info['count']:>7}  "
+              f"{info['description']} (Zeile {lines or '-'})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='CMIF-Datei vor dem Build validieren')
+    parser.add_argument('cmif', type=Path, help='CMIF-XML-Datei')
+    parser.add_argument(
+        '--report', type=Path,
+        help='Bericht als JSON schreiben (Default: nur Zusammenfassung ausgeben)'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Anzahl Prozesse fuer die Pruefung (0 = alle Kerne)'
+    )
+    parser.add_argument(
+        '--shard-bytes', type=int, default=SHARD_BYTES,
+        help='Groesse der Bytebereiche, die ein Worker auf einmal prueft'
+    )
+    parser.add_argument(
+        '--max-per-code', type=int, default=MAX_PER_CODE,
+        help='Hoechstens so viele Fundstellen je Code im Bericht'
+    )
+    parser.add_argument(
+        '--strict', action='store_true',
+        help='Auch Warnungen fuehren zu Exit-Code 1'
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.cmif.exists():
+        print(f"Datei nicht gefunden: {args.cmif}")
+        sys.exit(2)
+
+    workers = args.workers or os.cpu_count()
+    report = validate_cmif(args.cmif, workers=workers, shard_bytes=args.shard_bytes,
+                           max_per_code=args.max_per_code)
+    print_summary(report)
+    if args.report:
+        write_report(report, args.report)
+        print(f"Bericht: {args.report}")
+
+    if not report['valid'] or (args.strict and report['warnings']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()